@@ -0,0 +1,347 @@
+"""
+Generador de datos sintéticos deterministas para benchmarks y dimensionamiento.
+
+Puebla una base vacía con la jerarquía completa (clientes → contratos →
+plantas → sistemas → subsistemas → equipos → actividades), personas y
+usuarios, sobre los modelos SQLModel de `models`. Los IDs se asignan
+explícitamente (1..N por tabla) para que los benchmarks puedan elegir
+registros existentes sin consultar la base.
+
+Las distribuciones pueden sesgarse con exponentes tipo Zipf: 0 reparte de
+forma uniforme y valores mayores concentran más hijos/actividades en pocos
+registros (plantas grandes, equipos críticos, técnicos con más carga).
+El mismo conjunto de parámetros y semilla produce siempre la misma base.
+
+Uso como CLI (desde la raíz del proyecto):
+    python benchmarks/datos.py --salida grande.db --escala grande
+    python benchmarks/datos.py --salida 5m.db --escala 5m --semilla 7
+    python benchmarks/datos.py --salida x.db --escala mediano --actividades-por-equipo 80 --sesgo-actividades 1.2
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, asdict, fields, replace
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+
+from models import (
+    SQLModel,
+    Cliente, Contrato, Planta, Sistema, SubSistema,
+    TipoActivo, Fabricante, Modelo, Equipo,
+    Cargo, Persona, Actividad,
+    Rol, Usuario, ContratoUsuario
+)
+
+# Filas por sentencia INSERT (executemany)
+TAMANO_LOTE = 20000
+
+# Fecha inicial de las actividades generadas
+FECHA_BASE = date(2020, 1, 1)
+
+DESCRIPCIONES_ACTIVIDAD = [
+    "Inspección visual", "Lubricación", "Cambio de filtros", "Ajuste de correas",
+    "Limpieza general", "Medición de vibraciones", "Termografía", "Cambio de aceite",
+    "Calibración", "Revisión eléctrica", "Cambio de rodamientos", "Prueba funcional",
+]
+
+
+@dataclass
+class Escala:
+    """Cantidades y sesgos que definen el conjunto de datos"""
+    clientes: int = 2
+    contratos_por_cliente: float = 2
+    plantas_por_contrato: float = 2
+    sistemas_por_planta: float = 3
+    subsistemas_por_sistema: float = 3
+    equipos_por_subsistema: float = 4
+    actividades_por_equipo: float = 10
+    personas: int = 50
+    usuarios: int = 20
+    contratos_por_usuario: int = 3
+    tipos_activo: int = 10
+    fabricantes: int = 10
+    modelos_por_fabricante: int = 5
+    cargos: int = 8
+    dias_historia: int = 365 * 3
+    # Exponente Zipf del reparto de hijos entre padres en la jerarquía (0 = uniforme)
+    sesgo_jerarquia: float = 0.0
+    # Exponente Zipf del reparto de actividades entre equipos y entre personas
+    sesgo_actividades: float = 0.0
+    sesgo_personas: float = 0.0
+    # Crecimiento de la actividad en el tiempo (0 = constante; 1 = crece linealmente)
+    sesgo_fechas: float = 0.0
+
+    def totales(self) -> Dict[str, int]:
+        """Cantidad de filas resultante por tabla principal"""
+        contratos = round(self.clientes * self.contratos_por_cliente)
+        plantas = round(contratos * self.plantas_por_contrato)
+        sistemas = round(plantas * self.sistemas_por_planta)
+        subsistemas = round(sistemas * self.subsistemas_por_sistema)
+        equipos = round(subsistemas * self.equipos_por_subsistema)
+        return {
+            "clientes": self.clientes,
+            "contratos": contratos,
+            "plantas": plantas,
+            "sistemas": sistemas,
+            "subsistemas": subsistemas,
+            "equipos": equipos,
+            "actividades": round(equipos * self.actividades_por_equipo),
+            "personas": self.personas,
+            "usuarios": self.usuarios,
+        }
+
+
+# Tamaños predefinidos
+ESCALAS: Dict[str, Escala] = {
+    "pequeno": Escala(),
+    "mediano": Escala(clientes=5, contratos_por_cliente=4, plantas_por_contrato=3,
+                      equipos_por_subsistema=8, actividades_por_equipo=25,
+                      personas=500, usuarios=200,
+                      sesgo_jerarquia=0.8, sesgo_actividades=0.8, sesgo_personas=0.8, sesgo_fechas=0.5),
+    "grande": Escala(clientes=20, contratos_por_cliente=5, plantas_por_contrato=4,
+                     sistemas_por_planta=5, subsistemas_por_sistema=4, equipos_por_subsistema=10,
+                     actividades_por_equipo=50, personas=3000, usuarios=1000,
+                     sesgo_jerarquia=0.8, sesgo_actividades=0.8, sesgo_personas=0.8, sesgo_fechas=0.5),
+    # ~100k equipos y 5M actividades, con la forma de los contratos reales
+    "5m": Escala(clientes=40, contratos_por_cliente=5, plantas_por_contrato=5,
+                 sistemas_por_planta=6, subsistemas_por_sistema=5, equipos_por_subsistema=6.7,
+                 actividades_por_equipo=50, personas=5000, usuarios=2000, dias_historia=365 * 5,
+                 sesgo_jerarquia=0.8, sesgo_actividades=1.0, sesgo_personas=1.0, sesgo_fechas=0.5),
+}
+
+
+def _pesos_acumulados(rnd: random.Random, cantidad: int, sesgo: float) -> Optional[List[float]]:
+    """
+    Pesos acumulados Zipf (1/rango^sesgo) sobre IDs 1..cantidad en orden aleatorio,
+    para que los registros "populares" no sean siempre los primeros IDs.
+    Retorna None si el sesgo es 0 (reparto uniforme).
+    """
+    if sesgo <= 0:
+        return None
+    rangos = list(range(1, cantidad + 1))
+    rnd.shuffle(rangos)
+    return list(itertools.accumulate(1.0 / rango ** sesgo for rango in rangos))
+
+
+def _elegir(rnd: random.Random, cantidad: int, acumulados: Optional[List[float]]) -> int:
+    """Elige un ID en 1..cantidad según los pesos acumulados (o uniforme)"""
+    if acumulados is None:
+        return rnd.randint(1, cantidad)
+    return bisect.bisect_left(acumulados, rnd.random() * acumulados[-1]) + 1
+
+
+def _repartir(rnd: random.Random, padres: int, hijos: int, sesgo: float) -> Iterator[int]:
+    """
+    Reparte `hijos` entre `padres` (al menos uno por padre si alcanza) y
+    entrega el ID del padre de cada hijo, agrupados por padre
+
+    Args:
+        rnd: Generador aleatorio
+        padres: Cantidad de padres (IDs 1..padres)
+        hijos: Cantidad total de hijos
+        sesgo: Exponente Zipf del reparto (0 = uniforme)
+    """
+    if sesgo <= 0:
+        # Uniforme: bloques contiguos del mismo tamaño (±1)
+        for i in range(hijos):
+            yield i * padres // hijos + 1
+        return
+    conteos = [1 if hijos >= padres else 0] * padres
+    acumulados = _pesos_acumulados(rnd, padres, sesgo)
+    for _ in range(hijos - sum(conteos)):
+        conteos[_elegir(rnd, padres, acumulados) - 1] += 1
+    for padre, conteo in enumerate(conteos, start=1):
+        for _ in range(conteo):
+            yield padre
+
+
+def _insertar(engine: Engine, modelo: Any, filas: Iterable[Dict[str, Any]]) -> int:
+    """Inserta las filas en lotes con executemany y retorna la cantidad insertada"""
+    total = 0
+    with engine.begin() as conn:
+        filas = iter(filas)
+        while True:
+            lote = list(itertools.islice(filas, TAMANO_LOTE))
+            if not lote:
+                break
+            conn.execute(insert(modelo), lote)
+            total += len(lote)
+    return total
+
+
+def poblar(engine: Engine, escala: Escala, semilla: int = 42, progreso: bool = False) -> Dict[str, int]:
+    """
+    Puebla una base vacía con datos sintéticos deterministas
+
+    Args:
+        engine: Engine de la base de destino (con las tablas ya creadas)
+        escala: Cantidades y sesgos a generar
+        semilla: Semilla del generador aleatorio
+        progreso: Si es True, informa el avance por stderr
+
+    Returns:
+        Cantidad de filas por tabla principal
+    """
+    rnd = random.Random(semilla)
+    t = escala.totales()
+    inicio = time.perf_counter()
+
+    def avance(tabla: str, cantidad: int):
+        if progreso:
+            print(f"  {tabla}: {cantidad:,} filas ({time.perf_counter() - inicio:.1f}s)", file=sys.stderr)
+
+    avance("tipoactivo", _insertar(engine, TipoActivo, (
+        {"id": i, "descripcion": f"Tipo {i}"} for i in range(1, escala.tipos_activo + 1)
+    )))
+    avance("fabricante", _insertar(engine, Fabricante, (
+        {"id": i, "nombre": f"Fabricante {i}"} for i in range(1, escala.fabricantes + 1)
+    )))
+    total_modelos = escala.fabricantes * escala.modelos_por_fabricante
+    avance("modelo", _insertar(engine, Modelo, (
+        {"id": i, "nombre": f"Modelo {i}", "fabricante_id": (i - 1) // escala.modelos_por_fabricante + 1}
+        for i in range(1, total_modelos + 1)
+    )))
+
+    avance("cliente", _insertar(engine, Cliente, (
+        {"id": i, "nombre": f"Cliente {i}", "descripcion": None} for i in range(1, t["clientes"] + 1)
+    )))
+    avance("contrato", _insertar(engine, Contrato, (
+        {"id": i, "nombre": f"Contrato {i}", "descripcion": None, "cliente_id": padre}
+        for i, padre in enumerate(_repartir(rnd, t["clientes"], t["contratos"], escala.sesgo_jerarquia), start=1)
+    )))
+    avance("planta", _insertar(engine, Planta, (
+        {"id": i, "nombre": f"Planta {i}", "descripcion": None, "municipio": f"Municipio {i % 50}",
+         "localizacion": None, "contrato_id": padre}
+        for i, padre in enumerate(_repartir(rnd, t["contratos"], t["plantas"], escala.sesgo_jerarquia), start=1)
+    )))
+    avance("sistema", _insertar(engine, Sistema, (
+        {"id": i, "codigo": f"S{i}", "nombre": f"Sistema {i}", "descripcion": "", "planta_id": padre}
+        for i, padre in enumerate(_repartir(rnd, t["plantas"], t["sistemas"], escala.sesgo_jerarquia), start=1)
+    )))
+    avance("subsistema", _insertar(engine, SubSistema, (
+        {"id": i, "codigo": f"SS{i}", "nombre": f"Subsistema {i}", "descripcion": "", "sistema_id": padre}
+        for i, padre in enumerate(_repartir(rnd, t["sistemas"], t["subsistemas"], escala.sesgo_jerarquia), start=1)
+    )))
+
+    def equipos():
+        padres = _repartir(rnd, t["subsistemas"], t["equipos"], escala.sesgo_jerarquia)
+        for i, padre in enumerate(padres, start=1):
+            modelo_id = rnd.randint(1, total_modelos)
+            yield {
+                "id": i, "nombre": f"Equipo {i}", "ubicacion": None, "imagen": None,
+                "subsistema_id": padre,
+                "tipo_activo_id": rnd.randint(1, escala.tipos_activo),
+                "fabricante_id": (modelo_id - 1) // escala.modelos_por_fabricante + 1,
+                "modelo_id": modelo_id,
+            }
+    avance("equipo", _insertar(engine, Equipo, equipos()))
+
+    avance("cargo", _insertar(engine, Cargo, (
+        {"id": i, "descripcion": f"Cargo {i}"} for i in range(1, escala.cargos + 1)
+    )))
+    avance("persona", _insertar(engine, Persona, (
+        {"identificacion": i, "nombres": f"Persona {i}", "cargo_id": rnd.randint(1, escala.cargos)}
+        for i in range(1, t["personas"] + 1)
+    )))
+
+    def actividades():
+        total = t["actividades"]
+        pesos_equipos = _pesos_acumulados(rnd, t["equipos"], escala.sesgo_actividades)
+        pesos_personas = _pesos_acumulados(rnd, t["personas"], escala.sesgo_personas)
+        exponente = 1 / (1 + escala.sesgo_fechas)
+        fechas = [FECHA_BASE + timedelta(days=d) for d in range(escala.dias_historia)]
+        for i in range(1, total + 1):
+            # Las actividades se insertan en orden cronológico, como en producción;
+            # con sesgo_fechas > 0 hay más actividad en los periodos recientes
+            dia = int(escala.dias_historia * ((i - 1) / total) ** exponente)
+            yield {
+                "id": i,
+                "descripcion": DESCRIPCIONES_ACTIVIDAD[rnd.randrange(len(DESCRIPCIONES_ACTIVIDAD))],
+                "fecha": fechas[dia],
+                "equipo_id": _elegir(rnd, t["equipos"], pesos_equipos),
+                "persona_id": _elegir(rnd, t["personas"], pesos_personas),
+            }
+    avance("actividad", _insertar(engine, Actividad, actividades()))
+
+    avance("rol", _insertar(engine, Rol, ({"id": i, "descripcion": f"Rol {i}"} for i in range(1, 4))))
+    avance("usuario", _insertar(engine, Usuario, (
+        {"id": i, "username": f"usuario{i}", "password": "x", "email": None, "rol_id": rnd.randint(1, 3)}
+        for i in range(1, t["usuarios"] + 1)
+    )))
+
+    def asignaciones():
+        cantidad = min(escala.contratos_por_usuario, t["contratos"])
+        for usuario_id in range(1, t["usuarios"] + 1):
+            for contrato_id in sorted(rnd.sample(range(1, t["contratos"] + 1), cantidad)):
+                yield {"usuario_id": usuario_id, "contrato_id": contrato_id}
+    avance("contratousuario", _insertar(engine, ContratoUsuario, asignaciones()))
+
+    return t
+
+
+def escala_como_dict(escala: Escala) -> Dict[str, Any]:
+    """Parámetros de la escala, para incluirlos en los reportes"""
+    return asdict(escala)
+
+
+def _pragmas_carga(dbapi_connection, connection_record):
+    """Ajustes de SQLite para carga masiva: sin fsync y con journal en memoria"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA cache_size=-200000")
+    cursor.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Genera una base GAME con datos sintéticos deterministas")
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--salida", help="Archivo SQLite de destino")
+    destino.add_argument("--url", help="URL de SQLAlchemy de destino (base vacía)")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequeno", help="Tamaño base")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--sobrescribir", action="store_true", help="Reemplaza el archivo de salida si existe")
+    # Cada campo de Escala puede sobrescribirse (ej. --actividades-por-equipo 80)
+    for campo in fields(Escala):
+        parser.add_argument(f"--{campo.name.replace('_', '-')}", type=campo.type, dest=campo.name)
+    args = parser.parse_args()
+
+    cambios = {c.name: getattr(args, c.name) for c in fields(Escala) if getattr(args, c.name) is not None}
+    escala = replace(ESCALAS[args.escala], **cambios)
+
+    from sqlmodel import create_engine
+
+    if args.salida:
+        if os.path.exists(args.salida):
+            if not args.sobrescribir:
+                parser.error(f"{args.salida} ya existe (use --sobrescribir)")
+            os.remove(args.salida)
+        url = f"sqlite:///{args.salida}"
+    else:
+        url = args.url
+
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _pragmas_carga)
+    SQLModel.metadata.create_all(engine)
+
+    print(f"Generando escala '{args.escala}' con semilla {args.semilla}: {escala.totales()}", file=sys.stderr)
+    inicio = time.perf_counter()
+    poblar(engine, escala, semilla=args.semilla, progreso=True)
+    print(f"Listo en {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
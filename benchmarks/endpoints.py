@@ -0,0 +1,234 @@
+"""
+Benchmark de los endpoints más usados de la API.
+
+Ejecuta la aplicación en el mismo proceso (httpx con ASGITransport, sin
+servidor) sobre bases SQLite generadas con datos sintéticos deterministas
+(benchmarks/datos.py), para varios tamaños de datos y niveles de concurrencia.
+
+Por escenario reporta latencias p50/p95/p99, throughput, consultas SQL por
+solicitud y pico de memoria (tracemalloc, en una pasada aparte para no
+distorsionar las latencias). El resultado se guarda en JSON para comparar
+versiones.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/endpoints.py --tamanos pequeno,mediano --concurrencias 1,8,32
+    python benchmarks/endpoints.py --escenarios equipos_detalle,plantas_jerarquia --salida base.json
+
+Cada tamaño corre en un subproceso propio, porque el engine de la aplicación
+se crea al importar `db` con la DATABASE_URL del ambiente.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Escenarios: nombre -> función que arma la URL a partir de los totales y un generador aleatorio
+ESCENARIOS: Dict[str, Callable[[Dict[str, int], random.Random], str]] = {
+    "equipos_listar": lambda t, r: f"/api/equipos/?skip={r.randrange(max(1, t['equipos'] - 100))}&limit=100",
+    "equipos_detalle": lambda t, r: f"/api/equipos/{r.randint(1, t['equipos'])}",
+    "plantas_jerarquia": lambda t, r: "/api/plantas_jerarquia/",
+    "planta_jerarquia": lambda t, r: f"/api/plantas/{r.randint(1, t['plantas'])}/jerarquia",
+    "actividades_detalladas_equipo": lambda t, r: f"/api/actividades/detalladas/?equipo_id={r.randint(1, t['equipos'])}",
+    "actividades_detalladas_persona": lambda t, r: f"/api/actividades/detalladas/?persona_id={r.randint(1, t['personas'])}",
+    "actividades_exportar": lambda t, r: f"/api/actividades/exportar/?equipo_id={r.randint(1, t['equipos'])}",
+    "usuarios_listar": lambda t, r: "/api/usuarios/?limit=100",
+    "contratos_por_usuario": lambda t, r: f"/api/contratos/by-usuario/{r.randint(1, t['usuarios'])}",
+}
+
+# Escenarios costosos por diseño: se ejecutan con menos solicitudes
+ESCENARIOS_PESADOS = {"plantas_jerarquia"}
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por el método del rango más cercano"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+async def _ejecutar_escenario(cliente, urls: List[str], concurrencia: int, contador: Dict[str, int]) -> Dict[str, Any]:
+    """Lanza las solicitudes con un máximo de `concurrencia` simultáneas y mide cada una"""
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias: List[float] = []
+    errores: Dict[str, int] = {}
+
+    async def una(url: str):
+        async with semaforo:
+            inicio = time.perf_counter()
+            respuesta = await cliente.get(url)
+            latencias.append(time.perf_counter() - inicio)
+            if respuesta.status_code >= 400:
+                codigo = str(respuesta.status_code)
+                errores[codigo] = errores.get(codigo, 0) + 1
+
+    consultas_inicio = contador["consultas"]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(url) for url in urls))
+    duracion = time.perf_counter() - inicio
+    consultas = contador["consultas"] - consultas_inicio
+
+    return {
+        "solicitudes": len(urls),
+        "concurrencia": concurrencia,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "max_ms": round(max(latencias) * 1000, 3),
+        "throughput_rps": round(len(urls) / duracion, 2),
+        "consultas_por_solicitud": round(consultas / len(urls), 2),
+        "errores": errores,
+    }
+
+
+async def _medir_memoria(cliente, urls: List[str]) -> float:
+    """Pico de memoria asignada (MB) al atender las solicitudes de forma secuencial"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for url in urls:
+        await cliente.get(url)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(pico / 1024 / 1024, 3)
+
+
+def trabajador(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Ejecuta los escenarios para un tamaño dentro de este proceso.
+    DATABASE_URL y DB_ECHO ya vienen configurados por el proceso principal.
+    """
+    import warnings
+
+    import httpx
+    from sqlalchemy import event
+
+    # Las advertencias de serialización se repetirían en cada solicitud y
+    # su escritura en stderr distorsionaría las latencias
+    warnings.simplefilter("ignore")
+
+    from benchmarks.datos import ESCALAS, poblar, escala_como_dict
+    from db import create_db, engine
+    from main import app
+
+    escala = ESCALAS[args.tamano]
+    inicio = time.perf_counter()
+    create_db()
+    totales = poblar(engine, escala, semilla=args.semilla)
+    segundos_carga = time.perf_counter() - inicio
+
+    contador = {"consultas": 0}
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _contar(*_):
+        contador["consultas"] += 1
+
+    escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    concurrencias = [int(c) for c in args.concurrencias.split(",")]
+    resultados: Dict[str, Any] = {}
+
+    async def correr():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            for nombre in escenarios:
+                rnd = random.Random(f"{args.semilla}-{nombre}")
+                cantidad = max(5, args.solicitudes // 10) if nombre in ESCENARIOS_PESADOS else args.solicitudes
+                # Calentamiento: compila consultas y llena cachés antes de medir
+                for _ in range(min(5, cantidad)):
+                    await cliente.get(ESCENARIOS[nombre](totales, rnd))
+
+                por_concurrencia = []
+                for concurrencia in concurrencias:
+                    urls = [ESCENARIOS[nombre](totales, rnd) for _ in range(cantidad)]
+                    por_concurrencia.append(await _ejecutar_escenario(cliente, urls, concurrencia, contador))
+
+                urls = [ESCENARIOS[nombre](totales, rnd) for _ in range(min(10, cantidad))]
+                resultados[nombre] = {
+                    "pico_memoria_mb": await _medir_memoria(cliente, urls),
+                    "resultados": por_concurrencia,
+                }
+                print(f"  [{args.tamano}] {nombre}: " + ", ".join(
+                    f"c={r['concurrencia']} p95={r['p95_ms']}ms {r['throughput_rps']}rps"
+                    for r in por_concurrencia
+                ), file=sys.stderr)
+
+    asyncio.run(correr())
+    return {
+        "escala": escala_como_dict(escala),
+        "totales": totales,
+        "segundos_carga": round(segundos_carga, 2),
+        "escenarios": resultados,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de endpoints de la API GAME")
+    parser.add_argument("--tamanos", default="pequeno,mediano", help="Tamaños de datos (benchmarks/datos.py)")
+    parser.add_argument("--concurrencias", default="1,8,32", help="Niveles de concurrencia")
+    parser.add_argument("--solicitudes", type=int, default=200, help="Solicitudes por escenario y concurrencia")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS), help="Escenarios a ejecutar")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default="benchmark_endpoints.json", help="Ruta del reporte JSON")
+    parser.add_argument("--tamano", help=argparse.SUPPRESS)
+    parser.add_argument("--resultado", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    desconocidos = set(e.strip() for e in args.escenarios.split(",")) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    # Modo subproceso: un solo tamaño, resultado a un archivo
+    if args.tamano:
+        with open(args.resultado, "w", encoding="utf-8") as f:
+            json.dump(trabajador(args), f)
+        return 0
+
+    reporte: Dict[str, Any] = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            "concurrencias": args.concurrencias, "solicitudes": args.solicitudes, "semilla": args.semilla
+        },
+        "tamanos": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="game-bench-") as directorio:
+        for tamano in args.tamanos.split(","):
+            print(f"Tamaño {tamano}...", file=sys.stderr)
+            resultado = os.path.join(directorio, f"{tamano}.json")
+            ambiente = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{os.path.join(directorio, tamano + '.db')}",
+                "DB_ECHO": "false",
+                "GAME_HABILITAR_IA": "false",
+            }
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+                 "--tamano", tamano, "--resultado", resultado],
+                cwd=directorio, env=ambiente, check=True
+            )
+            with open(resultado, encoding="utf-8") as f:
+                reporte["tamanos"][tamano] = json.load(f)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"Reporte guardado en {args.salida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
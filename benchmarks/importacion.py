@@ -0,0 +1,138 @@
+"""
+Benchmark del tiempo de importación de la aplicación (arranque en frío).
+
+Ejecuta `python -X importtime -c "import main"` en un proceso nuevo, suma el
+tiempo acumulado de los módulos de primer nivel y verifica que ninguna
+dependencia pesada de IA/exportación se cargue al arrancar.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/importacion.py
+    python benchmarks/importacion.py --presupuesto 1.5 --salida importacion.json
+
+Termina con código 1 si se supera el presupuesto o si se importa algún
+módulo prohibido, para usarlo como verificación de regresión.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que solo deben cargarse en el primer uso de la funcionalidad que los requiere
+MODULOS_PROHIBIDOS = [
+    "chromadb",
+    "llama_index",
+    "langchain",
+    "langchain_community",
+    "langchain_core",
+    "openai",
+    "pandas",
+    "pyarrow",
+    "openpyxl",
+]
+
+# Presupuesto de importación en segundos (sobrescribible por ambiente o argumento)
+PRESUPUESTO_SEGUNDOS = float(os.getenv("BENCH_IMPORTACION_PRESUPUESTO", "3.0"))
+
+# Formato de cada línea: "import time: self [us] | cumulative | imported package"
+_LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir_importacion(modulo: str = "main") -> List[Tuple[str, int, int, int]]:
+    """
+    Importa el módulo en un proceso nuevo con -X importtime
+
+    Args:
+        modulo: Módulo a importar
+
+    Returns:
+        Lista de (módulo, nivel de anidación, microsegundos propios, microsegundos acumulados)
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{resultado.stderr[-2000:]}")
+
+    modulos = []
+    for linea in resultado.stderr.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            # Cada nivel de anidación agrega dos espacios de sangría
+            modulos.append((nombre, (len(sangria) - 1) // 2, int(propio), int(acumulado)))
+    return modulos
+
+
+def analizar(modulos: List[Tuple[str, int, int, int]], presupuesto: float) -> Dict:
+    """
+    Resume la medición y evalúa las condiciones de regresión
+
+    Args:
+        modulos: Resultado de medir_importacion
+        presupuesto: Tiempo máximo permitido en segundos
+
+    Returns:
+        Diccionario con el total, los módulos más lentos y los problemas encontrados
+    """
+    total = sum(acumulado for _, nivel, _, acumulado in modulos if nivel == 0) / 1e6
+    cargados = {nombre for nombre, _, _, _ in modulos}
+    prohibidos = sorted(
+        nombre for nombre in cargados
+        if nombre.split(".")[0] in MODULOS_PROHIBIDOS
+    )
+    raices_prohibidas = sorted({nombre.split(".")[0] for nombre in prohibidos})
+
+    problemas = []
+    if total > presupuesto:
+        problemas.append(f"Importación de {total:.3f}s supera el presupuesto de {presupuesto:.3f}s")
+    for raiz in raices_prohibidas:
+        problemas.append(f"Se importa '{raiz}' al arrancar")
+
+    mas_lentos = sorted(modulos, key=lambda m: m[3], reverse=True)[:20]
+    return {
+        "total_segundos": round(total, 4),
+        "presupuesto_segundos": presupuesto,
+        "modulos_cargados": len(cargados),
+        "modulos_prohibidos": raices_prohibidas,
+        "mas_lentos": [
+            {"modulo": nombre, "propio_ms": propio / 1000, "acumulado_ms": acumulado / 1000}
+            for nombre, _, propio, acumulado in mas_lentos
+        ],
+        "problemas": problemas,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mide el tiempo de importación de la aplicación")
+    parser.add_argument("--modulo", default="main", help="Módulo a importar (por defecto main)")
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_SEGUNDOS,
+                        help="Tiempo máximo permitido en segundos")
+    parser.add_argument("--salida", help="Ruta del reporte JSON")
+    args = parser.parse_args()
+
+    reporte = analizar(medir_importacion(args.modulo), args.presupuesto)
+
+    print(f"Importación de {args.modulo}: {reporte['total_segundos']:.3f}s "
+          f"({reporte['modulos_cargados']} módulos, presupuesto {args.presupuesto:.3f}s)")
+    for entrada in reporte["mas_lentos"][:10]:
+        print(f"  {entrada['acumulado_ms']:9.1f} ms  {entrada['modulo']}")
+    for problema in reporte["problemas"]:
+        print(f"❌ {problema}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+
+    return 1 if reporte["problemas"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
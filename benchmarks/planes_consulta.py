@@ -0,0 +1,213 @@
+"""
+Verificación de planes de consulta (EXPLAIN QUERY PLAN) de los métodos CRUD.
+
+Puebla una base SQLite temporal con datos sintéticos (benchmarks/datos.py),
+ejecuta cada método CRUD de la lista CASOS capturando las sentencias SQL que
+emite y obtiene el plan de cada una con sus mismos parámetros. Falla si
+alguna sentencia recorre completa (SCAN) una tabla grande, es decir, con al
+menos --umbral filas; así una consulta que deja de usar su índice se detecta
+antes de llegar a producción. tests/test_planes_consulta.py ejecuta la misma
+verificación con la escala mediano en cada corrida de las pruebas.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/planes_consulta.py
+    python benchmarks/planes_consulta.py --escala grande --detalle --salida planes.json
+
+Termina con código 1 si hay regresiones.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from sqlalchemy import event, inspect
+from sqlmodel import Session, SQLModel, create_engine
+
+from benchmarks.datos import ESCALAS, FECHA_BASE, poblar
+from db import (
+    crud_equipo, crud_modelo, crud_planta, crud_sistema, crud_subsistema,
+    crud_persona, crud_actividad, crud_contrato, crud_contrato_usuario,
+    crud_usuario, crud_aplicacion_rol
+)
+from db.agregados import crear_agregados
+from db.jerarquia import crear_ruta_jerarquia, obtener_ruta, prefijo_ruta
+
+# Tablas con al menos esta cantidad de filas se consideran grandes
+UMBRAL_FILAS = 1000
+
+# Regla por detalle del plan: "SCAN tabla" o "SCAN tabla USING [COVERING] INDEX ..."
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(.*)$")
+
+
+def prefijo_planta(session: Session, planta_id: int) -> str:
+    return obtener_ruta(session.connection(), "planta", planta_id)
+
+
+@dataclass
+class Caso:
+    """Método CRUD a verificar, invocado con IDs válidos de la base sembrada"""
+    nombre: str
+    ejecutar: Callable[[Session, Dict[str, int]], Any]
+
+
+CASOS: List[Caso] = [
+    Caso("equipo.get_detallado", lambda s, t: crud_equipo.get_detallado(s, t["equipos"] // 2)),
+    Caso("equipo.get_by_subsistema", lambda s, t: crud_equipo.get_by_subsistema(s, t["subsistemas"] // 2)),
+    Caso("equipo.get_by_fabricante_modelo", lambda s, t: crud_equipo.get_by_fabricante_modelo(s, modelo_id=3)),
+    Caso("equipo.get_by_ruta(planta)", lambda s, t: crud_equipo.get_by_ruta(s, prefijo_planta(s, t["plantas"] // 2))),
+    Caso("modelo.get_con_fabricante", lambda s, t: crud_modelo.get_con_fabricante(s, 3)),
+    Caso("planta.get_by_contrato", lambda s, t: crud_planta.get_by_contrato(s, t["contratos"] // 2)),
+    Caso("planta.get_combinaciones_activos", lambda s, t: crud_planta.get_combinaciones_activos(s, t["plantas"] // 2)),
+    Caso("planta.get_jerarquia_completa", lambda s, t: crud_planta.get_jerarquia_completa(s, t["plantas"] // 2)),
+    Caso("planta.get_jerarquia_completa(depth=1)", lambda s, t: crud_planta.get_jerarquia_completa(
+        s, t["plantas"] // 2, depth=1)),
+    Caso("planta.get_jerarquia_completa(agregados)", lambda s, t: crud_planta.get_jerarquia_completa(
+        s, t["plantas"] // 2, depth=2, agregados=True)),
+    Caso("planta.get_hijos(sistema)", lambda s, t: crud_planta.get_hijos(s, "sistema", t["sistemas"] // 2)),
+    Caso("sistema.get_by_planta", lambda s, t: crud_sistema.get_by_planta(s, t["plantas"] // 2)),
+    Caso("subsistema.get_by_sistema", lambda s, t: crud_subsistema.get_by_sistema(s, t["sistemas"] // 2)),
+    Caso("subsistema.get_with_equipos", lambda s, t: crud_subsistema.get_with_equipos(s, t["subsistemas"] // 2)),
+    Caso("persona.get_by_cargo", lambda s, t: crud_persona.get_by_cargo(s, 2)),
+    Caso("persona.get_with_cargo", lambda s, t: crud_persona.get_with_cargo(s, t["personas"] // 2)),
+    Caso("actividad.get_by_equipo", lambda s, t: crud_actividad.get_by_equipo(s, t["equipos"] // 2)),
+    Caso("actividad.get_by_persona", lambda s, t: crud_actividad.get_by_persona(s, t["personas"] // 2)),
+    Caso("actividad.get_by_fecha", lambda s, t: crud_actividad.get_by_fecha(
+        s, FECHA_BASE + timedelta(days=30), FECHA_BASE + timedelta(days=37))),
+    Caso("actividad.get_with_relations", lambda s, t: crud_actividad.get_with_relations(s, t["actividades"] // 2)),
+    Caso("actividad.get_detalladas(equipo)", lambda s, t: crud_actividad.get_detalladas(
+        s, equipo_id=t["equipos"] // 2)),
+    Caso("actividad.get_detalladas(persona)", lambda s, t: crud_actividad.get_detalladas(
+        s, persona_id=t["personas"] // 2)),
+    Caso("actividad.get_detalladas(fechas)", lambda s, t: crud_actividad.get_detalladas(
+        s, desde=FECHA_BASE + timedelta(days=30), hasta=FECHA_BASE + timedelta(days=37))),
+    Caso("actividad.get_by_ruta(contrato)", lambda s, t: crud_actividad.get_by_ruta(
+        s, prefijo_ruta(t["contratos"] // 2))),
+    Caso("contrato.get_by_cliente", lambda s, t: crud_contrato.get_by_cliente(s, 1)),
+    Caso("contrato.get_by_usuario", lambda s, t: crud_contrato.get_by_usuario(s, t["usuarios"] // 2)),
+    Caso("contrato_usuario.get_by_contrato", lambda s, t: crud_contrato_usuario.get_by_contrato(s, 1)),
+    Caso("contrato_usuario.get_by_usuario", lambda s, t: crud_contrato_usuario.get_by_usuario(s, t["usuarios"] // 2)),
+    Caso("usuario.get_by_username", lambda s, t: crud_usuario.get_by_username(s, "usuario7")),
+    Caso("usuario.get_by_rol", lambda s, t: crud_usuario.get_by_rol(s, 2)),
+    Caso("aplicacion_rol.get_by_rol", lambda s, t: crud_aplicacion_rol.get_by_rol(s, 2)),
+]
+
+# Recorridos completos aceptados a propósito: (caso, tabla) -> motivo
+PERMITIDOS: Dict[Tuple[str, str], str] = {}
+
+
+def _tabla_real(nombre: str, tablas: Set[str]) -> str:
+    """Convierte un alias de SQLAlchemy (persona_1) en el nombre de su tabla"""
+    if nombre in tablas:
+        return nombre
+    base = re.sub(r"_\d+$", "", nombre)
+    return base if base in tablas else nombre
+
+
+def verificar(escala: str, semilla: int, umbral: int) -> Dict[str, Any]:
+    """
+    Siembra una base temporal y obtiene el plan de cada sentencia de los casos
+
+    Args:
+        escala: Nombre de la escala de datos (benchmarks/datos.py)
+        semilla: Semilla del generador
+        umbral: Filas mínimas para considerar grande una tabla
+
+    Returns:
+        Diccionario con el tamaño de las tablas, las sentencias por caso y las regresiones
+    """
+    with tempfile.TemporaryDirectory(prefix="game-planes-") as directorio:
+        engine = create_engine(f"sqlite:///{os.path.join(directorio, 'planes.db')}")
+        SQLModel.metadata.create_all(engine)
+        with engine.begin() as conn:
+            crear_ruta_jerarquia(conn)
+            crear_agregados(conn)
+        totales = poblar(engine, ESCALAS[escala], semilla=semilla)
+
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            tablas = set(inspect(conn).get_table_names())
+            filas = {t: conn.exec_driver_sql(f'SELECT count(*) FROM "{t}"').scalar() for t in sorted(tablas)}
+        grandes = {t for t, n in filas.items() if n >= umbral}
+
+        capturadas: List[Tuple[str, Any]] = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _capturar(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith("EXPLAIN"):
+                capturadas.append((statement, parameters))
+
+        casos: List[Dict[str, Any]] = []
+        regresiones: List[Dict[str, Any]] = []
+        for caso in CASOS:
+            capturadas.clear()
+            with Session(engine) as session:
+                caso.ejecutar(session, totales)
+            # Sin repetir sentencias idénticas (mismo SQL y parámetros)
+            sentencias = list(dict.fromkeys((s, tuple(p)) for s, p in capturadas))
+
+            detalle_caso = []
+            with engine.connect() as conn:
+                for sentencia, parametros in sentencias:
+                    plan = [fila[3] for fila in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros)]
+                    recorridos = []
+                    for paso in plan:
+                        coincidencia = _SCAN.match(paso)
+                        if coincidencia:
+                            tabla = _tabla_real(coincidencia.group(1), tablas)
+                            if tabla in grandes and (caso.nombre, tabla) not in PERMITIDOS:
+                                recorridos.append(tabla)
+                    detalle_caso.append({"sql": " ".join(sentencia.split()), "plan": plan, "recorridos": recorridos})
+                    for tabla in recorridos:
+                        regresiones.append({"caso": caso.nombre, "tabla": tabla, "filas": filas[tabla],
+                                            "sql": " ".join(sentencia.split()), "plan": plan})
+            casos.append({"caso": caso.nombre, "sentencias": detalle_caso})
+
+        engine.dispose()
+
+    return {"escala": escala, "filas": filas, "casos": casos, "regresiones": regresiones}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verifica los planes de consulta de los métodos CRUD")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="mediano")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--umbral", type=int, default=UMBRAL_FILAS, help="Filas mínimas de una tabla grande")
+    parser.add_argument("--detalle", action="store_true", help="Muestra el plan de cada sentencia")
+    parser.add_argument("--salida", help="Ruta del reporte JSON")
+    args = parser.parse_args()
+
+    reporte = verificar(args.escala, args.semilla, args.umbral)
+
+    for caso in reporte["casos"]:
+        estado = "❌" if any(s["recorridos"] for s in caso["sentencias"]) else "✅"
+        print(f"{estado} {caso['caso']} ({len(caso['sentencias'])} sentencias)")
+        if args.detalle:
+            for sentencia in caso["sentencias"]:
+                print(f"     {sentencia['sql'][:140]}")
+                for paso in sentencia["plan"]:
+                    print(f"       - {paso}")
+
+    for regresion in reporte["regresiones"]:
+        print(f"\n❌ {regresion['caso']}: SCAN de {regresion['tabla']} ({regresion['filas']} filas)")
+        print(f"   {regresion['sql']}")
+        for paso in regresion["plan"]:
+            print(f"     - {paso}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    return 1 if reporte["regresiones"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,4 +14,5 @@ from .crud_equipment import crud_equipo, crud_tipo_activo, crud_fabricante, crud
 from .crud_organization import crud_planta, crud_sistema, crud_subsistema
 from .crud_operations import crud_cargo, crud_persona, crud_actividad
 from .crud_business import crud_cliente, crud_contrato, crud_contrato_usuario
-from .crud_users import crud_usuario, crud_rol, crud_aplicacion, crud_aplicacion_rol
\ No newline at end of file
+from .crud_users import crud_usuario, crud_rol, crud_aplicacion, crud_aplicacion_rol
+from .crud_ia import crud_procedimiento
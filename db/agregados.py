@@ -0,0 +1,267 @@
+"""
+Contadores de la jerarquía: equipos y actividades por mes bajo cada nodo.
+
+Los contadores se guardan por subsistema, el nivel que agrupa los equipos:
+
+- agregado_equipos: equipos de cada subsistema.
+- agregado_actividades: actividades de los equipos de cada subsistema, por
+  mes ("YYYY-MM"), así la actividad del mes se lee sin agregar la tabla actividad.
+
+Los de un sistema o una planta se obtienen sumando los de sus subsistemas
+(decenas de filas por índice), así mover un sistema o subsistema a otro padre
+no requiere actualizar nada.
+
+Los triggers ajustan los contadores en cada escritura de equipo y actividad
+(CRUD, cargue masivo, upserts o SQL directo). Si se desalinean (por ejemplo,
+tras editar la base con los triggers desactivados), se recalculan con:
+
+    python -m db.agregados            # recalcula todo
+    python -m db.agregados --verificar  # solo reporta diferencias
+"""
+import argparse
+import sys
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import column, func, literal, select, table, union_all
+from sqlalchemy.engine import Connection
+
+from models.organization import Sistema, SubSistema
+
+TABLA_AGREGADO_EQUIPOS = "agregado_equipos"
+TABLA_AGREGADO_ACTIVIDADES = "agregado_actividades"
+
+# Construcciones livianas para consultar las tablas desde SQLAlchemy (no son
+# parte de SQLModel.metadata, por eso create_all y la instantánea las ignoran)
+agregado_equipos = table(TABLA_AGREGADO_EQUIPOS, column("subsistema_id"), column("equipos"))
+agregado_actividades = table(
+    TABLA_AGREGADO_ACTIVIDADES, column("subsistema_id"), column("mes"), column("actividades")
+)
+
+
+def _sumar_equipos(subsistema_sql: str, delta: str) -> str:
+    return f"""INSERT INTO {TABLA_AGREGADO_EQUIPOS}(subsistema_id, equipos)
+        SELECT {subsistema_sql}, {delta} WHERE {subsistema_sql} IS NOT NULL
+        ON CONFLICT(subsistema_id) DO UPDATE SET equipos = equipos + excluded.equipos;"""
+
+
+def _sumar_actividades(subsistema_sql: str, origen_sql: str) -> str:
+    """origen_sql: SELECT que produce (mes, cantidad) a sumar al subsistema"""
+    return f"""INSERT INTO {TABLA_AGREGADO_ACTIVIDADES}(subsistema_id, mes, actividades)
+        SELECT {subsistema_sql}, o.mes, o.cantidad FROM ({origen_sql}) o WHERE {subsistema_sql} IS NOT NULL
+        ON CONFLICT(subsistema_id, mes) DO UPDATE SET actividades = actividades + excluded.actividades;"""
+
+
+def _aporte_equipo(fila: str, signo: str) -> str:
+    """Suma (o resta) un equipo y sus actividades a su subsistema"""
+    actividades = (f"SELECT substr(fecha, 1, 7) AS mes, {signo}count(*) AS cantidad FROM actividad "
+                   f"WHERE equipo_id = {fila}.id GROUP BY 1")
+    return (_sumar_equipos(f"{fila}.subsistema_id", f"{signo}1") + "\n"
+            + _sumar_actividades(f"{fila}.subsistema_id", actividades))
+
+
+def _aporte_actividad(fila: str, signo: str) -> str:
+    """Suma (o resta) una actividad al subsistema de su equipo"""
+    return _sumar_actividades(
+        f"(SELECT subsistema_id FROM equipo WHERE id = {fila}.equipo_id)",
+        f"SELECT substr({fila}.fecha, 1, 7) AS mes, {signo}1 AS cantidad",
+    )
+
+
+DDL_AGREGADOS: List[str] = [
+    f"""CREATE TABLE IF NOT EXISTS {TABLA_AGREGADO_EQUIPOS} (
+        subsistema_id INTEGER NOT NULL PRIMARY KEY,
+        equipos INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    f"""CREATE TABLE IF NOT EXISTS {TABLA_AGREGADO_ACTIVIDADES} (
+        subsistema_id INTEGER NOT NULL,
+        mes TEXT NOT NULL,
+        actividades INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (subsistema_id, mes)
+    ) WITHOUT ROWID""",
+    f"""CREATE TRIGGER IF NOT EXISTS equipo_agregados_ai AFTER INSERT ON equipo BEGIN
+        {_aporte_equipo("new", "")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS equipo_agregados_ad AFTER DELETE ON equipo BEGIN
+        {_aporte_equipo("old", "-")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS equipo_agregados_au AFTER UPDATE OF id, subsistema_id ON equipo
+        WHEN new.id IS NOT old.id OR new.subsistema_id IS NOT old.subsistema_id BEGIN
+        {_aporte_equipo("old", "-")}
+        {_aporte_equipo("new", "")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS actividad_agregados_ai AFTER INSERT ON actividad BEGIN
+        {_aporte_actividad("new", "")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS actividad_agregados_ad AFTER DELETE ON actividad BEGIN
+        {_aporte_actividad("old", "-")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS actividad_agregados_au AFTER UPDATE OF equipo_id, fecha ON actividad
+        WHEN new.equipo_id IS NOT old.equipo_id OR new.fecha IS NOT old.fecha BEGIN
+        {_aporte_actividad("old", "-")}
+        {_aporte_actividad("new", "")}
+    END""",
+]
+
+# Tabla de contadores -> (columna del contador, SELECT que la calcula a partir de los datos)
+_RECALCULO: Dict[str, Tuple[str, str]] = {
+    TABLA_AGREGADO_EQUIPOS: (
+        "equipos",
+        "SELECT subsistema_id, count(*) FROM equipo WHERE subsistema_id IS NOT NULL GROUP BY 1",
+    ),
+    TABLA_AGREGADO_ACTIVIDADES: (
+        "actividades",
+        """SELECT e.subsistema_id, substr(a.fecha, 1, 7), count(*)
+           FROM actividad a JOIN equipo e ON e.id = a.equipo_id
+           WHERE e.subsistema_id IS NOT NULL GROUP BY 1, 2""",
+    ),
+}
+
+
+def crear_agregados(conn: Connection) -> bool:
+    """
+    Crea las tablas de contadores y sus triggers si no existen. Si las
+    tablas son nuevas, calcula los contadores de los datos ya existentes.
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        True si las tablas se crearon (y se llenaron) en esta llamada
+    """
+    existia = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA_AGREGADO_EQUIPOS,)
+    ).first() is not None
+    for sentencia in DDL_AGREGADOS:
+        conn.exec_driver_sql(sentencia)
+    if not existia:
+        recalcular_agregados(conn)
+    return not existia
+
+
+def recalcular_agregados(conn: Connection) -> Dict[str, int]:
+    """
+    Vuelve a calcular todos los contadores a partir de las tablas (reparación)
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        Filas escritas por tabla de contadores
+    """
+    filas = {}
+    for tabla, (_, consulta) in _RECALCULO.items():
+        conn.exec_driver_sql(f"DELETE FROM {tabla}")
+        filas[tabla] = conn.exec_driver_sql(f"INSERT INTO {tabla} {consulta}").rowcount
+    return filas
+
+
+def verificar_agregados(conn: Connection) -> Dict[str, int]:
+    """
+    Compara los contadores guardados con los calculados a partir de los datos
+
+    Args:
+        conn: Conexión SQLite
+
+    Returns:
+        Cantidad de contadores distintos por tabla (los contadores en cero
+        equivalen a no tener fila)
+    """
+    diferencias = {}
+    for tabla, (contador, consulta) in _RECALCULO.items():
+        guardados = conn.exec_driver_sql(f"SELECT * FROM {tabla} WHERE {contador} != 0").all()
+        diferencias[tabla] = len(set(guardados) ^ set(conn.exec_driver_sql(consulta).all()))
+    return diferencias
+
+
+def mes_actual() -> str:
+    """Mes actual en el formato de agregado_actividades ("YYYY-MM")"""
+    return date.today().strftime("%Y-%m")
+
+
+def _sumas_por_nodo(contador, ids: Dict[str, List[int]], *condiciones):
+    """UNION ALL con (tipo, ID, suma del contador) de los nodos pedidos de cada nivel"""
+    tabla = contador.table
+    consultas = []
+    if ids.get("subsistema"):
+        consultas.append(
+            select(literal("subsistema"), tabla.c.subsistema_id, func.sum(contador))
+            .where(tabla.c.subsistema_id.in_(ids["subsistema"]), *condiciones)
+            .group_by(tabla.c.subsistema_id)
+        )
+    if ids.get("sistema"):
+        consultas.append(
+            select(literal("sistema"), SubSistema.sistema_id, func.sum(contador))
+            .join(tabla, tabla.c.subsistema_id == SubSistema.id)
+            .where(SubSistema.sistema_id.in_(ids["sistema"]), *condiciones)
+            .group_by(SubSistema.sistema_id)
+        )
+    if ids.get("planta"):
+        consultas.append(
+            select(literal("planta"), Sistema.planta_id, func.sum(contador))
+            .join(SubSistema, SubSistema.sistema_id == Sistema.id)
+            .join(tabla, tabla.c.subsistema_id == SubSistema.id)
+            .where(Sistema.planta_id.in_(ids["planta"]), *condiciones)
+            .group_by(Sistema.planta_id)
+        )
+    return union_all(*consultas)
+
+
+def leer_agregados(conn: Connection, nodos: Iterable[Tuple[str, int]],
+                   mes: Optional[str] = None) -> Dict[Tuple[str, int], Dict[str, int]]:
+    """
+    Lee los contadores de un conjunto de plantas, sistemas y subsistemas en
+    dos consultas
+
+    Args:
+        conn: Conexión SQLite
+        nodos: Pares (tipo, ID) de los nodos
+        mes: Mes de las actividades ("YYYY-MM"); por defecto el actual
+
+    Returns:
+        {(tipo, ID): {"equipos": n, "actividades_mes": n}}, con ceros para
+        los nodos sin contadores
+    """
+    resultado: Dict[Tuple[str, int], Dict[str, int]] = {}
+    ids: Dict[str, List[int]] = {}
+    for tipo, entidad_id in nodos:
+        if (tipo, entidad_id) not in resultado:
+            resultado[(tipo, entidad_id)] = {"equipos": 0, "actividades_mes": 0}
+            ids.setdefault(tipo, []).append(entidad_id)
+    if not resultado:
+        return resultado
+    for tipo, entidad_id, equipos in conn.execute(_sumas_por_nodo(agregado_equipos.c.equipos, ids)):
+        resultado[(tipo, entidad_id)]["equipos"] = equipos
+    for tipo, entidad_id, actividades in conn.execute(_sumas_por_nodo(
+        agregado_actividades.c.actividades, ids, agregado_actividades.c.mes == (mes or mes_actual())
+    )):
+        resultado[(tipo, entidad_id)]["actividades_mes"] = actividades
+    return resultado
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Recalcula los contadores de la jerarquía")
+    parser.add_argument("--verificar", action="store_true", help="Solo reporta las diferencias, sin escribir")
+    args = parser.parse_args()
+
+    from db import engine
+
+    if engine.dialect.name != "sqlite":
+        print("Los contadores de la jerarquía requieren SQLite", file=sys.stderr)
+        return 1
+    if args.verificar:
+        with engine.connect() as conn:
+            diferencias = verificar_agregados(conn)
+        for tabla, cantidad in diferencias.items():
+            print(f"{tabla}: {cantidad} contadores distintos", file=sys.stderr)
+        return 1 if any(diferencias.values()) else 0
+    with engine.begin() as conn:
+        crear_agregados(conn)
+        filas = recalcular_agregados(conn)
+    for tabla, cantidad in filas.items():
+        print(f"{tabla}: {cantidad} contadores recalculados", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
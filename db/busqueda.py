@@ -0,0 +1,340 @@
+"""
+Índices de búsqueda de texto completo (SQLite FTS5).
+
+- equipo_fts: por cada equipo (rowid = equipo.id), su nombre y ubicación
+  junto con los nombres de su fabricante, modelo y tipo de activo.
+- busqueda_global: un documento por cliente, contrato, planta, sistema,
+  subsistema, equipo y persona, con su tipo, título, detalle y la ruta de
+  la jerarquía a la que pertenece (ej. "Planta Norte › Calderas › Agua").
+
+Los triggers mantienen ambos índices sincronizados con cualquier escritura,
+incluidos los cargues masivos y los upserts; renombrar o mover un nodo de
+la jerarquía actualiza también la ruta de sus descendientes.
+
+El tokenizador unicode61 con remove_diacritics 2 ignora mayúsculas y tildes,
+así "compresion" encuentra "Compresión".
+"""
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+TABLA_FTS_EQUIPOS = "equipo_fts"
+
+# Peso de cada columna en el ranking bm25 (mismo orden que las columnas)
+PESOS_FTS_EQUIPOS = (10.0, 2.0, 4.0, 4.0, 3.0)
+
+# Texto indexado de un equipo (new/old se sustituyen en cada trigger)
+_SELECT_DOCUMENTO = """
+    SELECT e.id, e.nombre, coalesce(e.ubicacion, ''),
+           coalesce(f.nombre, ''), coalesce(m.nombre, ''), coalesce(t.descripcion, '')
+    FROM equipo e
+    LEFT JOIN fabricante f ON f.id = e.fabricante_id
+    LEFT JOIN modelo m ON m.id = e.modelo_id
+    LEFT JOIN tipoactivo t ON t.id = e.tipo_activo_id
+"""
+
+DDL_FTS_EQUIPOS: List[str] = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS_EQUIPOS} USING fts5(
+        nombre, ubicacion, fabricante, modelo, tipo_activo,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS equipo_fts_ai AFTER INSERT ON equipo BEGIN
+        INSERT INTO {TABLA_FTS_EQUIPOS}(rowid, nombre, ubicacion, fabricante, modelo, tipo_activo)
+        {_SELECT_DOCUMENTO} WHERE e.id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS equipo_fts_au AFTER UPDATE ON equipo BEGIN
+        DELETE FROM {TABLA_FTS_EQUIPOS} WHERE rowid = old.id;
+        INSERT INTO {TABLA_FTS_EQUIPOS}(rowid, nombre, ubicacion, fabricante, modelo, tipo_activo)
+        {_SELECT_DOCUMENTO} WHERE e.id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS equipo_fts_ad AFTER DELETE ON equipo BEGIN
+        DELETE FROM {TABLA_FTS_EQUIPOS} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS fabricante_fts_au AFTER UPDATE OF nombre ON fabricante BEGIN
+        UPDATE {TABLA_FTS_EQUIPOS} SET fabricante = new.nombre
+        WHERE rowid IN (SELECT id FROM equipo WHERE fabricante_id = new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS modelo_fts_au AFTER UPDATE OF nombre ON modelo BEGIN
+        UPDATE {TABLA_FTS_EQUIPOS} SET modelo = new.nombre
+        WHERE rowid IN (SELECT id FROM equipo WHERE modelo_id = new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tipoactivo_fts_au AFTER UPDATE OF descripcion ON tipoactivo BEGIN
+        UPDATE {TABLA_FTS_EQUIPOS} SET tipo_activo = new.descripcion
+        WHERE rowid IN (SELECT id FROM equipo WHERE tipo_activo_id = new.id);
+    END""",
+]
+
+
+TABLA_BUSQUEDA_GLOBAL = "busqueda_global"
+
+# Peso en bm25 de tipo, entidad_id (no indexadas), título, detalle y ruta
+PESOS_BUSQUEDA_GLOBAL = (0.0, 0.0, 10.0, 2.0, 1.0)
+
+# Separador de los niveles de la ruta (el tokenizador lo trata como espacio)
+SEPARADOR_RUTA = " › "
+
+# El rowid de un documento combina el ID de la entidad y el código de su tipo
+_FACTOR_ROWID = 8
+
+# Documento de cada tipo: código, tabla, clave primaria y SELECT con alias x
+# que produce (rowid, tipo, entidad_id, titulo, detalle, ruta)
+_SEPARADOR_SQL = f"'{SEPARADOR_RUTA}'"
+DOCUMENTOS_BUSQUEDA: Dict[str, Dict[str, Any]] = {
+    "cliente": {
+        "codigo": 1, "tabla": "cliente", "pk": "id",
+        "select": """SELECT x.id * 8 + 1, 'cliente', x.id, x.nombre, coalesce(x.descripcion, ''), ''
+                     FROM cliente x""",
+    },
+    "contrato": {
+        "codigo": 2, "tabla": "contrato", "pk": "id",
+        "select": """SELECT x.id * 8 + 2, 'contrato', x.id, x.nombre, coalesce(x.descripcion, ''),
+                            coalesce(cl.nombre, '')
+                     FROM contrato x LEFT JOIN cliente cl ON cl.id = x.cliente_id""",
+    },
+    "planta": {
+        "codigo": 3, "tabla": "planta", "pk": "id",
+        "select": f"""SELECT x.id * 8 + 3, 'planta', x.id, x.nombre,
+                             trim(x.municipio || ' ' || coalesce(x.descripcion, '')),
+                             coalesce(cl.nombre, '') || {_SEPARADOR_SQL} || coalesce(co.nombre, '')
+                      FROM planta x
+                      LEFT JOIN contrato co ON co.id = x.contrato_id
+                      LEFT JOIN cliente cl ON cl.id = co.cliente_id""",
+    },
+    "sistema": {
+        "codigo": 4, "tabla": "sistema", "pk": "id",
+        "select": """SELECT x.id * 8 + 4, 'sistema', x.id, x.codigo || ' ' || x.nombre,
+                            coalesce(x.descripcion, ''), coalesce(p.nombre, '')
+                     FROM sistema x LEFT JOIN planta p ON p.id = x.planta_id""",
+    },
+    "subsistema": {
+        "codigo": 5, "tabla": "subsistema", "pk": "id",
+        "select": f"""SELECT x.id * 8 + 5, 'subsistema', x.id, x.codigo || ' ' || x.nombre,
+                             coalesce(x.descripcion, ''), coalesce(p.nombre, '') || {_SEPARADOR_SQL} || coalesce(s.nombre, '')
+                      FROM subsistema x
+                      LEFT JOIN sistema s ON s.id = x.sistema_id
+                      LEFT JOIN planta p ON p.id = s.planta_id""",
+    },
+    "equipo": {
+        "codigo": 6, "tabla": "equipo", "pk": "id",
+        "select": f"""SELECT x.id * 8 + 6, 'equipo', x.id, x.nombre, coalesce(x.ubicacion, ''),
+                             coalesce(p.nombre, '') || {_SEPARADOR_SQL} || coalesce(s.nombre, '') || {_SEPARADOR_SQL} || coalesce(ss.nombre, '')
+                      FROM equipo x
+                      LEFT JOIN subsistema ss ON ss.id = x.subsistema_id
+                      LEFT JOIN sistema s ON s.id = ss.sistema_id
+                      LEFT JOIN planta p ON p.id = s.planta_id""",
+    },
+    "persona": {
+        "codigo": 7, "tabla": "persona", "pk": "identificacion",
+        "select": """SELECT x.identificacion * 8 + 7, 'persona', x.identificacion, x.nombres,
+                            coalesce(c.descripcion, ''), ''
+                     FROM persona x LEFT JOIN cargo c ON c.id = x.cargo_id""",
+    },
+}
+
+# Documentos que dependen de un registro: tabla -> (columnas que cambian la ruta
+# o el detalle de otros documentos, [(tipo dependiente, condición sobre x)])
+_DEPENDIENTES: Dict[str, Any] = {
+    "cliente": (["nombre"], [
+        ("contrato", "x.cliente_id = new.id"),
+        ("planta", "x.contrato_id IN (SELECT id FROM contrato WHERE cliente_id = new.id)"),
+    ]),
+    "contrato": (["nombre", "cliente_id"], [
+        ("planta", "x.contrato_id = new.id"),
+    ]),
+    "planta": (["nombre"], [
+        ("sistema", "x.planta_id = new.id"),
+        ("subsistema", "x.sistema_id IN (SELECT id FROM sistema WHERE planta_id = new.id)"),
+        ("equipo", """x.subsistema_id IN (SELECT ss.id FROM subsistema ss JOIN sistema s ON s.id = ss.sistema_id
+                                          WHERE s.planta_id = new.id)"""),
+    ]),
+    "sistema": (["nombre", "planta_id"], [
+        ("subsistema", "x.sistema_id = new.id"),
+        ("equipo", "x.subsistema_id IN (SELECT id FROM subsistema WHERE sistema_id = new.id)"),
+    ]),
+    "subsistema": (["nombre", "sistema_id"], [
+        ("equipo", "x.subsistema_id = new.id"),
+    ]),
+    "cargo": (["descripcion"], [
+        ("persona", "x.cargo_id = new.id"),
+    ]),
+}
+
+
+def _insertar_documentos(tipo: str, condicion: str) -> str:
+    columnas = "rowid, tipo, entidad_id, titulo, detalle, ruta"
+    return f"INSERT OR REPLACE INTO {TABLA_BUSQUEDA_GLOBAL}({columnas}) {DOCUMENTOS_BUSQUEDA[tipo]['select']} WHERE {condicion};"
+
+
+def _ddl_busqueda_global() -> List[str]:
+    """Tabla virtual y triggers del índice global"""
+    ddl = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA_GLOBAL} USING fts5(
+            tipo UNINDEXED, entidad_id UNINDEXED, titulo, detalle, ruta,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )"""
+    ]
+    for tipo, documento in DOCUMENTOS_BUSQUEDA.items():
+        tabla, pk, codigo = documento["tabla"], documento["pk"], documento["codigo"]
+        propio = _insertar_documentos(tipo, f"x.{pk} = new.{pk}")
+        ddl += [
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_bg_ai AFTER INSERT ON {tabla} BEGIN {propio} END",
+            f"""CREATE TRIGGER IF NOT EXISTS {tabla}_bg_au AFTER UPDATE ON {tabla} BEGIN
+                DELETE FROM {TABLA_BUSQUEDA_GLOBAL} WHERE rowid = old.{pk} * {_FACTOR_ROWID} + {codigo};
+                {propio}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {tabla}_bg_ad AFTER DELETE ON {tabla} BEGIN
+                DELETE FROM {TABLA_BUSQUEDA_GLOBAL} WHERE rowid = old.{pk} * {_FACTOR_ROWID} + {codigo};
+            END""",
+        ]
+    for tabla, (columnas, dependientes) in _DEPENDIENTES.items():
+        cuerpo = "\n".join(_insertar_documentos(tipo, condicion) for tipo, condicion in dependientes)
+        ddl.append(
+            f"""CREATE TRIGGER IF NOT EXISTS {tabla}_bg_au_dependientes
+                AFTER UPDATE OF {", ".join(columnas)} ON {tabla} BEGIN {cuerpo} END"""
+        )
+    return ddl
+
+
+DDL_BUSQUEDA_GLOBAL: List[str] = _ddl_busqueda_global()
+
+
+def crear_busqueda_equipos(conn: Connection) -> bool:
+    """
+    Crea la tabla FTS y sus triggers si no existen. Si la tabla es nueva,
+    la llena con los equipos ya existentes.
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        True si la tabla se creó (y se llenó) en esta llamada
+    """
+    existia = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA_FTS_EQUIPOS,)
+    ).first() is not None
+    for sentencia in DDL_FTS_EQUIPOS:
+        conn.exec_driver_sql(sentencia)
+    if not existia:
+        reconstruir_busqueda_equipos(conn)
+    return not existia
+
+
+def reconstruir_busqueda_equipos(conn: Connection) -> int:
+    """
+    Vuelve a generar el índice completo a partir de las tablas (reparación)
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        Cantidad de equipos indexados
+    """
+    conn.exec_driver_sql(f"DELETE FROM {TABLA_FTS_EQUIPOS}")
+    return conn.exec_driver_sql(
+        f"INSERT INTO {TABLA_FTS_EQUIPOS}(rowid, nombre, ubicacion, fabricante, modelo, tipo_activo) {_SELECT_DOCUMENTO}"
+    ).rowcount
+
+
+def crear_busqueda_global(conn: Connection) -> bool:
+    """
+    Crea el índice global y sus triggers si no existen. Si la tabla es
+    nueva, la llena con los registros ya existentes.
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        True si la tabla se creó (y se llenó) en esta llamada
+    """
+    existia = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA_BUSQUEDA_GLOBAL,)
+    ).first() is not None
+    for sentencia in DDL_BUSQUEDA_GLOBAL:
+        conn.exec_driver_sql(sentencia)
+    if not existia:
+        reconstruir_busqueda_global(conn)
+    return not existia
+
+
+def reconstruir_busqueda_global(conn: Connection) -> int:
+    """
+    Vuelve a generar el índice global completo a partir de las tablas (reparación)
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        Cantidad de documentos indexados
+    """
+    conn.exec_driver_sql(f"DELETE FROM {TABLA_BUSQUEDA_GLOBAL}")
+    return sum(
+        conn.exec_driver_sql(_insertar_documentos(tipo, "1 = 1").rstrip(";")).rowcount
+        for tipo in DOCUMENTOS_BUSQUEDA
+    )
+
+
+def buscar_global(conn: Connection, texto: str, tipos: Optional[Sequence[str]] = None,
+                  skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Busca en todos los tipos de documento del índice global. Las palabras se
+    buscan completas salvo la última, que se busca como prefijo
+
+    Args:
+        conn: Conexión SQLite
+        texto: Texto libre a buscar
+        tipos: Tipos a incluir (por defecto todos)
+        skip: Cantidad de resultados a omitir (para paginación)
+        limit: Cantidad máxima de resultados
+
+    Returns:
+        Documentos (tipo, id, título, detalle, ruta, relevancia) del más al menos relevante
+    """
+    consulta = consulta_fts(texto, prefijo_solo_ultima=True)
+    if consulta is None:
+        return []
+    parametros: Dict[str, Any] = {"consulta": consulta, "skip": skip, "limit": limit}
+    filtro_tipos = ""
+    if tipos:
+        marcadores = ", ".join(f":tipo{i}" for i in range(len(tipos)))
+        filtro_tipos = f"AND tipo IN ({marcadores})"
+        parametros.update({f"tipo{i}": tipo for i, tipo in enumerate(tipos)})
+    pesos = ", ".join(str(p) for p in PESOS_BUSQUEDA_GLOBAL)
+    # Se ordena y pagina en SQL: cualquier página respeta el orden por relevancia
+    # de todas las coincidencias (el rowid desempata para que las páginas no se solapen)
+    filas = conn.execute(text(f"""
+        SELECT tipo, entidad_id AS id, titulo, nullif(detalle, '') AS detalle, nullif(ruta, '') AS ruta,
+               bm25({TABLA_BUSQUEDA_GLOBAL}, {pesos}) AS relevancia
+        FROM {TABLA_BUSQUEDA_GLOBAL}
+        WHERE {TABLA_BUSQUEDA_GLOBAL} MATCH :consulta {filtro_tipos}
+        ORDER BY relevancia, rowid
+        LIMIT :limit OFFSET :skip
+    """), parametros)
+    return [dict(fila._mapping) for fila in filas]
+
+
+def consulta_fts(texto: str, prefijo_solo_ultima: bool = False) -> Optional[str]:
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: todas las
+    palabras deben aparecer y se buscan como prefijo. Los operadores y signos
+    de la sintaxis FTS5 se descartan.
+
+    Args:
+        texto: Texto libre ingresado por el usuario
+        prefijo_solo_ultima: Buscar como prefijo solo la última palabra (la que
+            se está escribiendo) y las demás completas. En índices donde una
+            palabra aparece en casi todos los documentos (la ruta de la
+            búsqueda global) un prefijo obliga a FTS5 a reunir toda su lista
+            de documentos, mientras que una palabra completa se recorre solo
+            hasta completar el límite.
+
+    Returns:
+        Expresión MATCH, o None si el texto no tiene palabras
+    """
+    palabras = re.findall(r"\w+", texto)
+    if not palabras:
+        return None
+    if prefijo_solo_ultima:
+        return " ".join([f'"{palabra}"' for palabra in palabras[:-1]] + [f'"{palabras[-1]}"*'])
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
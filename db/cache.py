@@ -0,0 +1,57 @@
+"""
+Caché en memoria de resultados de consultas, con vencimiento por tiempo.
+
+Pensada para agregados costosos que se repiten con los mismos parámetros
+(por ejemplo, las facetas del filtro de equipos). Es local a cada proceso y
+no se invalida con las escrituras: un resultado puede quedar desactualizado
+hasta que se cumpla su TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+
+class CacheTTL:
+    """
+    Diccionario acotado cuyas entradas vencen después de `ttl` segundos.
+    Cuando se llena, descarta la entrada usada hace más tiempo.
+    """
+
+    def __init__(self, ttl: float, max_entradas: int = 256):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._candado = threading.Lock()
+        self._entradas: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """
+        Retorna el valor guardado para la clave, o lo calcula y lo guarda
+
+        Args:
+            clave: Clave del resultado (por ejemplo, la tupla de filtros)
+            calcular: Función que produce el valor si no hay uno vigente
+
+        Returns:
+            Valor vigente para la clave
+        """
+        if self.ttl <= 0:
+            return calcular()
+        with self._candado:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and time.monotonic() - entrada[0] < self.ttl:
+                self._entradas.move_to_end(clave)
+                return entrada[1]
+        # Se calcula fuera del candado para no serializar las consultas
+        valor = calcular()
+        with self._candado:
+            self._entradas[clave] = (time.monotonic(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return valor
+
+    def limpiar(self) -> None:
+        """Descarta todas las entradas"""
+        with self._candado:
+            self._entradas.clear()
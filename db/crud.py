@@ -3,19 +3,73 @@ Operaciones CRUD genéricas para todos los modelos de la aplicación.
 Este módulo proporciona funciones reutilizables para Create, Read, Update, Delete
 que pueden usarse con cualquier modelo SQLModel.
 """
-from typing import Type, TypeVar, Generic, List, Optional, Any, Dict, Union, Callable
+from typing import Type, TypeVar, Generic, List, Optional, Any, Dict, Union, Callable, Iterable, Sequence, Tuple
 from fastapi import HTTPException
 from pydantic import BaseModel
 from sqlmodel import SQLModel, Session, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import literal, null, or_, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import joinedload
 
+# Registros por sentencia en las operaciones masivas
+TAMANO_LOTE_UPSERT = 500
+
 # Definir un tipo genérico para modelos
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 ReadSchemaType = TypeVar("ReadSchemaType", bound=BaseModel)
 
+def resolver_foraneas(
+    session: Session,
+    modelo: Type[SQLModel],
+    valores: Dict[str, Iterable[Any]],
+    *,
+    extra: Optional[Dict[str, str]] = None
+) -> Dict[str, Dict[Any, Any]]:
+    """
+    Busca en una sola consulta (un SELECT por tabla referenciada, unidos con
+    UNION ALL) cuáles de los valores de llaves foráneas existen
+    
+    Args:
+        session: Sesión de base de datos
+        modelo: Modelo que tiene las llaves foráneas
+        valores: Valores a verificar por columna (ej. {"subsistema_id": [3, 7]})
+        extra: Columna de la tabla referenciada a retornar junto a cada valor
+            (ej. {"modelo_id": "fabricante_id"})
+            
+    Returns:
+        Por columna, {valor existente: valor de la columna extra o None}
+    """
+    extra = extra or {}
+    # Columnas que referencian la misma tabla comparten su consulta
+    por_destino: Dict[Any, Tuple[List[str], set]] = {}
+    for columna in modelo.__table__.columns:
+        if columna.name not in valores or not columna.foreign_keys:
+            continue
+        destino = next(iter(columna.foreign_keys)).column
+        nombres, pendientes = por_destino.setdefault((destino, extra.get(columna.name)), ([], set()))
+        nombres.append(columna.name)
+        pendientes.update(v for v in valores[columna.name] if v is not None)
+    
+    encontrados: Dict[str, Dict[Any, Any]] = {}
+    consultas = []
+    for i, ((destino, columna_extra), (nombres, pendientes)) in enumerate(por_destino.items()):
+        for nombre in nombres:
+            encontrados[nombre] = {}
+        if pendientes:
+            consultas.append(
+                select(literal(i), destino, destino.table.c[columna_extra] if columna_extra else null())
+                .where(destino.in_(pendientes))
+            )
+    if consultas:
+        grupos = list(por_destino.values())
+        for i, valor, dato_extra in session.execute(union_all(*consultas) if len(consultas) > 1 else consultas[0]):
+            for nombre in grupos[i][0]:
+                encontrados[nombre][valor] = dato_extra
+    return encontrados
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchemaType]):
     """
     Clase base para operaciones CRUD con tipos genéricos:
@@ -25,14 +79,28 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
     - ReadSchemaType: Esquema Pydantic para lectura
     """
 
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        claves_naturales: Optional[Sequence[str]] = None,
+        mensajes_foraneas: Optional[Dict[str, str]] = None
+    ):
         """
         Inicializa el objeto CRUD con el modelo específico
         
         Args:
             model: Clase del modelo SQLModel
+            claves_naturales: Columnas que identifican un registro en upsert_many
+                (deben tener un índice único); por defecto la clave primaria
+            mensajes_foraneas: Mensaje 404 por llave foránea, usado por
+                validate_foreign_keys y al escribir un registro que referencia
+                uno inexistente (ej. {"subsistema_id": "Subsistema no encontrado"})
         """
         self.model = model
+        self.claves_naturales: Tuple[str, ...] = tuple(
+            claves_naturales or (c.name for c in model.__table__.primary_key.columns)
+        )
+        self.mensajes_foraneas: Dict[str, str] = mensajes_foraneas or {}
 
     def get(self, session: Session, id: Any, *, options: List[Callable] = None) -> Optional[ModelType]:
         """
@@ -46,7 +114,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
         Returns:
             Instancia del modelo o None si no se encuentra
         """
-        query = select(self.model).where(self.model.id == id)
+        pk = list(self.model.__table__.primary_key.columns)[0]
+        query = select(self.model).where(pk == id)
         
         if options:
             for option in options:
@@ -115,26 +184,22 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
             Instancia creada del modelo
         
         Raises:
-            HTTPException: Si ocurre un error de integridad
+            HTTPException: Si ocurre un error de integridad (404 si un registro
+                referenciado no existe, ver _error_integridad)
         """
+        if isinstance(obj_in, dict):
+            obj_data = obj_in
+        else:
+            obj_data = obj_in.dict(exclude_unset=True)
+        
         try:
-            if isinstance(obj_in, dict):
-                obj_data = obj_in
-            else:
-                obj_data = obj_in.dict(exclude_unset=True)
-                
             db_obj = self.model(**obj_data)  # type: ignore
             session.add(db_obj)
             session.commit()
             session.refresh(db_obj)
             return db_obj
         except IntegrityError as e:
-            session.rollback()
-            error_msg = str(e.orig)
-            if "UNIQUE constraint failed" in error_msg:
-                field = error_msg.split(":")[-1].strip() if ":" in error_msg else "un campo"
-                raise HTTPException(status_code=409, detail=f"Ya existe un registro con el mismo valor en {field}")
-            raise HTTPException(status_code=400, detail=f"Error de integridad: {error_msg}")
+            raise self._error_integridad(session, e, [obj_data])
 
     def update(
         self,
@@ -153,6 +218,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
             
         Returns:
             Instancia actualizada del modelo
+            
+        Raises:
+            HTTPException: Si ocurre un error de integridad (ver _error_integridad)
         """
         if isinstance(obj_in, dict):
             update_data = obj_in
@@ -162,12 +230,85 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
         for field in update_data:
             if hasattr(db_obj, field):
                 setattr(db_obj, field, update_data[field])
-                
-        session.add(db_obj)
-        session.commit()
+        
+        try:
+            session.add(db_obj)
+            session.commit()
+        except IntegrityError as e:
+            raise self._error_integridad(session, e, [update_data])
         session.refresh(db_obj)
         return db_obj
 
+    def update_many(self, session: Session, ids: Sequence[Any], valores: Dict[str, Any]) -> int:
+        """
+        Actualiza con una sola sentencia UPDATE los registros con los IDs dados.
+        Las filas que ya tienen esos valores no se escriben.
+        
+        Args:
+            session: Sesión de base de datos
+            ids: IDs de los registros a actualizar
+            valores: Columnas y valores a asignar
+            
+        Returns:
+            Cantidad de registros modificados
+            
+        Raises:
+            HTTPException: Si la actualización viola una restricción de integridad
+        """
+        ids = {i for i in ids if i is not None}
+        if not ids or not valores:
+            return 0
+        tabla = self.model.__table__
+        pk = list(tabla.primary_key.columns)[0]
+        sentencia = (
+            update(tabla)
+            .where(pk.in_(ids), or_(*(tabla.c[c].is_distinct_from(v) for c, v in valores.items())))
+            .values(**valores)
+        )
+        try:
+            modificados = session.execute(sentencia).rowcount
+            session.commit()
+        except IntegrityError as e:
+            raise self._error_integridad(session, e, [valores])
+        return modificados
+    
+    def move_many(
+        self,
+        session: Session,
+        ids: Sequence[Any],
+        campo: str,
+        modelo_destino: Type[SQLModel],
+        destino_id: Any
+    ) -> Dict[str, int]:
+        """
+        Mueve varios registros a un mismo padre: valida una sola vez que el
+        destino y todos los registros existan y los actualiza con un solo UPDATE
+        
+        Args:
+            session: Sesión de base de datos
+            ids: IDs de los registros a mover
+            campo: Llave foránea hacia el padre (ej. "subsistema_id")
+            modelo_destino: Modelo del padre
+            destino_id: ID del nuevo padre
+            
+        Returns:
+            Diccionario con los registros movidos y los que ya estaban en el destino
+            
+        Raises:
+            HTTPException: Si el destino o alguno de los registros no existe
+        """
+        if session.get(modelo_destino, destino_id) is None:
+            raise HTTPException(status_code=404, detail=f"{modelo_destino.__name__} con id {destino_id} no encontrado")
+        ids = set(ids)
+        faltantes = ids - self.exists_many(session, ids)
+        if faltantes:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Registros de {self.model.__name__} no encontrados: {sorted(faltantes)}"
+            )
+        movidos = self.update_many(session, ids, {campo: destino_id})
+        return {"movidos": movidos, "sin_cambios": len(ids) - movidos}
+    
     def remove(self, session: Session, *, id: Any) -> ModelType:
         """
         Elimina un registro
@@ -180,16 +321,118 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
             La instancia eliminada
             
         Raises:
-            HTTPException: Si el registro no existe
+            HTTPException: 404 si el registro no existe, 409 si otros registros
+                lo referencian
         """
         obj = session.get(self.model, id)
         if not obj:
             raise HTTPException(status_code=404, detail=f"{self.model.__name__} con id {id} no encontrado")
         
-        session.delete(obj)
-        session.commit()
+        try:
+            session.delete(obj)
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail=f"{self.model.__name__} con id {id} tiene registros asociados y no se puede eliminar"
+            )
         return obj
     
+    def upsert_many(
+        self,
+        session: Session,
+        registros: List[Union[BaseModel, Dict[str, Any]]],
+        *,
+        tamano_lote: int = TAMANO_LOTE_UPSERT
+    ) -> Dict[str, int]:
+        """
+        Inserta o actualiza registros identificados por sus claves naturales
+        con INSERT ... ON CONFLICT DO UPDATE del dialecto, por lotes y en una
+        sola transacción. Solo se escriben las filas cuyos valores cambian.
+        
+        Args:
+            session: Sesión de base de datos
+            registros: Datos de cada registro (esquemas o diccionarios); de los
+                esquemas solo se toman los campos enviados
+            tamano_lote: Registros por sentencia
+            
+        Returns:
+            Cantidad de registros insertados, actualizados y sin cambios
+            
+        Raises:
+            HTTPException: Si a un registro le faltan las claves naturales o
+                la escritura viola una restricción
+        """
+        tabla = self.model.__table__
+        claves = self.claves_naturales
+        dialecto = session.get_bind().dialect.name
+        if dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            raise HTTPException(status_code=501, detail=f"Upsert no soportado para el dialecto {dialecto}")
+
+        # Sin repetir claves: el último registro enviado prevalece
+        por_clave: Dict[tuple, Dict[str, Any]] = {}
+        for registro in registros:
+            datos = registro if isinstance(registro, dict) else registro.dict(exclude_unset=True)
+            datos = {k: v for k, v in datos.items() if k in tabla.columns}
+            if any(datos.get(c) is None for c in claves):
+                raise HTTPException(status_code=400, detail=f"Cada registro debe incluir {', '.join(claves)}")
+            por_clave[tuple(datos[c] for c in claves)] = datos
+
+        columnas_clave = [tabla.c[c] for c in claves]
+        resultado = {"insertados": 0, "actualizados": 0, "sin_cambios": 0}
+        lista = list(por_clave.items())
+        try:
+            for inicio in range(0, len(lista), tamano_lote):
+                lote = lista[inicio:inicio + tamano_lote]
+
+                # Estado actual de las claves del lote en una sola consulta
+                filtro = (
+                    columnas_clave[0].in_([k[0] for k, _ in lote]) if len(claves) == 1
+                    else tuple_(*columnas_clave).in_([k for k, _ in lote])
+                )
+                actuales = {
+                    tuple(fila._mapping[c] for c in claves): fila._mapping
+                    for fila in session.execute(select(tabla).where(filtro))
+                }
+                for clave, datos in lote:
+                    actual = actuales.get(clave)
+                    if actual is None:
+                        resultado["insertados"] += 1
+                    elif any(actual[c] != v for c, v in datos.items()):
+                        resultado["actualizados"] += 1
+                    else:
+                        resultado["sin_cambios"] += 1
+
+                # executemany exige el mismo conjunto de columnas por sentencia
+                grupos: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+                for _, datos in lote:
+                    grupos.setdefault(tuple(sorted(datos)), []).append(datos)
+                for columnas, filas in grupos.items():
+                    sentencia = insert(tabla)
+                    actualizables = [c for c in columnas if c not in claves and not tabla.c[c].primary_key]
+                    if actualizables:
+                        sentencia = sentencia.on_conflict_do_update(
+                            index_elements=columnas_clave,
+                            set_={c: sentencia.excluded[c] for c in actualizables},
+                            where=or_(*(tabla.c[c].is_distinct_from(sentencia.excluded[c]) for c in actualizables))
+                        )
+                    else:
+                        sentencia = sentencia.on_conflict_do_nothing(index_elements=columnas_clave)
+                    session.execute(sentencia, filas)
+            session.commit()
+        except IntegrityError as e:
+            raise self._error_integridad(session, e, list(por_clave.values()))
+        except OperationalError as e:
+            session.rollback()
+            # Sucede si falta el índice único de las claves naturales (ej. datos duplicados previos)
+            raise HTTPException(status_code=409, detail=f"No se pudo sincronizar por {', '.join(claves)}: {e.orig}")
+        return resultado
+
     def exists(self, session: Session, id: Any) -> bool:
         """
         Verifica si existe un registro con el ID dado
@@ -204,6 +447,93 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType, ReadSchema
         obj = session.get(self.model, id)
         return obj is not None
 
+    def validate_foreign_keys(
+        self,
+        session: Session,
+        registros: Sequence[Union[BaseModel, Dict[str, Any]]],
+        *,
+        extra: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Dict[Any, Any]]:
+        """
+        Verifica que existan todos los registros referenciados por uno o varios
+        registros a escribir, con una sola consulta (ver resolver_foraneas)
+        
+        Args:
+            session: Sesión de base de datos
+            registros: Registros a validar (esquemas o diccionarios, solo se
+                validan los campos presentes y no nulos)
+            extra: Columna de la tabla referenciada a retornar junto a cada valor
+            
+        Returns:
+            Por columna, {valor existente: valor de la columna extra o None}
+            
+        Raises:
+            HTTPException: 404 con el mensaje de la primera llave que no existe
+        """
+        filas = [r.dict(exclude_unset=True) if isinstance(r, BaseModel) else r for r in registros]
+        foraneas = [c.name for c in self.model.__table__.columns if c.foreign_keys]
+        valores = {c: {f[c] for f in filas if f.get(c) is not None} for c in foraneas}
+        encontrados = resolver_foraneas(session, self.model, valores, extra=extra)
+        for columna in foraneas:
+            faltantes = valores[columna] - encontrados.get(columna, {}).keys()
+            if faltantes:
+                detalle = self.mensajes_foraneas.get(columna) or (
+                    f"No existe el registro referenciado por {columna}: {sorted(faltantes)}"
+                )
+                raise HTTPException(status_code=404, detail=detalle)
+        return encontrados
+
+    def _error_integridad(
+        self,
+        session: Session,
+        error: IntegrityError,
+        registros: Sequence[Dict[str, Any]]
+    ) -> HTTPException:
+        """
+        Revierte la transacción y traduce un error de integridad de una
+        escritura a la respuesta HTTP que corresponde
+
+        Args:
+            session: Sesión de base de datos
+            error: Error lanzado por la escritura
+            registros: Datos de los registros que se intentaron escribir
+
+        Returns:
+            409 si se repite un valor único, 404 con el mensaje de la llave
+            foránea cuyo registro referenciado no existe, 400 en otro caso
+        """
+        session.rollback()
+        error_msg = str(error.orig)
+        if "UNIQUE constraint failed" in error_msg:
+            field = error_msg.split(":")[-1].strip() if ":" in error_msg else "un campo"
+            return HTTPException(status_code=409, detail=f"Ya existe un registro con el mismo valor en {field}")
+        # SQLite no indica qué llave foránea falló, y los triggers que copian
+        # datos del registro referenciado (ej. la ruta de la jerarquía) pueden
+        # fallar antes que ella: solo en este caso de error se consulta cuál
+        # referencia no existe, para responder el mismo 404 de siempre
+        try:
+            self.validate_foreign_keys(session, registros)
+        except HTTPException as e:
+            return e
+        return HTTPException(status_code=400, detail=f"Error de integridad: {error_msg}")
+
+    def exists_many(self, session: Session, ids: Sequence[Any]) -> set:
+        """
+        Verifica en una sola consulta cuáles de los IDs dados existen
+        
+        Args:
+            session: Sesión de base de datos
+            ids: IDs a verificar
+            
+        Returns:
+            Conjunto con los IDs que existen
+        """
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return set()
+        pk = list(self.model.__table__.primary_key.columns)[0]
+        return set(session.exec(select(pk).where(pk.in_(ids))).all())
+
 
 # Ejemplo de uso:
 # crud_equipo = CRUDBase[Equipo, EquipoCreate, EquipoUpdate, EquipoRead](Equipo)
\ No newline at end of file
@@ -233,5 +233,8 @@ class CRUDContratoUsuario(CRUDBase[ContratoUsuario, ContratoUsuario, ContratoUsu
 
 # Instancias CRUD para los modelos
 crud_cliente = CRUDCliente(Cliente)
-crud_contrato = CRUDContrato(Contrato)
-crud_contrato_usuario = CRUDContratoUsuario(ContratoUsuario)
\ No newline at end of file
+crud_contrato = CRUDContrato(Contrato, mensajes_foraneas={"cliente_id": "Cliente no encontrado"})
+crud_contrato_usuario = CRUDContratoUsuario(ContratoUsuario, mensajes_foraneas={
+    "contrato_id": "Contrato no encontrado",
+    "usuario_id": "Usuario no encontrado",
+})
\ No newline at end of file
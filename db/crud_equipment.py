@@ -1,23 +1,75 @@
 """
 Operaciones CRUD específicas para equipos, tipos de activos, fabricantes y modelos.
 """
+import os
+
+from pydantic import BaseModel
+from sqlalchemy import and_, func, literal, null, text, union_all
 from sqlalchemy.orm import joinedload
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Sequence, Union
 from sqlmodel import Session, select
 
 from db.crud import CRUDBase
 from models.equipment import (
-    Equipo, EquipoCreate, EquipoUpdate, EquipoRead, EquipoReadDetallado,
+    Equipo, EquipoCreate, EquipoUpdate, EquipoRead, EquipoReadDetallado, EquipoBusqueda,
     TipoActivo, TipoActivoCreate, TipoActivoUpdate, TipoActivoRead,
     Fabricante, FabricanteCreate, FabricanteUpdate, FabricanteRead,
     Modelo, ModeloCreate, ModeloUpdate, ModeloRead, ModeloReadDetallado
 )
 from models.organization import SubSistema
+from db.busqueda import TABLA_FTS_EQUIPOS, PESOS_FTS_EQUIPOS, consulta_fts
+from db.cache import CacheTTL
+from db.jerarquia import en_subarbol, ruta_jerarquia
+
+# Segundos durante los que se reutilizan los conteos de facetas de un filtro
+FACETAS_CACHE_SEGUNDOS = float(os.getenv("FACETAS_CACHE_SEGUNDOS", "30"))
+
+cache_facetas = CacheTTL(FACETAS_CACHE_SEGUNDOS)
+
+# Facetas del filtro de equipos: columna de Equipo, tabla referenciada y columna con el nombre
+_FACETAS_EQUIPOS = {
+    "tipo_activo": ("tipo_activo_id", TipoActivo, TipoActivo.descripcion),
+    "fabricante": ("fabricante_id", Fabricante, Fabricante.nombre),
+    "modelo": ("modelo_id", Modelo, Modelo.nombre),
+    "subsistema": ("subsistema_id", SubSistema, SubSistema.nombre),
+}
 
 # CRUD para Equipo con métodos personalizados
 class CRUDEquipo(CRUDBase[Equipo, EquipoCreate, EquipoUpdate, EquipoRead]):
     """Operaciones CRUD específicas para el modelo Equipo"""
     
+    # Toda escritura de equipos invalida la caché de facetas (ver contar_facetas)
+    def create(self, session: Session, *, obj_in: Union[EquipoCreate, Dict[str, Any]]) -> Equipo:
+        """Crea un equipo (ver CRUDBase.create); invalida la caché de facetas"""
+        equipo = super().create(session, obj_in=obj_in)
+        cache_facetas.limpiar()
+        return equipo
+    
+    def update(self, session: Session, *, db_obj: Equipo, obj_in: Union[EquipoUpdate, Dict[str, Any]]) -> Equipo:
+        """Actualiza un equipo (ver CRUDBase.update); invalida la caché de facetas"""
+        equipo = super().update(session, db_obj=db_obj, obj_in=obj_in)
+        cache_facetas.limpiar()
+        return equipo
+    
+    def remove(self, session: Session, *, id: Any) -> Equipo:
+        """Elimina un equipo (ver CRUDBase.remove); invalida la caché de facetas"""
+        equipo = super().remove(session, id=id)
+        cache_facetas.limpiar()
+        return equipo
+    
+    def upsert_many(self, session: Session, registros: List[Union[BaseModel, Dict[str, Any]]], **opciones: Any) -> Dict[str, int]:
+        """Inserta o actualiza equipos (ver CRUDBase.upsert_many); invalida la caché de facetas"""
+        resultado = super().upsert_many(session, registros, **opciones)
+        cache_facetas.limpiar()
+        return resultado
+    
+    def update_many(self, session: Session, ids: Sequence[int], valores: Dict[str, Any]) -> int:
+        """Actualización masiva (ver CRUDBase.update_many); invalida la caché de facetas"""
+        modificados = super().update_many(session, ids, valores)
+        if modificados:
+            cache_facetas.limpiar()
+        return modificados
+    
     def get_detallado(self, session: Session, id: int) -> Optional[Equipo]:
         """
         Obtiene un equipo con todas sus relaciones cargadas
@@ -56,29 +108,213 @@ class CRUDEquipo(CRUDBase[Equipo, EquipoCreate, EquipoUpdate, EquipoRead]):
         self, 
         session: Session, 
         fabricante_id: Optional[int] = None,
-        modelo_id: Optional[int] = None
+        modelo_id: Optional[int] = None,
+        *,
+        subsistema_id: Optional[int] = None,
+        tipo_activo_id: Optional[int] = None,
+        skip: int = 0,
+        limit: Optional[int] = None
     ) -> List[Equipo]:
         """
-        Lista equipos filtrados por fabricante y/o modelo
+        Lista equipos filtrados por fabricante, modelo, subsistema y/o tipo de activo
         
         Args:
             session: Sesión de base de datos
             fabricante_id: ID opcional del fabricante
             modelo_id: ID opcional del modelo
+            subsistema_id: ID opcional del subsistema
+            tipo_activo_id: ID opcional del tipo de activo
+            skip: Cantidad de registros a omitir (para paginación)
+            limit: Cantidad máxima de registros (por defecto todos)
             
         Returns:
-            Lista de equipos que cumplen con los criterios
+            Lista de equipos que cumplen con los criterios, ordenados por ID
+        """
+        filtros = self._filtros(fabricante_id=fabricante_id, modelo_id=modelo_id,
+                                subsistema_id=subsistema_id, tipo_activo_id=tipo_activo_id)
+        query = select(Equipo).where(*filtros.values()).order_by(Equipo.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+            
+        return session.exec(query).all()
+    
+    @staticmethod
+    def _filtros(**valores: Optional[int]) -> Dict[str, Any]:
+        """Condiciones WHERE de los filtros con valor, por nombre de columna"""
+        return {
+            columna: getattr(Equipo, columna) == valor
+            for columna, valor in valores.items() if valor is not None
+        }
+    
+    def contar_facetas(
+        self,
+        session: Session,
+        *,
+        fabricante_id: Optional[int] = None,
+        modelo_id: Optional[int] = None,
+        subsistema_id: Optional[int] = None,
+        tipo_activo_id: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        query = select(Equipo)
+        Cuenta los equipos del filtro y los agrupa por cada faceta en una sola consulta.
+        Cada faceta aplica todos los filtros excepto el suyo, así sus conteos muestran
+        cuántos equipos quedarían al cambiar ese valor. El resultado se guarda
+        FACETAS_CACHE_SEGUNDOS por combinación de filtros.
         
-        if fabricante_id is not None:
-            query = query.where(Equipo.fabricante_id == fabricante_id)
+        Args:
+            session: Sesión de base de datos
+            fabricante_id: ID opcional del fabricante
+            modelo_id: ID opcional del modelo
+            subsistema_id: ID opcional del subsistema
+            tipo_activo_id: ID opcional del tipo de activo
             
-        if modelo_id is not None:
-            query = query.where(Equipo.modelo_id == modelo_id)
+        Returns:
+            Diccionario con "total" y "facetas" ({faceta: [{id, nombre, cantidad}]},
+            de mayor a menor cantidad)
+        """
+        valores = {"tipo_activo_id": tipo_activo_id, "fabricante_id": fabricante_id,
+                   "modelo_id": modelo_id, "subsistema_id": subsistema_id}
+        clave = tuple(valores.values())
+        return cache_facetas.obtener(clave, lambda: self._calcular_facetas(session, valores))
+    
+    def _calcular_facetas(self, session: Session, valores: Dict[str, Optional[int]]) -> Dict[str, Any]:
+        filtros = self._filtros(**valores)
+        ramas = [
+            select(literal("total").label("faceta"), null().label("id"), null().label("nombre"),
+                   func.count().label("cantidad")).select_from(Equipo).where(*filtros.values())
+        ]
+        for faceta, (columna, tabla, nombre) in _FACETAS_EQUIPOS.items():
+            # Faceta disyuntiva: se omite el filtro de su propia columna
+            condiciones = [c for col, c in filtros.items() if col != columna]
+            conteo = (
+                select(getattr(Equipo, columna).label("id"), func.count().label("cantidad"))
+                .where(*condiciones)
+                .group_by(getattr(Equipo, columna))
+                .subquery()
+            )
+            ramas.append(
+                select(literal(faceta).label("faceta"), conteo.c.id, nombre.label("nombre"), conteo.c.cantidad)
+                .select_from(conteo.outerjoin(tabla, tabla.id == conteo.c.id))
+            )
+        
+        resultado: Dict[str, Any] = {"total": 0, "facetas": {faceta: [] for faceta in _FACETAS_EQUIPOS}}
+        for fila in session.execute(union_all(*ramas)):
+            if fila.faceta == "total":
+                resultado["total"] = fila.cantidad
+            else:
+                resultado["facetas"][fila.faceta].append(
+                    {"id": fila.id, "nombre": fila.nombre, "cantidad": fila.cantidad}
+                )
+        for valores_faceta in resultado["facetas"].values():
+            valores_faceta.sort(key=lambda v: (-v["cantidad"], v["nombre"] or ""))
+        return resultado
+    
+    def get_by_ruta(self, session: Session, prefijo: str, *, skip: int = 0, limit: int = 100) -> List[Equipo]:
+        """
+        Lista los equipos de un subárbol de la jerarquía (contrato, planta, sistema o subsistema)
+        
+        Args:
+            session: Sesión de base de datos
+            prefijo: Ruta materializada del nodo raíz (ver db/jerarquia.py)
+            skip: Cantidad de registros a omitir (para paginación)
+            limit: Cantidad máxima de registros a retornar
+            
+        Returns:
+            Equipos del subárbol en el orden de la jerarquía
             
+        Raises:
+            HTTPException: Si la base de datos no es SQLite
+        """
+        from fastapi import HTTPException
+        
+        if session.get_bind().dialect.name != "sqlite":
+            raise HTTPException(status_code=501, detail="Las consultas por jerarquía requieren SQLite")
+        
+        query = (
+            select(Equipo)
+            .join(ruta_jerarquia, and_(ruta_jerarquia.c.entidad_id == Equipo.id, en_subarbol("equipo", prefijo)))
+            .order_by(ruta_jerarquia.c.ruta)
+            .offset(skip)
+            .limit(limit)
+        )
         return session.exec(query).all()
     
+    def buscar(self, session: Session, texto: str, *, skip: int = 0, limit: int = 20) -> List[EquipoBusqueda]:
+        """
+        Busca equipos por palabras (o prefijos) de su nombre, ubicación,
+        fabricante, modelo o tipo de activo, sin distinguir tildes ni mayúsculas
+        
+        Args:
+            session: Sesión de base de datos
+            texto: Texto a buscar
+            skip: Cantidad de resultados a omitir (para paginación)
+            limit: Cantidad máxima de resultados
+            
+        Returns:
+            Equipos ordenados del más al menos relevante
+            
+        Raises:
+            HTTPException: Si la base de datos no es SQLite
+        """
+        from fastapi import HTTPException
+        
+        if session.get_bind().dialect.name != "sqlite":
+            raise HTTPException(status_code=501, detail="La búsqueda de texto requiere SQLite con FTS5")
+        
+        consulta = consulta_fts(texto)
+        if consulta is None:
+            return []
+        
+        pesos = ", ".join(str(p) for p in PESOS_FTS_EQUIPOS)
+        filas = session.execute(text(f"""
+            SELECT e.id, e.nombre, e.ubicacion, e.subsistema_id,
+                   nullif(f.tipo_activo, '') AS tipo_activo, nullif(f.fabricante, '') AS fabricante,
+                   nullif(f.modelo, '') AS modelo, bm25({TABLA_FTS_EQUIPOS}, {pesos}) AS relevancia
+            FROM {TABLA_FTS_EQUIPOS} f
+            JOIN equipo e ON e.id = f.rowid
+            WHERE {TABLA_FTS_EQUIPOS} MATCH :consulta
+            ORDER BY relevancia
+            LIMIT :limit OFFSET :skip
+        """), {"consulta": consulta, "limit": limit, "skip": skip})
+        return [EquipoBusqueda(**fila._mapping) for fila in filas]
+
+    def validar_modelo_fabricante(
+        self,
+        session: Session,
+        data: Dict[str, Any],
+        *,
+        fabricante_actual: Optional[int] = None
+    ) -> None:
+        """
+        Valida que el modelo pertenezca al fabricante del equipo. La existencia
+        de las referencias la verifica la base de datos al escribir.
+        
+        Args:
+            session: Sesión de base de datos
+            data: Campos del equipo a escribir
+            fabricante_actual: Fabricante ya registrado del equipo, si se actualiza
+            
+        Raises:
+            HTTPException: Si el modelo no corresponde al fabricante
+        """
+        from fastapi import HTTPException
+        
+        modelo_id = data.get("modelo_id")
+        fabricante_id = data.get("fabricante_id")
+        if fabricante_id is None:
+            fabricante_id = fabricante_actual
+        if modelo_id is None or not fabricante_id:
+            return
+        # Un modelo inexistente no se reporta aquí: lo rechaza la llave foránea (404)
+        fabricante_modelo = session.exec(select(Modelo.fabricante_id).where(Modelo.id == modelo_id)).first()
+        if fabricante_modelo is not None and fabricante_modelo != fabricante_id:
+            # Una referencia inexistente se reporta antes que la inconsistencia
+            self.validate_foreign_keys(session, [data])
+            raise HTTPException(
+                status_code=400, 
+                detail="El modelo no pertenece al fabricante especificado"
+            )
+    
     def create_with_validations(
         self, 
         session: Session, 
@@ -96,7 +332,7 @@ class CRUDEquipo(CRUDBase[Equipo, EquipoCreate, EquipoUpdate, EquipoRead]):
             Equipo creado
             
         Raises:
-            HTTPException: Si alguna validación falla
+            HTTPException: Si alguna validación falla o una referencia no existe
         """
         from fastapi import HTTPException
         
@@ -105,38 +341,16 @@ class CRUDEquipo(CRUDBase[Equipo, EquipoCreate, EquipoUpdate, EquipoRead]):
             data = obj_in.dict(exclude_unset=True)
         else:
             data = obj_in
-            
-        # Validar que existe el subsistema
-        subsistema_id = data.get("subsistema_id")
-        if not session.get(SubSistema, subsistema_id):
-            raise HTTPException(status_code=404, detail="Subsistema no encontrado")
         
-        # Validar que existe el tipo de activo
-        tipo_activo_id = data.get("tipo_activo_id")
-        if not session.get(TipoActivo, tipo_activo_id):
+        # El subsistema y el tipo de activo son obligatorios
+        if data.get("subsistema_id") is None:
+            raise HTTPException(status_code=404, detail="Subsistema no encontrado")
+        if data.get("tipo_activo_id") is None:
             raise HTTPException(status_code=404, detail="Tipo de activo no encontrado")
+        self.validar_modelo_fabricante(session, data)
         
-        # Validar fabricante si se proporciona
-        fabricante_id = data.get("fabricante_id")
-        if fabricante_id and not session.get(Fabricante, fabricante_id):
-            raise HTTPException(status_code=404, detail="Fabricante no encontrado")
-        
-        # Validar modelo si se proporciona
-        modelo_id = data.get("modelo_id")
-        if modelo_id:
-            modelo = session.get(Modelo, modelo_id)
-            if not modelo:
-                raise HTTPException(status_code=404, detail="Modelo no encontrado")
-            
-            # Validar que el modelo pertenece al fabricante especificado
-            if fabricante_id and modelo.fabricante_id != fabricante_id:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="El modelo no pertenece al fabricante especificado"
-                )
-        
-        # Crear el equipo
-        return super().create(session, obj_in=data)
+        # Crear el equipo (las llaves foráneas inexistentes se responden con 404)
+        return self.create(session, obj_in=data)
 
 # CRUD para Fabricante
 class CRUDFabricante(CRUDBase[Fabricante, FabricanteCreate, FabricanteUpdate, FabricanteRead]):
@@ -202,31 +416,18 @@ class CRUDModelo(CRUDBase[Modelo, ModeloCreate, ModeloUpdate, ModeloRead]):
         query = select(Modelo).options(joinedload(Modelo.fabricante))
         return session.exec(query).all()
     
-    def create_with_validation(self, session: Session, *, obj_in: ModeloCreate) -> Modelo:
-        """
-        Crea un modelo con validación del fabricante
-        
-        Args:
-            session: Sesión de base de datos
-            obj_in: Datos para crear el modelo
-            
-        Returns:
-            Modelo creado
-            
-        Raises:
-            HTTPException: Si el fabricante no existe
-        """
-        from fastapi import HTTPException
-        
-        # Validar que existe el fabricante
-        fabricante = session.get(Fabricante, obj_in.fabricante_id)
-        if not fabricante:
-            raise HTTPException(status_code=404, detail="Fabricante no encontrado")
-        
-        return super().create(session, obj_in=obj_in)
-
 # Instancias CRUD para los modelos
-crud_equipo = CRUDEquipo(Equipo)
-crud_tipo_activo = CRUDBase[TipoActivo, TipoActivoCreate, TipoActivoUpdate, TipoActivoRead](TipoActivo)
-crud_fabricante = CRUDFabricante(Fabricante)
-crud_modelo = CRUDModelo(Modelo)
\ No newline at end of file
+crud_equipo = CRUDEquipo(Equipo, mensajes_foraneas={
+    "subsistema_id": "Subsistema no encontrado",
+    "tipo_activo_id": "Tipo de activo no encontrado",
+    "fabricante_id": "Fabricante no encontrado",
+    "modelo_id": "Modelo no encontrado",
+})
+crud_tipo_activo = CRUDBase[TipoActivo, TipoActivoCreate, TipoActivoUpdate, TipoActivoRead](
+    TipoActivo, claves_naturales=("descripcion",)
+)
+crud_fabricante = CRUDFabricante(Fabricante, claves_naturales=("nombre",))
+crud_modelo = CRUDModelo(
+    Modelo, claves_naturales=("fabricante_id", "nombre"),
+    mensajes_foraneas={"fabricante_id": "Fabricante no encontrado"}
+)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Operaciones CRUD específicas para los resultados de los servicios de IA.
+"""
+from typing import Optional
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from db.crud import CRUDBase
+from models.ia import ProcedimientoGenerado
+
+# CRUD para ProcedimientoGenerado
+class CRUDProcedimiento(CRUDBase[ProcedimientoGenerado, ProcedimientoGenerado, ProcedimientoGenerado, ProcedimientoGenerado]):
+    """Operaciones CRUD específicas para el modelo ProcedimientoGenerado"""
+    
+    def get_by_clave(self, session: Session, clave: str) -> Optional[ProcedimientoGenerado]:
+        """
+        Obtiene un procedimiento almacenado por su clave normalizada
+        
+        Args:
+            session: Sesión de base de datos
+            clave: Clave normalizada (tipo|marca|modelo|versión)
+            
+        Returns:
+            Procedimiento almacenado o None
+        """
+        query = select(ProcedimientoGenerado).where(ProcedimientoGenerado.clave == clave)
+        return session.exec(query).first()
+    
+    def guardar(
+        self,
+        session: Session,
+        *,
+        clave: str,
+        tipo_equipo: str,
+        marca: str,
+        modelo: str,
+        version_prompt: str,
+        contenido: str
+    ) -> ProcedimientoGenerado:
+        """
+        Guarda un procedimiento generado, reemplazando el existente con la misma clave
+        
+        Args:
+            session: Sesión de base de datos
+            clave: Clave normalizada del procedimiento
+            tipo_equipo: Tipo de equipo solicitado
+            marca: Marca solicitada
+            modelo: Modelo solicitado
+            version_prompt: Versión del prompt usado en la generación
+            contenido: Procedimiento serializado en JSON
+            
+        Returns:
+            Procedimiento almacenado
+        """
+        registro = self.get_by_clave(session, clave)
+        if registro:
+            return self.update(session, db_obj=registro, obj_in={
+                "contenido": contenido,
+                "fecha_generacion": datetime.now(timezone.utc)
+            })
+        
+        try:
+            return self.create(session, obj_in={
+                "clave": clave,
+                "tipo_equipo": tipo_equipo,
+                "marca": marca,
+                "modelo": modelo,
+                "version_prompt": version_prompt,
+                "contenido": contenido
+            })
+        except HTTPException as e:
+            # Otro proceso guardó la misma clave en paralelo: se conserva el más reciente
+            registro = self.get_by_clave(session, clave) if e.status_code == 409 else None
+            if not registro:
+                raise
+            return self.update(session, db_obj=registro, obj_in={
+                "contenido": contenido,
+                "fecha_generacion": datetime.now(timezone.utc)
+            })
+
+# Instancias CRUD para los modelos
+crud_procedimiento = CRUDProcedimiento(ProcedimientoGenerado)
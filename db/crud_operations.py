@@ -1,12 +1,14 @@
 """
 Operaciones CRUD específicas para cargos, personas y actividades.
 """
+from sqlalchemy import and_
 from sqlalchemy.orm import joinedload
 from typing import List, Optional, Dict, Any
 from sqlmodel import Session, select
 from datetime import date
 
 from db.crud import CRUDBase
+from db.jerarquia import en_subarbol, ruta_jerarquia
 from models.operations import (
     Cargo, Persona, Actividad,
     ActividadCreate, ActividadUpdate, ActividadRead, ActividadDetallada
@@ -130,6 +132,49 @@ class CRUDActividad(CRUDBase[Actividad, ActividadCreate, ActividadUpdate, Activi
         query = select(Actividad).where(Actividad.equipo_id == equipo_id)
         return session.exec(query).all()
     
+    def get_by_ruta(
+        self,
+        session: Session,
+        prefijo: str,
+        *,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Actividad]:
+        """
+        Lista las actividades de los equipos de un subárbol de la jerarquía
+        
+        Args:
+            session: Sesión de base de datos
+            prefijo: Ruta materializada del nodo raíz (ver db/jerarquia.py)
+            desde: Fecha inicial opcional
+            hasta: Fecha final opcional
+            skip: Cantidad de registros a omitir (para paginación)
+            limit: Cantidad máxima de registros a retornar
+            
+        Returns:
+            Actividades del subárbol, de la más reciente a la más antigua
+            
+        Raises:
+            HTTPException: Si la base de datos no es SQLite
+        """
+        from fastapi import HTTPException
+        
+        if session.get_bind().dialect.name != "sqlite":
+            raise HTTPException(status_code=501, detail="Las consultas por jerarquía requieren SQLite")
+        
+        query = select(Actividad).join(
+            ruta_jerarquia, and_(ruta_jerarquia.c.entidad_id == Actividad.equipo_id, en_subarbol("equipo", prefijo))
+        )
+        if desde:
+            query = query.where(Actividad.fecha >= desde)
+        if hasta:
+            query = query.where(Actividad.fecha <= hasta)
+            
+        query = query.order_by(Actividad.fecha.desc(), Actividad.id.desc()).offset(skip).limit(limit)
+        return session.exec(query).all()
+    
     def get_by_fecha(self, session: Session, fecha_inicio: date, fecha_fin: date = None) -> List[Actividad]:
         """
         Lista actividades entre un rango de fechas
@@ -203,5 +248,8 @@ class CRUDActividad(CRUDBase[Actividad, ActividadCreate, ActividadUpdate, Activi
 
 # Instancias CRUD para los modelos
 crud_cargo = CRUDCargo(Cargo)
-crud_persona = CRUDPersona(Persona)
-crud_actividad = CRUDActividad(Actividad)
\ No newline at end of file
+crud_persona = CRUDPersona(Persona, mensajes_foraneas={"cargo_id": "Cargo no encontrado"})
+crud_actividad = CRUDActividad(Actividad, mensajes_foraneas={
+    "equipo_id": "Equipo no encontrado",
+    "persona_id": "Persona no encontrada",
+})
\ No newline at end of file
@@ -1,17 +1,123 @@
 """
 Operaciones CRUD específicas para plantas, sistemas y subsistemas.
 """
+import os
+from sqlalchemy import delete, func, literal, null
 from sqlalchemy.orm import joinedload
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Set, Tuple
 from sqlmodel import Session, select
 
 from db.crud import CRUDBase
+from db.agregados import leer_agregados
+from db.crud_equipment import cache_facetas
 from models.organization import (
     Planta, Sistema, SubSistema,
-    PlantaJerarquica, SistemaRead, SubSistemaRead
+    PlantaJerarquica, SistemaRead, SubSistemaRead, NodoHijo, AgregadosNodo
 )
 from models.business import Contrato
-from models.equipment import Equipo
+from models.equipment import Equipo, EquipoReadMini, TipoActivo, Fabricante, Modelo
+from models.operations import Actividad
+
+# Niveles por debajo de la planta: sistemas, subsistemas y equipos
+PROFUNDIDAD_JERARQUIA = 3
+
+# Hijos de cada tipo de nodo: (modelo del nodo, modelo del hijo, llave foránea
+# del hijo hacia el nodo, tipo del hijo, llave foránea del nieto hacia el hijo)
+HIJOS_JERARQUIA: Dict[str, Tuple[Any, Any, Any, str, Any]] = {
+    "contrato": (Contrato, Planta, Planta.contrato_id, "planta", Sistema.planta_id),
+    "planta": (Planta, Sistema, Sistema.planta_id, "sistema", SubSistema.sistema_id),
+    "sistema": (Sistema, SubSistema, SubSistema.sistema_id, "subsistema", Equipo.subsistema_id),
+    "subsistema": (SubSistema, Equipo, Equipo.subsistema_id, "equipo", None),
+}
+
+# Niveles que se eliminan en cascada, de arriba hacia abajo:
+# (tipo, modelo, llave foránea hacia el nivel anterior)
+CASCADA_JERARQUIA: List[Tuple[str, Any, Any]] = [
+    ("planta", Planta, None),
+    ("sistema", Sistema, Sistema.planta_id),
+    ("subsistema", SubSistema, SubSistema.sistema_id),
+    ("equipo", Equipo, Equipo.subsistema_id),
+    ("actividad", Actividad, Actividad.equipo_id),
+]
+
+# Registros dependientes a partir de los cuales la eliminación en cascada
+# se ejecuta como trabajo en segundo plano
+CASCADA_UMBRAL_TRABAJO = int(os.getenv("CASCADA_UMBRAL_TRABAJO", "10000"))
+
+
+def _condiciones_subarbol(tipo: str, id: int) -> List[Tuple[str, Any, Any]]:
+    """
+    Condición que selecciona las filas del subárbol de un nodo en cada nivel,
+    desde el nodo hacia abajo: [(tipo, modelo, condición)]. Cada nivel se
+    filtra con una subconsulta IN sobre el anterior.
+    """
+    inicio = [t for t, _, _ in CASCADA_JERARQUIA].index(tipo)
+    condiciones = []
+    for tipo_nivel, modelo, llave in CASCADA_JERARQUIA[inicio:]:
+        if not condiciones:
+            condicion = modelo.id == id
+        else:
+            _, modelo_padre, condicion_padre = condiciones[-1]
+            condicion = llave.in_(select(modelo_padre.id).where(condicion_padre))
+        condiciones.append((tipo_nivel, modelo, condicion))
+    return condiciones
+
+
+def contar_subarbol(session: Session, tipo: str, id: int) -> Optional[Dict[str, int]]:
+    """
+    Cuenta en una sola consulta los registros que eliminaría la cascada de un nodo
+    
+    Args:
+        session: Sesión de base de datos
+        tipo: Tipo del nodo (planta, sistema o subsistema)
+        id: ID del nodo
+        
+    Returns:
+        Registros por tipo, incluido el propio nodo, o None si el nodo no existe
+    """
+    conteo = dict(session.exec(select(*(
+        select(func.count()).select_from(modelo).where(condicion).scalar_subquery().label(tipo_nivel)
+        for tipo_nivel, modelo, condicion in _condiciones_subarbol(tipo, id)
+    ))).one()._mapping)
+    return conteo if conteo[tipo] else None
+
+
+def eliminar_subarbol(
+    session: Session,
+    tipo: str,
+    id: int,
+    *,
+    progreso: Optional[Callable[[str, int], None]] = None
+) -> Dict[str, int]:
+    """
+    Elimina un nodo y todo lo que cuelga de él, de abajo hacia arriba, con una
+    sentencia DELETE por nivel en una sola transacción. Los objetos no se
+    cargan en la sesión.
+    
+    Args:
+        session: Sesión de base de datos
+        tipo: Tipo del nodo (planta, sistema o subsistema)
+        id: ID del nodo
+        progreso: Función que recibe (tipo, eliminados) al terminar cada nivel
+        
+    Returns:
+        Registros eliminados por tipo
+    """
+    eliminados: Dict[str, int] = {}
+    try:
+        for tipo_nivel, modelo, condicion in reversed(_condiciones_subarbol(tipo, id)):
+            eliminados[tipo_nivel] = session.execute(
+                delete(modelo).where(condicion).execution_options(synchronize_session=False)
+            ).rowcount
+            if progreso:
+                progreso(tipo_nivel, eliminados[tipo_nivel])
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    cache_facetas.limpiar()
+    return dict(reversed(eliminados.items()))
+
 
 # CRUD para Planta
 class CRUDPlanta(CRUDBase[Planta, Planta, Planta, Planta]):
@@ -46,81 +152,211 @@ class CRUDPlanta(CRUDBase[Planta, Planta, Planta, Planta]):
         query = select(Planta).where(Planta.contrato_id == contrato_id)
         return session.exec(query).all()
     
-    def get_jerarquia_completa(self, session: Session, id: int) -> Optional[PlantaJerarquica]:
+    def get_combinaciones_activos(self, session: Session, id: int) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Lista las combinaciones distintas de tipo de activo, fabricante y modelo
+        de los equipos que pertenecen a una planta
+        
+        Args:
+            session: Sesión de base de datos
+            id: ID de la planta
+            
+        Returns:
+            Lista de tuplas (tipo de activo, fabricante, modelo) sin repetir
+        """
+        query = (
+            select(TipoActivo.descripcion, Fabricante.nombre, Modelo.nombre)
+            .select_from(Equipo)
+            .join(SubSistema, Equipo.subsistema_id == SubSistema.id)
+            .join(Sistema, SubSistema.sistema_id == Sistema.id)
+            .join(TipoActivo, Equipo.tipo_activo_id == TipoActivo.id)
+            .outerjoin(Fabricante, Equipo.fabricante_id == Fabricante.id)
+            .outerjoin(Modelo, Equipo.modelo_id == Modelo.id)
+            .where(Sistema.planta_id == id)
+            .distinct()
+        )
+        return session.exec(query).all()
+    
+    def get_jerarquia_completa(
+        self,
+        session: Session,
+        id: int,
+        *,
+        depth: int = PROFUNDIDAD_JERARQUIA,
+        expand: Optional[Dict[str, Set[int]]] = None,
+        agregados: bool = False,
+        mes: Optional[str] = None
+    ) -> Optional[PlantaJerarquica]:
         """
-        Obtiene la jerarquía completa de una planta con sus sistemas, subsistemas y equipos
+        Obtiene la jerarquía de una planta con sus sistemas, subsistemas y equipos
+        hasta la profundidad indicada. Cada nivel se carga con una sola consulta y
+        cada nodo incluye la cantidad de hijos directos, aunque no se hayan cargado.
         
         Args:
             session: Sesión de base de datos
             id: ID de la planta
+            depth: Niveles a incluir: 0 solo la planta, 1 sistemas, 2 subsistemas, 3 equipos
+            expand: IDs de nodos cuyos hijos se incluyen aunque superen la profundidad,
+                por tipo ({"sistema": {...}, "subsistema": {...}}); expandir un
+                subsistema expande también su sistema
+            agregados: Incluir en la planta, sus sistemas y subsistemas los contadores
+                de equipos y actividades del mes (ver db/agregados.py)
+            mes: Mes de las actividades ("YYYY-MM"); por defecto el actual
             
         Returns:
-            Estructura jerárquica completa de la planta o None
+            Estructura jerárquica de la planta o None
+            
+        Raises:
+            HTTPException: Si se piden los contadores y la base de datos no es SQLite
         """
+        if agregados and session.get_bind().dialect.name != "sqlite":
+            from fastapi import HTTPException
+            
+            raise HTTPException(status_code=501, detail="Los contadores de la jerarquía requieren SQLite")
+        
         planta = session.get(Planta, id)
         if not planta:
             return None
         
-        # Construir la jerarquía manualmente para mayor control
+        planta_jer = self._armar_jerarquia(session, planta, depth, expand or {})
+        if agregados:
+            nodos = [("planta", planta_jer), *(("sistema", s) for s in planta_jer.sistemas),
+                     *(("subsistema", ss) for s in planta_jer.sistemas for ss in s.subsistemas)]
+            contadores = leer_agregados(session.connection(), ((tipo, n.id) for tipo, n in nodos), mes)
+            for tipo, nodo in nodos:
+                nodo.agregados = AgregadosNodo(**contadores[(tipo, nodo.id)])
+        return planta_jer
+    
+    def _armar_jerarquia(self, session: Session, planta: Planta, depth: int,
+                         expand: Dict[str, Set[int]]) -> PlantaJerarquica:
+        """Carga los niveles pedidos de la jerarquía, una consulta por nivel"""
+        id = planta.id
+        
+        sistemas_expandidos = set(expand.get("sistema", ()))
+        subsistemas_expandidos = set(expand.get("subsistema", ()))
+        if subsistemas_expandidos and depth < 2:
+            sistemas_expandidos |= set(session.exec(
+                select(SubSistema.sistema_id).where(SubSistema.id.in_(subsistemas_expandidos))
+            ).all())
+        
         planta_jer = PlantaJerarquica(
             id=planta.id,
             nombre=planta.nombre,
             municipio=planta.municipio,
             localizacion=planta.localizacion,
+            total_sistemas=self._contar_hijos(session, Sistema.planta_id, [id]).get(id, 0),
             sistemas=[]
         )
+        if depth < 1 and not sistemas_expandidos:
+            return planta_jer
         
-        # Cargar los sistemas
-        sistemas = session.exec(
-            select(Sistema).where(Sistema.planta_id == id)
-        ).all()
-        
+        # Sistemas de la planta
+        sistemas = session.exec(select(Sistema).where(Sistema.planta_id == id).order_by(Sistema.id)).all()
+        ids_sistemas = select(Sistema.id).where(Sistema.planta_id == id)
+        subsistemas_por_sistema = self._contar_hijos(session, SubSistema.sistema_id, ids_sistemas)
+        sistemas_read: Dict[int, SistemaRead] = {}
         for sistema in sistemas:
-            sistema_read = SistemaRead(
+            sistemas_read[sistema.id] = SistemaRead(
                 id=sistema.id,
                 codigo=sistema.codigo,
                 nombre=sistema.nombre,
                 descripcion=sistema.descripcion or "",
+                total_subsistemas=subsistemas_por_sistema.get(sistema.id, 0),
                 subsistemas=[]
             )
-            
-            # Cargar los subsistemas de este sistema
-            subsistemas = session.exec(
-                select(SubSistema).where(SubSistema.sistema_id == sistema.id)
-            ).all()
-            
-            for subsistema in subsistemas:
-                subsistema_read = SubSistemaRead(
-                    id=subsistema.id,
-                    codigo=subsistema.codigo,
-                    nombre=subsistema.nombre,
-                    descripcion=subsistema.descripcion or "",
-                    equipos=[]
-                )
-                
-                # Cargar los equipos de este subsistema
-                equipos = session.exec(
-                    select(Equipo).where(Equipo.subsistema_id == subsistema.id)
-                ).all()
-                
-                for equipo in equipos:
-                    subsistema_read.equipos.append({
-                        "id": equipo.id,
-                        "nombre": equipo.nombre
-                    })
-                
-                sistema_read.subsistemas.append(subsistema_read)
-            
-            planta_jer.sistemas.append(sistema_read)
+            planta_jer.sistemas.append(sistemas_read[sistema.id])
+        
+        # Subsistemas de los sistemas expandidos
+        if depth < 2:
+            ids_sistemas = [i for i in sistemas_read if i in sistemas_expandidos]
+            if not ids_sistemas:
+                return planta_jer
+        subsistemas = session.exec(
+            select(SubSistema).where(SubSistema.sistema_id.in_(ids_sistemas)).order_by(SubSistema.id)
+        ).all()
+        ids_subsistemas = select(SubSistema.id).where(SubSistema.sistema_id.in_(ids_sistemas))
+        equipos_por_subsistema = self._contar_hijos(session, Equipo.subsistema_id, ids_subsistemas)
+        subsistemas_read: Dict[int, SubSistemaRead] = {}
+        for subsistema in subsistemas:
+            subsistemas_read[subsistema.id] = SubSistemaRead(
+                id=subsistema.id,
+                codigo=subsistema.codigo,
+                nombre=subsistema.nombre,
+                descripcion=subsistema.descripcion or "",
+                total_equipos=equipos_por_subsistema.get(subsistema.id, 0),
+                equipos=[]
+            )
+            sistemas_read[subsistema.sistema_id].subsistemas.append(subsistemas_read[subsistema.id])
+        
+        # Equipos de los subsistemas expandidos (solo ID y nombre)
+        if depth < 3:
+            ids_subsistemas = [i for i in subsistemas_read if i in subsistemas_expandidos]
+            if not ids_subsistemas:
+                return planta_jer
+        equipos = session.exec(
+            select(Equipo.id, Equipo.nombre, Equipo.subsistema_id)
+            .where(Equipo.subsistema_id.in_(ids_subsistemas))
+            .order_by(Equipo.id)
+        ).all()
+        for equipo in equipos:
+            subsistemas_read[equipo.subsistema_id].equipos.append(
+                EquipoReadMini(id=equipo.id, nombre=equipo.nombre)
+            )
         
         return planta_jer
     
-    def get_all_jerarquias(self, session: Session) -> List[PlantaJerarquica]:
+    @staticmethod
+    def _contar_hijos(session: Session, columna_padre, padres) -> Dict[int, int]:
+        """Cantidad de hijos por ID de padre, para una lista o subconsulta de padres"""
+        return dict(session.exec(
+            select(columna_padre, func.count()).where(columna_padre.in_(padres)).group_by(columna_padre)
+        ).all())
+    
+    def get_hijos(self, session: Session, tipo: str, id: int, *, skip: int = 0, limit: int = 100) -> Optional[List[NodoHijo]]:
         """
-        Obtiene la jerarquía completa de todas las plantas
+        Lista los hijos directos de un nodo de la jerarquía con la cantidad de hijos de cada uno
         
         Args:
             session: Sesión de base de datos
+            tipo: Tipo del nodo (una clave de HIJOS_JERARQUIA)
+            id: ID del nodo
+            skip: Cantidad de hijos a omitir (para paginación)
+            limit: Cantidad máxima de hijos a retornar
+            
+        Returns:
+            Hijos ordenados por ID, o None si el nodo no existe
+        """
+        modelo_padre, modelo_hijo, columna_padre, tipo_hijo, columna_nieto = HIJOS_JERARQUIA[tipo]
+        if session.get(modelo_padre, id) is None:
+            return None
+        
+        codigo = modelo_hijo.codigo if hasattr(modelo_hijo, "codigo") else null()
+        if columna_nieto is not None:
+            # Conteo correlacionado: usa el índice de la llave foránea del nieto
+            total_hijos = (
+                select(func.count()).where(columna_nieto == modelo_hijo.id).scalar_subquery()
+            )
+        else:
+            total_hijos = literal(0)
+        filas = session.exec(
+            select(modelo_hijo.id, modelo_hijo.nombre, codigo.label("codigo"), total_hijos.label("total_hijos"))
+            .where(columna_padre == id)
+            .order_by(modelo_hijo.id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        return [
+            NodoHijo(tipo=tipo_hijo, id=f.id, nombre=f.nombre, codigo=f.codigo, total_hijos=f.total_hijos)
+            for f in filas
+        ]
+    
+    def get_all_jerarquias(self, session: Session, *, depth: int = PROFUNDIDAD_JERARQUIA) -> List[PlantaJerarquica]:
+        """
+        Obtiene la jerarquía de todas las plantas
+        
+        Args:
+            session: Sesión de base de datos
+            depth: Niveles a incluir (ver get_jerarquia_completa)
             
         Returns:
             Lista de estructuras jerárquicas completas
@@ -129,12 +365,21 @@ class CRUDPlanta(CRUDBase[Planta, Planta, Planta, Planta]):
         resultado = []
         
         for planta in plantas:
-            jerarquia = self.get_jerarquia_completa(session, planta.id)
+            jerarquia = self.get_jerarquia_completa(session, planta.id, depth=depth)
             if jerarquia:
                 resultado.append(jerarquia)
         
         return resultado
 
+    def contar_subarbol(self, session: Session, id: int) -> Optional[Dict[str, int]]:
+        """Cuenta los registros que eliminaría remove_cascade (ver contar_subarbol)"""
+        return contar_subarbol(session, "planta", id)
+    
+    def remove_cascade(self, session: Session, id: int, *,
+                       progreso: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """Elimina la planta con todo su subárbol (ver eliminar_subarbol)"""
+        return eliminar_subarbol(session, "planta", id, progreso=progreso)
+
 # CRUD para Sistema
 class CRUDSistema(CRUDBase[Sistema, Sistema, Sistema, Sistema]):
     """Operaciones CRUD específicas para el modelo Sistema"""
@@ -168,6 +413,15 @@ class CRUDSistema(CRUDBase[Sistema, Sistema, Sistema, Sistema]):
         query = select(Sistema).where(Sistema.planta_id == planta_id)
         return session.exec(query).all()
 
+    def contar_subarbol(self, session: Session, id: int) -> Optional[Dict[str, int]]:
+        """Cuenta los registros que eliminaría remove_cascade (ver contar_subarbol)"""
+        return contar_subarbol(session, "sistema", id)
+    
+    def remove_cascade(self, session: Session, id: int, *,
+                       progreso: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """Elimina el sistema con todo su subárbol (ver eliminar_subarbol)"""
+        return eliminar_subarbol(session, "sistema", id, progreso=progreso)
+
 # CRUD para SubSistema
 class CRUDSubSistema(CRUDBase[SubSistema, SubSistema, SubSistema, SubSistema]):
     """Operaciones CRUD específicas para el modelo SubSistema"""
@@ -201,7 +455,16 @@ class CRUDSubSistema(CRUDBase[SubSistema, SubSistema, SubSistema, SubSistema]):
         query = select(SubSistema).where(SubSistema.sistema_id == sistema_id)
         return session.exec(query).all()
 
+    def contar_subarbol(self, session: Session, id: int) -> Optional[Dict[str, int]]:
+        """Cuenta los registros que eliminaría remove_cascade (ver contar_subarbol)"""
+        return contar_subarbol(session, "subsistema", id)
+    
+    def remove_cascade(self, session: Session, id: int, *,
+                       progreso: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """Elimina el subsistema con todo su subárbol (ver eliminar_subarbol)"""
+        return eliminar_subarbol(session, "subsistema", id, progreso=progreso)
+
 # Instancias CRUD para los modelos
-crud_planta = CRUDPlanta(Planta)
-crud_sistema = CRUDSistema(Sistema)
-crud_subsistema = CRUDSubSistema(SubSistema)
\ No newline at end of file
+crud_planta = CRUDPlanta(Planta, mensajes_foraneas={"contrato_id": "Contrato no encontrado"})
+crud_sistema = CRUDSistema(Sistema, mensajes_foraneas={"planta_id": "Planta no encontrada"})
+crud_subsistema = CRUDSubSistema(SubSistema, mensajes_foraneas={"sistema_id": "Sistema no encontrado"})
\ No newline at end of file
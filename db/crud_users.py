@@ -266,7 +266,10 @@ class CRUDAplicacionRol(CRUDBase[AplicacionRol, AplicacionRol, AplicacionRol, Ap
             raise HTTPException(status_code=500, detail=f"Error al desasignar aplicación: {str(e)}")
 
 # Instancias CRUD para los modelos
-crud_usuario = CRUDUsuario(Usuario)
+crud_usuario = CRUDUsuario(Usuario, mensajes_foraneas={"rol_id": "Rol no encontrado"})
 crud_rol = CRUDRol(Rol)
 crud_aplicacion = CRUDAplicacion(Aplicacion)
-crud_aplicacion_rol = CRUDAplicacionRol(AplicacionRol)
\ No newline at end of file
+crud_aplicacion_rol = CRUDAplicacionRol(AplicacionRol, mensajes_foraneas={
+    "rol_id": "Rol no encontrado",
+    "aplicacion_id": "Aplicación no encontrada",
+})
\ No newline at end of file
@@ -1,15 +1,64 @@
 """
 Configuración de la base de datos para la aplicación GAME.
 """
+import logging
+import os
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import create_engine, Session, SQLModel
 
-# Configuración de la base de datos
-DATABASE_URL = "sqlite:///db.db"
-engine = create_engine(DATABASE_URL, echo=True)
+# Configuración de la base de datos (sobrescribible por variables de ambiente)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///db.db")
+DB_ECHO = os.getenv("DB_ECHO", "true").lower() in ("1", "true", "si", "yes")
+# WAL permite leer (ej. exportar una instantánea) mientras otra conexión escribe
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() in ("1", "true", "si", "yes")
+engine = create_engine(DATABASE_URL, echo=DB_ECHO)
+
+@event.listens_for(engine, "connect")
+def _configurar_conexion_sqlite(conexion_dbapi, _registro):
+    """Aplica los PRAGMA de SQLite a cada conexión nueva"""
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = conexion_dbapi.cursor()
+    # SQLite no verifica las llaves foráneas si no se activan en cada conexión
+    cursor.execute("PRAGMA foreign_keys=ON")
+    if SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+logger = logging.getLogger(__name__)
 
 def create_db():
-    """Crea todas las tablas definidas en los modelos"""
+    """
+    Crea todas las tablas definidas en los modelos y los índices que falten.
+    create_all solo crea índices junto con tablas nuevas; los índices agregados
+    después a los modelos se crean aquí sobre las tablas ya existentes.
+    Un índice único que los datos actuales violan se omite con una advertencia
+    para no impedir el arranque. En SQLite crea además el índice de búsqueda
+    de texto completo (db/busqueda.py), la ruta materializada de la
+    jerarquía (db/jerarquia.py) y sus contadores por nodo (db/agregados.py).
+    """
     SQLModel.metadata.create_all(engine)
+    for tabla in SQLModel.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            try:
+                with engine.begin() as conn:
+                    indice.create(conn, checkfirst=True)
+            except IntegrityError as e:
+                logger.warning("No se creó el índice %s: hay valores duplicados (%s)", indice.name, e.orig)
+
+    # Búsqueda de texto completo (FTS5), rutas y contadores de la jerarquía, solo SQLite
+    if engine.dialect.name == "sqlite":
+        from db.agregados import crear_agregados
+        from db.busqueda import crear_busqueda_equipos, crear_busqueda_global
+        from db.jerarquia import crear_ruta_jerarquia
+
+        with engine.begin() as conn:
+            crear_busqueda_equipos(conn)
+            crear_busqueda_global(conn)
+            crear_ruta_jerarquia(conn)
+            crear_agregados(conn)
 
 def get_session():
     """Genera una sesión de base de datos para su uso en dependencias de FastAPI"""
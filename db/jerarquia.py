@@ -0,0 +1,184 @@
+"""
+Ruta materializada de la jerarquía Contrato → Planta → Sistema → SubSistema → Equipo.
+
+La tabla ruta_jerarquia guarda para cada planta, sistema, subsistema y equipo
+la ruta de IDs desde su contrato, ej. "/3/17/102/880/12345/" para el equipo
+12345. Todos los descendientes de un nodo comparten el prefijo de su ruta, así
+un subárbol completo se resuelve con un rango sobre el índice (tipo, ruta) sin
+recorrer los niveles intermedios.
+
+Los triggers mantienen la tabla sincronizada con cualquier escritura (CRUD,
+cargue masivo, upserts o SQL directo). Mover un nodo a otro padre reescribe
+el prefijo de todo su subárbol. Las tablas de entidades no se modifican, así
+estas escrituras no disparan los triggers de búsqueda (db/busqueda.py).
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, column, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import ColumnElement
+
+TABLA_RUTA_JERARQUIA = "ruta_jerarquia"
+
+# Construcción liviana para consultar la tabla desde SQLAlchemy (no es parte
+# de SQLModel.metadata, por eso create_all y la instantánea la ignoran)
+ruta_jerarquia = table(TABLA_RUTA_JERARQUIA, column("tipo"), column("entidad_id"), column("ruta"))
+
+# Niveles de la jerarquía: tipo -> (columna del padre, tipo del padre o None si es el contrato)
+NIVELES_JERARQUIA: Dict[str, Tuple[str, Optional[str]]] = {
+    "planta": ("contrato_id", None),
+    "sistema": ("planta_id", "planta"),
+    "subsistema": ("sistema_id", "sistema"),
+    "equipo": ("subsistema_id", "subsistema"),
+}
+
+
+def _ruta_padre(tipo: str, fila: str) -> str:
+    """Expresión SQL con la ruta del padre de la fila (new, old o x)"""
+    columna_padre, tipo_padre = NIVELES_JERARQUIA[tipo]
+    if tipo_padre is None:
+        return f"'/' || {fila}.{columna_padre} || '/'"
+    return (f"(SELECT r.ruta FROM {TABLA_RUTA_JERARQUIA} r "
+            f"WHERE r.tipo = '{tipo_padre}' AND r.entidad_id = {fila}.{columna_padre})")
+
+
+def _descendientes(tipo: str) -> List[str]:
+    """Tipos por debajo de un nivel, del más profundo al más cercano"""
+    tipos = list(NIVELES_JERARQUIA)
+    return list(reversed(tipos[tipos.index(tipo) + 1:]))
+
+
+def _ddl_ruta_jerarquia() -> List[str]:
+    """Tabla, índice y triggers de la ruta materializada"""
+    ddl = [
+        f"""CREATE TABLE IF NOT EXISTS {TABLA_RUTA_JERARQUIA} (
+            tipo TEXT NOT NULL,
+            entidad_id INTEGER NOT NULL,
+            ruta TEXT NOT NULL,
+            PRIMARY KEY (tipo, entidad_id)
+        ) WITHOUT ROWID""",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLA_RUTA_JERARQUIA}_tipo_ruta ON {TABLA_RUTA_JERARQUIA} (tipo, ruta)",
+    ]
+    for tipo, (columna_padre, _) in NIVELES_JERARQUIA.items():
+        propia = f"(SELECT ruta FROM {TABLA_RUTA_JERARQUIA} WHERE tipo = '{tipo}' AND entidad_id = old.id)"
+        nueva = f"{_ruta_padre(tipo, 'new')} || new.id || '/'"
+        # Un nodo cuyo padre no tiene ruta (huérfano) queda sin ruta
+        insertar = (f"INSERT OR REPLACE INTO {TABLA_RUTA_JERARQUIA}(tipo, entidad_id, ruta) "
+                    f"SELECT '{tipo}', new.id, {nueva} WHERE {nueva} IS NOT NULL;")
+        # Primero los descendientes (el rango se calcula con la ruta anterior) y al final el propio nodo
+        mover = [
+            f"""UPDATE {TABLA_RUTA_JERARQUIA}
+                SET ruta = {nueva} || substr(ruta, length({propia}) + 1)
+                WHERE tipo = '{descendiente}'
+                  AND ruta >= {propia} AND ruta < substr({propia}, 1, length({propia}) - 1) || '0';"""
+            for descendiente in _descendientes(tipo)
+        ]
+        ddl += [
+            f"""CREATE TRIGGER IF NOT EXISTS {tipo}_ruta_ai AFTER INSERT ON {tipo} BEGIN
+                {insertar}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {tipo}_ruta_au AFTER UPDATE OF id, {columna_padre} ON {tipo}
+                WHEN new.id IS NOT old.id OR new.{columna_padre} IS NOT old.{columna_padre} BEGIN
+                {" ".join(mover)}
+                DELETE FROM {TABLA_RUTA_JERARQUIA} WHERE tipo = '{tipo}' AND entidad_id = old.id;
+                {insertar}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {tipo}_ruta_ad AFTER DELETE ON {tipo} BEGIN
+                DELETE FROM {TABLA_RUTA_JERARQUIA} WHERE tipo = '{tipo}' AND entidad_id = old.id;
+            END""",
+        ]
+    return ddl
+
+
+DDL_RUTA_JERARQUIA: List[str] = _ddl_ruta_jerarquia()
+
+
+def crear_ruta_jerarquia(conn: Connection) -> bool:
+    """
+    Crea la tabla de rutas y sus triggers si no existen. Si la tabla es
+    nueva, la llena con los registros ya existentes.
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        True si la tabla se creó (y se llenó) en esta llamada
+    """
+    existia = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA_RUTA_JERARQUIA,)
+    ).first() is not None
+    for sentencia in DDL_RUTA_JERARQUIA:
+        conn.exec_driver_sql(sentencia)
+    if not existia:
+        reconstruir_ruta_jerarquia(conn)
+    return not existia
+
+
+def reconstruir_ruta_jerarquia(conn: Connection) -> int:
+    """
+    Vuelve a generar todas las rutas a partir de las tablas (reparación)
+
+    Args:
+        conn: Conexión SQLite dentro de una transacción
+
+    Returns:
+        Cantidad de nodos con ruta
+    """
+    conn.exec_driver_sql(f"DELETE FROM {TABLA_RUTA_JERARQUIA}")
+    total = 0
+    # Nivel por nivel, así cada uno encuentra ya calculada la ruta de su padre
+    for tipo in NIVELES_JERARQUIA:
+        total += conn.exec_driver_sql(
+            f"""INSERT INTO {TABLA_RUTA_JERARQUIA}(tipo, entidad_id, ruta)
+                SELECT '{tipo}', x.id, {_ruta_padre(tipo, 'x')} || x.id || '/' FROM {tipo} x
+                WHERE {_ruta_padre(tipo, 'x')} IS NOT NULL"""
+        ).rowcount
+    return total
+
+
+def prefijo_ruta(*ids: int) -> str:
+    """
+    Ruta de un nodo a partir de los IDs de sus ancestros, desde el contrato.
+    Ej. prefijo_ruta(contrato_id, planta_id) es el prefijo común de todo lo
+    que está bajo esa planta.
+    """
+    return "/" + "".join(f"{i}/" for i in ids)
+
+
+def obtener_ruta(conn: Connection, tipo: str, entidad_id: int) -> Optional[str]:
+    """
+    Ruta materializada de un nodo
+
+    Args:
+        conn: Conexión SQLite
+        tipo: Nivel del nodo (planta, sistema, subsistema o equipo)
+        entidad_id: ID del nodo
+
+    Returns:
+        Ruta del nodo, o None si el nodo no existe
+    """
+    return conn.execute(
+        select(ruta_jerarquia.c.ruta).where(
+            ruta_jerarquia.c.tipo == tipo, ruta_jerarquia.c.entidad_id == entidad_id
+        )
+    ).scalar()
+
+
+def en_subarbol(tipo: str, prefijo: str) -> ColumnElement:
+    """
+    Condición para los nodos de un tipo cuya ruta empieza con el prefijo.
+    Se expresa como rango (y no con LIKE) para que use el índice (tipo, ruta).
+
+    Args:
+        tipo: Nivel de los nodos buscados
+        prefijo: Ruta del nodo raíz del subárbol (termina en "/")
+
+    Returns:
+        Condición sobre la tabla ruta_jerarquia
+    """
+    return and_(
+        ruta_jerarquia.c.tipo == tipo,
+        ruta_jerarquia.c.ruta >= prefijo,
+        # "0" es el carácter siguiente a "/", así el rango cubre todo lo que empieza con el prefijo
+        ruta_jerarquia.c.ruta < prefijo[:-1] + "0",
+    )
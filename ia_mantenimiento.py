@@ -1,16 +1,32 @@
 # ia_mantenimiento.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import os
+from sqlmodel import Session
+from typing import AsyncIterator, List, Optional
+import asyncio
 import json
+import os
+
+# Cliente LLM compartido (pool de conexiones, concurrencia y reintentos)
+from services.ai_service import cliente_llm, SingleFlight, LimitadorTasa, evento_sse, CABECERAS_SSE
+from services.jobs_service import registro_trabajos, Trabajo
+from services.ai_metrics_service import metricas_ia, registrar_ruta_ia
+
+from db import engine, get_session, crud_procedimiento, crud_planta
+
+router = APIRouter(dependencies=[Depends(registrar_ruta_ia)])
+
+# Versión del prompt; cambiarla invalida los procedimientos almacenados
+VERSION_PROMPT = "v1"
 
-# Importaciones actualizadas para la nueva versión de LangChain
-from langchain_community.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
+# Generaciones en curso, para agrupar solicitudes idénticas concurrentes
+procedimientos_en_curso = SingleFlight()
 
-router = APIRouter()
+# Presupuesto de la generación por lotes (sobrescribible por variables de ambiente)
+LOTE_MAX_CONCURRENCIA = int(os.getenv("LOTE_MAX_CONCURRENCIA", "2"))
+LOTE_SOLICITUDES_POR_MINUTO = int(os.getenv("LOTE_SOLICITUDES_POR_MINUTO", "30"))
 
 # Modelo de datos para la solicitud de procedimiento
 class PasoMantenimiento(BaseModel):
@@ -28,10 +44,10 @@ class SolicitudProcedimiento(BaseModel):
     marca: Optional[str] = "Genérico"
     modelo: Optional[str] = "Genérico"
 
-# Template para la generación de procedimientos de mantenimiento
-procedimiento_template = PromptTemplate(
-    input_variables=["tipo_equipo", "marca", "modelo"],
-    template="""
+# Template para la generación de procedimientos de mantenimiento.
+# Es un str.format simple (las llaves literales van dobles) para no cargar
+# LangChain al importar el módulo.
+procedimiento_template = """
     Eres un experto en mantenimiento industrial especializado en {tipo_equipo}. Genera un procedimiento detallado de mantenimiento preventivo para el siguiente equipo:
     
     Tipo de Equipo: {tipo_equipo}
@@ -62,45 +78,331 @@ procedimiento_template = PromptTemplate(
     
     Solo devuelve el JSON, sin texto adicional.
     """
-)
 
-@router.post("/api/generar-procedimiento/", response_model=ProcedimientoResponse)
-async def generar_procedimiento(solicitud: SolicitudProcedimiento):
-    try:
-        # Obtener API key de OpenAI
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="API key no configurada")
-        
-        # Configurar el modelo de lenguaje
-        llm = ChatOpenAI(temperature=0.2, model="gpt-4o", api_key=api_key)
-        
-        # Crear la cadena para generar el procedimiento
-        chain = LLMChain(
-            llm=llm,
-            prompt=procedimiento_template
-        )
-        
-        # Generar el procedimiento
-        resultado = chain.run(
+def normalizar_texto(valor: Optional[str]) -> str:
+    """Normaliza un texto para la clave de caché: minúsculas y espacios simples"""
+    return " ".join((valor or "Genérico").split()).casefold()
+
+def clave_procedimiento(solicitud: SolicitudProcedimiento) -> str:
+    """Construye la clave normalizada (tipo|marca|modelo|versión) de un procedimiento"""
+    return "|".join([
+        normalizar_texto(solicitud.tipo_equipo),
+        normalizar_texto(solicitud.marca),
+        normalizar_texto(solicitud.modelo),
+        VERSION_PROMPT
+    ])
+
+def _leer_cache(clave: str) -> Optional[dict]:
+    """Busca un procedimiento previamente generado para la clave"""
+    with Session(engine) as session:
+        registro = crud_procedimiento.get_by_clave(session, clave)
+        return json.loads(registro.contenido) if registro else None
+
+def _guardar_cache(clave: str, solicitud: SolicitudProcedimiento, procedimiento: dict) -> None:
+    """Persiste un procedimiento generado para reutilizarlo en solicitudes futuras"""
+    with Session(engine) as session:
+        crud_procedimiento.guardar(
+            session,
+            clave=clave,
             tipo_equipo=solicitud.tipo_equipo,
-            marca=solicitud.marca,
-            modelo=solicitud.modelo
+            marca=solicitud.marca or "Genérico",
+            modelo=solicitud.modelo or "Genérico",
+            version_prompt=VERSION_PROMPT,
+            contenido=json.dumps(procedimiento, ensure_ascii=False)
         )
-        
-        # Parsear el resultado JSON
-        # Eliminar posibles backticks y marcadores de código que pueda incluir el LLM
-        resultado_limpio = resultado.replace("```json", "").replace("```", "").strip()
+
+def _prompt_procedimiento(solicitud: SolicitudProcedimiento) -> str:
+    """Construye el prompt de generación para una solicitud"""
+    return procedimiento_template.format(
+        tipo_equipo=solicitud.tipo_equipo,
+        marca=solicitud.marca,
+        modelo=solicitud.modelo
+    )
+
+def _parsear_procedimiento(resultado: str) -> dict:
+    """
+    Convierte la respuesta del LLM en un procedimiento validado
+    
+    Raises:
+        HTTPException: Si la respuesta no es JSON válido o no cumple la estructura
+    """
+    # Eliminar posibles backticks y marcadores de código que pueda incluir el LLM
+    resultado_limpio = resultado.replace("```json", "").replace("```", "").strip()
+    try:
         procedimiento = json.loads(resultado_limpio)
-        
-        return procedimiento
     except json.JSONDecodeError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error en formato JSON: {str(e)}. Respuesta: {resultado_limpio}"
         )
+    
+    # Validar la estructura antes de almacenarla en caché
+    try:
+        return ProcedimientoResponse(**procedimiento).dict()
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generando el procedimiento: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+async def _buscar_en_cache(clave: str) -> Optional[dict]:
+    """Busca un procedimiento en la caché y registra el acierto o fallo en las métricas"""
+    procedimiento = await run_in_threadpool(_leer_cache, clave)
+    metricas_ia.registrar_cache(procedimiento is not None)
+    return procedimiento
+
+async def _generar_con_llm(solicitud: SolicitudProcedimiento) -> dict:
+    """Genera un procedimiento con el LLM y valida su estructura"""
+    try:
+        # Generar el procedimiento sin bloquear el event loop
+        resultado = await cliente_llm.invocar(_prompt_procedimiento(solicitud))
+        return _parsear_procedimiento(resultado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generando el procedimiento: {str(e)}"
+        )
+
+async def _generar_coalescido(solicitud: SolicitudProcedimiento, clave: str) -> dict:
+    """Genera y guarda un procedimiento, compartiendo la llamada entre solicitudes idénticas"""
+    async def generar_y_guardar() -> dict:
+        procedimiento = await _generar_con_llm(solicitud)
+        await run_in_threadpool(_guardar_cache, clave, solicitud, procedimiento)
+        return procedimiento
+    
+    return await procedimientos_en_curso.ejecutar(clave, generar_y_guardar)
+
+async def obtener_procedimiento(solicitud: SolicitudProcedimiento, *, regenerar: bool = False) -> dict:
+    """
+    Obtiene un procedimiento desde la caché persistente o lo genera con el LLM
+    
+    Las solicitudes concurrentes con la misma clave comparten una única
+    llamada al LLM, cuyo resultado se guarda antes de responder.
+    
+    Args:
+        solicitud: Datos del equipo
+        regenerar: Si es True se ignora la caché y se genera de nuevo
+        
+    Returns:
+        Procedimiento como diccionario
+    """
+    clave = clave_procedimiento(solicitud)
+    
+    if not regenerar:
+        procedimiento = await _buscar_en_cache(clave)
+        if procedimiento is not None:
+            return procedimiento
+    
+    return await _generar_coalescido(solicitud, clave)
+
+@router.post("/api/generar-procedimiento/", response_model=ProcedimientoResponse)
+async def generar_procedimiento(solicitud: SolicitudProcedimiento, regenerar: bool = False):
+    """Genera un procedimiento de mantenimiento preventivo, reutilizando la caché salvo que se pida regenerar"""
+    return await obtener_procedimiento(solicitud, regenerar=regenerar)
+
+# ----------------- TRANSMISIÓN (SSE) -----------------
+
+class ParserPasosIncremental:
+    """
+    Parser incremental del JSON de un procedimiento.
+
+    Recibe la respuesta del LLM por fragmentos y entrega cada objeto del
+    arreglo "pasos" apenas se cierra, sin esperar al resto del documento.
+    Solo sigue cadenas, escapes y profundidad de anidamiento, por lo que
+    cada carácter se examina una única vez.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._posicion = 0
+        self._profundidad = 0
+        self._en_cadena = False
+        self._escape = False
+        self._inicio_cadena = 0
+        self._ultima_cadena = None
+        self._profundidad_pasos = None
+        self._inicio_paso = None
+    
+    def alimentar(self, fragmento: str) -> List[dict]:
+        """
+        Agrega un fragmento de texto y retorna los pasos completados en él
+        
+        Args:
+            fragmento: Texto recibido del LLM
+            
+        Returns:
+            Lista de pasos (diccionarios) cerrados con este fragmento
+        """
+        self._buffer += fragmento
+        pasos = []
+        
+        while self._posicion < len(self._buffer):
+            caracter = self._buffer[self._posicion]
+            
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif caracter == "\\":
+                    self._escape = True
+                elif caracter == '"':
+                    self._en_cadena = False
+                    self._ultima_cadena = self._buffer[self._inicio_cadena + 1:self._posicion]
+            elif caracter == '"':
+                self._en_cadena = True
+                self._inicio_cadena = self._posicion
+            elif caracter in "{[":
+                self._profundidad += 1
+                if caracter == "[" and self._profundidad == 2 and self._ultima_cadena == "pasos":
+                    self._profundidad_pasos = self._profundidad
+                elif (caracter == "{" and self._profundidad_pasos is not None
+                        and self._profundidad == self._profundidad_pasos + 1):
+                    self._inicio_paso = self._posicion
+            elif caracter in "}]":
+                if (caracter == "}" and self._inicio_paso is not None
+                        and self._profundidad == self._profundidad_pasos + 1):
+                    try:
+                        pasos.append(json.loads(self._buffer[self._inicio_paso:self._posicion + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._inicio_paso = None
+                elif caracter == "]" and self._profundidad == self._profundidad_pasos:
+                    self._profundidad_pasos = None
+                self._profundidad -= 1
+            
+            self._posicion += 1
+        
+        return pasos
+    
+    @property
+    def texto(self) -> str:
+        """Texto completo recibido hasta el momento"""
+        return self._buffer
+
+async def _transmitir_procedimiento(solicitud: SolicitudProcedimiento, regenerar: bool) -> AsyncIterator[str]:
+    """Genera los eventos SSE de un procedimiento: tokens, pasos completos y resultado final"""
+    clave = clave_procedimiento(solicitud)
+    
+    try:
+        if not regenerar:
+            procedimiento = await _buscar_en_cache(clave)
+            if procedimiento is not None:
+                for indice, paso in enumerate(procedimiento["pasos"]):
+                    yield evento_sse("paso", {"indice": indice, "paso": paso})
+                yield evento_sse("procedimiento", {"cache": True, "procedimiento": procedimiento})
+                return
+        
+        parser = ParserPasosIncremental()
+        indice = 0
+        async for fragmento in cliente_llm.transmitir(_prompt_procedimiento(solicitud)):
+            if not fragmento:
+                continue
+            yield evento_sse("token", {"texto": fragmento})
+            for paso in parser.alimentar(fragmento):
+                try:
+                    paso = PasoMantenimiento(**paso).dict()
+                except Exception:
+                    continue
+                yield evento_sse("paso", {"indice": indice, "paso": paso})
+                indice += 1
+        
+        procedimiento = _parsear_procedimiento(parser.texto)
+        await run_in_threadpool(_guardar_cache, clave, solicitud, procedimiento)
+        yield evento_sse("procedimiento", {"cache": False, "procedimiento": procedimiento})
+    except HTTPException as e:
+        yield evento_sse("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        yield evento_sse("error", {"status_code": 500, "detail": f"Error generando el procedimiento: {str(e)}"})
+
+@router.post("/api/generar-procedimiento/stream")
+async def generar_procedimiento_stream(solicitud: SolicitudProcedimiento, regenerar: bool = False):
+    """
+    Variante SSE de la generación de procedimientos.
+    Emite eventos "token" con el texto recibido, "paso" con cada paso completo,
+    "procedimiento" con el resultado validado y "error" si la generación falla.
+    """
+    return StreamingResponse(
+        _transmitir_procedimiento(solicitud, regenerar),
+        media_type="text/event-stream",
+        headers=CABECERAS_SSE
+    )
+
+# ----------------- GENERACIÓN POR LOTES -----------------
+
+async def generar_lote(trabajo: Trabajo, solicitudes: List[SolicitudProcedimiento], regenerar: bool = False):
+    """
+    Genera en segundo plano los procedimientos de una lista de solicitudes
+    
+    Las llamadas al LLM se limitan por concurrencia y por tasa; los
+    procedimientos que ya están en caché no consumen presupuesto.
+    
+    Args:
+        trabajo: Trabajo donde se reporta el progreso
+        solicitudes: Solicitudes sin repetir a procesar
+        regenerar: Si es True se ignora la caché
+    """
+    semaforo = asyncio.Semaphore(LOTE_MAX_CONCURRENCIA)
+    limitador = LimitadorTasa(LOTE_SOLICITUDES_POR_MINUTO)
+    
+    async def procesar(solicitud: SolicitudProcedimiento):
+        descripcion = f"{solicitud.tipo_equipo} / {solicitud.marca} / {solicitud.modelo}"
+        clave = clave_procedimiento(solicitud)
+        try:
+            if not regenerar and await _buscar_en_cache(clave) is not None:
+                registro_trabajos.avanzar(trabajo, en_cache=1)
+                return
+            
+            async with semaforo:
+                await limitador.esperar()
+                await _generar_coalescido(solicitud, clave)
+            registro_trabajos.avanzar(trabajo, generados=1)
+        except HTTPException as e:
+            registro_trabajos.avanzar(trabajo, error=f"{descripcion}: {e.detail}")
+        except Exception as e:
+            registro_trabajos.avanzar(trabajo, error=f"{descripcion}: {str(e)}")
+    
+    registro_trabajos.iniciar(trabajo)
+    await asyncio.gather(*(procesar(solicitud) for solicitud in solicitudes))
+    registro_trabajos.finalizar(trabajo)
+
+@router.post("/api/plantas/{planta_id}/procedimientos", response_model=Trabajo, status_code=202)
+def generar_procedimientos_planta(
+    planta_id: int,
+    background_tasks: BackgroundTasks,
+    regenerar: bool = False,
+    session: Session = Depends(get_session)
+):
+    """Lanza la generación de procedimientos para cada combinación tipo/fabricante/modelo de una planta"""
+    if not crud_planta.exists(session, planta_id):
+        raise HTTPException(status_code=404, detail="Planta no encontrada")
+    
+    # Deduplicar por clave normalizada (la consulta ya elimina repetidos exactos)
+    solicitudes = {}
+    for tipo_equipo, marca, modelo in crud_planta.get_combinaciones_activos(session, planta_id):
+        solicitud = SolicitudProcedimiento(
+            tipo_equipo=tipo_equipo,
+            marca=marca or "Genérico",
+            modelo=modelo or "Genérico"
+        )
+        solicitudes.setdefault(clave_procedimiento(solicitud), solicitud)
+    
+    trabajo = registro_trabajos.crear("procedimientos_planta", total=len(solicitudes))
+    trabajo.resultado["planta_id"] = planta_id
+    background_tasks.add_task(generar_lote, trabajo, list(solicitudes.values()), regenerar)
+    return trabajo
+
+@router.get("/api/procedimientos/lotes/{trabajo_id}", response_model=Trabajo)
+def obtener_lote_procedimientos(trabajo_id: str):
+    """Consulta el progreso de una generación de procedimientos por lotes"""
+    trabajo = registro_trabajos.obtener(trabajo_id)
+    if not trabajo or trabajo.tipo != "procedimientos_planta":
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
+
+# ----------------- MÉTRICAS -----------------
+
+@router.get("/api/ia/metricas")
+def obtener_metricas_ia():
+    """Retorna tiempo, tokens, costo estimado y aciertos de caché de las llamadas de IA por ruta"""
+    return metricas_ia.resumen()
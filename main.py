@@ -6,11 +6,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
-# Importar la configuración de base de datos
-from db import create_db
+# Cargar la configuración de ambiente antes de importar los módulos que la leen
+from dotenv import load_dotenv
+load_dotenv()
 
-# Importar el router de IA para mantenimiento
-from ia_mantenimiento import router as ia_mantenimiento_router
+# Importar la configuración de base de datos
+from db import create_db, engine
 
 # Importar todos los routers modularizados
 from routers import (
@@ -19,12 +20,23 @@ from routers import (
     operations_router,
     business_router,
     users_router,
-    llamaindex_router
+    llamaindex_router,
+    monitoring_router,
+    profiling_router,
+    cargue_router,
+    snapshot_router,
+    busqueda_router
 )
 
-# Importar configuración de ambiente
-from dotenv import load_dotenv
-load_dotenv()
+# Importar el router de IA para mantenimiento
+from ia_mantenimiento import router as ia_mantenimiento_router
+from services.ai_service import cliente_llm
+from services.metrics_service import MiddlewareMetricas, instrumentar_engine
+from services.profiling_service import MiddlewarePerfilado
+from services.health_service import verificador_disponibilidad, verificar_chroma
+
+# Permite desactivar por completo los routers de IA (ej. workers sin credenciales)
+GAME_HABILITAR_IA = os.getenv("GAME_HABILITAR_IA", "true").lower() in ("1", "true", "si", "yes")
 
 # ----------------- INICIALIZACIÓN DE APP -----------------
 
@@ -41,6 +53,14 @@ def on_startup():
     # Asegurar que existen los directorios necesarios
     os.makedirs("assets/cvs", exist_ok=True)
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Libera los recursos compartidos al detener la aplicación"""
+    await cliente_llm.cerrar()
+
+# Métricas de consultas y del pool de conexiones
+instrumentar_engine(engine)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -50,17 +70,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Montar carpeta de assets
+# Perfilado bajo demanda (cabecera X-Profile: 1 o muestreo PERFIL_MUESTREO)
+app.add_middleware(MiddlewarePerfilado)
+
+# Medir todas las solicitudes (se agrega al final para envolver también a CORS)
+app.add_middleware(MiddlewareMetricas)
+
+# Montar carpeta de assets (StaticFiles exige que exista al montarla)
+os.makedirs("assets", exist_ok=True)
 app.mount("/assets", StaticFiles(directory="assets"), name="assets")
 
 # Incluir todos los routers
-app.include_router(ia_mantenimiento_router, tags=["IA"])
 app.include_router(equipment_router)
 app.include_router(organization_router)
 app.include_router(operations_router)
 app.include_router(business_router)
 app.include_router(users_router)
-app.include_router(llamaindex_router)
+app.include_router(monitoring_router)
+app.include_router(profiling_router)
+app.include_router(cargue_router)
+app.include_router(snapshot_router)
+app.include_router(busqueda_router)
+
+# Routers de IA; sus dependencias pesadas se cargan en el primer uso
+if GAME_HABILITAR_IA:
+    app.include_router(ia_mantenimiento_router, tags=["IA"])
+    app.include_router(llamaindex_router)
+    verificador_disponibilidad.registrar("chroma", verificar_chroma)
 
 @app.get("/api/health")
 def health_check():
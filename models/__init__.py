@@ -10,6 +10,8 @@ from .organization import *
 from .users import *
 from .business import *
 from .operations import *
+from .ia import *
+from .busqueda import *
 
 # Para crear tablas en la base de datos
 from sqlmodel import SQLModel
\ No newline at end of file
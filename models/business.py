@@ -4,6 +4,8 @@ Modelos relacionados con entidades de negocio: clientes y contratos.
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
 
+from models.relaciones import HIJOS_RESTRINGIDOS
+
 # ----------------- CONTRATOS Y CLIENTES -----------------
 
 class Cliente(SQLModel, table=True):
@@ -11,22 +13,22 @@ class Cliente(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     nombre: str
     descripcion: Optional[str] = None
-    contratos: List["Contrato"] = Relationship(back_populates="cliente")
+    contratos: List["Contrato"] = Relationship(back_populates="cliente", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class Contrato(SQLModel, table=True):
     """Modelo para contratos"""
     id: Optional[int] = Field(default=None, primary_key=True)
     nombre: str
     descripcion: Optional[str] = None
-    cliente_id: int = Field(foreign_key="cliente.id")
+    cliente_id: int = Field(foreign_key="cliente.id", index=True)
     cliente: Cliente = Relationship(back_populates="contratos")
-    plantas: List["Planta"] = Relationship(back_populates="contrato")
-    contratos_usuarios: List["ContratoUsuario"] = Relationship(back_populates="contrato")
+    plantas: List["Planta"] = Relationship(back_populates="contrato", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
+    contratos_usuarios: List["ContratoUsuario"] = Relationship(back_populates="contrato", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class ContratoUsuario(SQLModel, table=True):
     """Modelo de relación entre contratos y usuarios"""
     usuario_id: int = Field(foreign_key="usuario.id", primary_key=True)
-    contrato_id: int = Field(foreign_key="contrato.id", primary_key=True)
+    contrato_id: int = Field(foreign_key="contrato.id", primary_key=True, index=True)
     usuario: "Usuario" = Relationship(back_populates="contratos")
     contrato: Contrato = Relationship(back_populates="contratos_usuarios")
 
@@ -0,0 +1,14 @@
+"""
+Modelos de lectura para la búsqueda global entre entidades.
+"""
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class ResultadoBusqueda(SQLModel):
+    """Documento encontrado por la búsqueda global"""
+    tipo: str = Field(description="cliente, contrato, planta, sistema, subsistema, equipo o persona")
+    id: int
+    titulo: str
+    detalle: Optional[str] = None
+    ruta: Optional[str] = Field(default=None, description="Ruta en la jerarquía, ej. Planta › Sistema › Subsistema")
+    relevancia: float = Field(description="Puntaje bm25: menor es más relevante")
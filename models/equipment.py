@@ -2,12 +2,15 @@
 Modelos relacionados con equipos, tipos de activos, fabricantes y modelos.
 """
 from typing import Optional, List
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
+from models.relaciones import HIJOS_RESTRINGIDOS
+
 # ----------------- TIPO DE ACTIVOS -----------------
 class TipoActivoBase(SQLModel):
     """Modelo base para tipos de activos"""
-    descripcion: str
+    descripcion: str = Field(index=True, unique=True)
     imagen: Optional[str] = None
 
 class TipoActivo(TipoActivoBase, table=True):
@@ -31,12 +34,12 @@ class TipoActivoUpdate(SQLModel):
 
 class FabricanteBase(SQLModel):
     """Modelo base para fabricantes"""
-    nombre: str = Field(max_length=100)
+    nombre: str = Field(max_length=100, index=True, unique=True)
 
 class Fabricante(FabricanteBase, table=True):
     """Modelo de fabricante para la base de datos"""
     id: Optional[int] = Field(default=None, primary_key=True)
-    modelos: List["Modelo"] = Relationship(back_populates="fabricante")
+    modelos: List["Modelo"] = Relationship(back_populates="fabricante", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class FabricanteCreate(FabricanteBase):
     """Modelo para crear un fabricante"""
@@ -56,10 +59,13 @@ class ModeloBase(SQLModel):
 
 class Modelo(ModeloBase, table=True):
     """Modelo de modelo de equipo para la base de datos"""
+    # Un fabricante no repite nombres de modelo (clave natural de la sincronización)
+    __table_args__ = (Index("ux_modelo_fabricante_nombre", "fabricante_id", "nombre", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    fabricante_id: int = Field(foreign_key="fabricante.id")
+    fabricante_id: int = Field(foreign_key="fabricante.id", index=True)
     fabricante: Optional[Fabricante] = Relationship(back_populates="modelos")
-    equipos: List["Equipo"] = Relationship(back_populates="modelo")
+    equipos: List["Equipo"] = Relationship(back_populates="modelo", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class ModeloCreate(ModeloBase):
     """Modelo para crear un modelo de equipo"""
@@ -91,12 +97,12 @@ class EquipoBase(SQLModel):
 class Equipo(EquipoBase, table=True):
     """Modelo de equipo para la base de datos"""
     id: Optional[int] = Field(default=None, primary_key=True)
-    subsistema_id: int = Field(foreign_key="subsistema.id")
-    tipo_activo_id: int = Field(foreign_key="tipoactivo.id")
-    fabricante_id: Optional[int] = Field(default=None, foreign_key="fabricante.id")
-    modelo_id: Optional[int] = Field(default=None, foreign_key="modelo.id")
+    subsistema_id: int = Field(foreign_key="subsistema.id", index=True)
+    tipo_activo_id: int = Field(foreign_key="tipoactivo.id", index=True)
+    fabricante_id: Optional[int] = Field(default=None, foreign_key="fabricante.id", index=True)
+    modelo_id: Optional[int] = Field(default=None, foreign_key="modelo.id", index=True)
 
-    actividades: List["Actividad"] = Relationship(back_populates="equipo")
+    actividades: List["Actividad"] = Relationship(back_populates="equipo", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
     subsistema: Optional["SubSistema"] = Relationship(back_populates="equipos")
     tipo_activo: Optional[TipoActivo] = Relationship()
     fabricante: Optional[Fabricante] = Relationship()
@@ -143,6 +149,36 @@ class EquipoReadMini(SQLModel):
     id: int
     nombre: str
 
+class EquipoBusqueda(SQLModel):
+    """Modelo para un resultado de la búsqueda de texto de equipos"""
+    id: int
+    nombre: str
+    ubicacion: Optional[str] = None
+    subsistema_id: int
+    tipo_activo: Optional[str] = None
+    fabricante: Optional[str] = None
+    modelo: Optional[str] = None
+    relevancia: float = Field(description="Puntaje bm25: menor es más relevante")
+
+class FacetaValor(SQLModel):
+    """Cantidad de equipos para un valor de una faceta del filtro"""
+    id: Optional[int] = Field(default=None, description="None agrupa los equipos sin valor")
+    nombre: Optional[str] = None
+    cantidad: int
+
+class FacetasEquipos(SQLModel):
+    """Conteos por faceta; cada faceta ignora su propio filtro"""
+    tipo_activo: List[FacetaValor] = []
+    fabricante: List[FacetaValor] = []
+    modelo: List[FacetaValor] = []
+    subsistema: List[FacetaValor] = []
+
+class EquiposFiltrados(SQLModel):
+    """Página de equipos filtrados con el total y las facetas del filtro"""
+    total: int
+    equipos: List[EquipoRead]
+    facetas: FacetasEquipos
+
 # Importaciones circulares que necesitan ser manejadas con strings
 from .organization import SubSistema
 from .operations import Actividad
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+Modelos relacionados con los servicios de inteligencia artificial.
+"""
+from typing import Optional
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field
+
+# ----------------- PROCEDIMIENTOS GENERADOS -----------------
+
+class ProcedimientoGenerado(SQLModel, table=True):
+    """Modelo para procedimientos de mantenimiento generados por IA (caché persistente)"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    clave: str = Field(index=True, unique=True, description="tipo|marca|modelo|versión normalizados")
+    tipo_equipo: str
+    marca: str
+    modelo: str
+    version_prompt: str = Field(max_length=20)
+    contenido: str = Field(description="Procedimiento en formato JSON")
+    fecha_generacion: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
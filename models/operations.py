@@ -5,34 +5,36 @@ from typing import Optional, List
 from datetime import date
 from sqlmodel import SQLModel, Field, Relationship
 
+from models.relaciones import HIJOS_RESTRINGIDOS
+
 # ----------------- CARGOS Y PERSONAS -----------------
 
 class Cargo(SQLModel, table=True):
     """Modelo para cargos laborales"""
     id: Optional[int] = Field(default=None, primary_key=True)
     descripcion: str = Field(max_length=50)
-    personas: List["Persona"] = Relationship(back_populates="cargo")
+    personas: List["Persona"] = Relationship(back_populates="cargo", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class Persona(SQLModel, table=True):
     """Modelo para personas/empleados"""
     identificacion: int = Field(primary_key=True)
     nombres: str = Field(max_length=100)
-    cargo_id: Optional[int] = Field(default=None, foreign_key="cargo.id")
+    cargo_id: Optional[int] = Field(default=None, foreign_key="cargo.id", index=True)
     cargo: Optional[Cargo] = Relationship(back_populates="personas")
-    actividades: List["Actividad"] = Relationship(back_populates="persona")
+    actividades: List["Actividad"] = Relationship(back_populates="persona", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 # ----------------- ACTIVIDADES -----------------
 
 class ActividadBase(SQLModel):
     """Modelo base para actividades"""
     descripcion: str = Field(max_length=40, description="Máximo 40 caracteres")
-    fecha: date
+    fecha: date = Field(index=True)
 
 class Actividad(ActividadBase, table=True):
     """Modelo para actividades de mantenimiento"""
     id: Optional[int] = Field(default=None, primary_key=True)
-    equipo_id: int = Field(foreign_key="equipo.id")
-    persona_id: int = Field(foreign_key="persona.identificacion")
+    equipo_id: int = Field(foreign_key="equipo.id", index=True)
+    persona_id: int = Field(foreign_key="persona.identificacion", index=True)
     equipo: Optional["Equipo"] = Relationship(back_populates="actividades")
     persona: Optional[Persona] = Relationship(back_populates="actividades")
 
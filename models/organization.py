@@ -4,6 +4,8 @@ Modelos relacionados con la estructura organizativa: plantas, sistemas y subsist
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
 
+from models.relaciones import HIJOS_RESTRINGIDOS
+
 # Importación anticipada para evitar referencia circular
 from .equipment import EquipoReadMini
 
@@ -15,10 +17,10 @@ class Sistema(SQLModel, table=True):
     codigo: str = Field(max_length=20)
     nombre: str
     descripcion: Optional[str] = None 
-    planta_id: int = Field(foreign_key="planta.id")
+    planta_id: int = Field(foreign_key="planta.id", index=True)
 
     planta: Optional["Planta"] = Relationship(back_populates="sistemas")
-    subsistemas: List["SubSistema"] = Relationship(back_populates="sistema")
+    subsistemas: List["SubSistema"] = Relationship(back_populates="sistema", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class SubSistema(SQLModel, table=True):
     """Modelo para subsistemas"""
@@ -26,10 +28,10 @@ class SubSistema(SQLModel, table=True):
     codigo: str = Field(max_length=20)
     nombre: str
     descripcion: Optional[str] = None 
-    sistema_id: int = Field(foreign_key="sistema.id")
+    sistema_id: int = Field(foreign_key="sistema.id", index=True)
 
     sistema: Optional[Sistema] = Relationship(back_populates="subsistemas")
-    equipos: List["Equipo"] = Relationship(back_populates="subsistema")
+    equipos: List["Equipo"] = Relationship(back_populates="subsistema", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class Planta(SQLModel, table=True):
     """Modelo para plantas"""
@@ -38,18 +40,25 @@ class Planta(SQLModel, table=True):
     descripcion: Optional[str] = None
     municipio: str
     localizacion: Optional[str] = None  # GPS
-    contrato_id: int = Field(foreign_key="contrato.id")
+    contrato_id: int = Field(foreign_key="contrato.id", index=True)
     contrato: "Contrato" = Relationship(back_populates="plantas")
-    sistemas: List[Sistema] = Relationship(back_populates="planta")
+    sistemas: List[Sistema] = Relationship(back_populates="planta", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 # ----------------- MODELOS JERÁRQUICOS (PARA VISUALIZACIÓN) -----------------
 
+class AgregadosNodo(SQLModel):
+    """Contadores de un nodo de la jerarquía"""
+    equipos: int = Field(description="Equipos bajo el nodo")
+    actividades_mes: int = Field(description="Actividades del mes consultado bajo el nodo")
+
 class SubSistemaRead(SQLModel):
     """Modelo de lectura para subsistemas en jerarquía"""
     id: int
     codigo: str
     nombre: str
     descripcion: str 
+    total_equipos: Optional[int] = None
+    agregados: Optional[AgregadosNodo] = None
     equipos: List[EquipoReadMini] = []
 
 class SistemaRead(SQLModel):
@@ -58,6 +67,8 @@ class SistemaRead(SQLModel):
     codigo: str
     nombre: str
     descripcion: str
+    total_subsistemas: Optional[int] = None
+    agregados: Optional[AgregadosNodo] = None
     subsistemas: List[SubSistemaRead] = []
 
 class PlantaJerarquica(SQLModel):
@@ -66,8 +77,30 @@ class PlantaJerarquica(SQLModel):
     nombre: str
     municipio: str
     localizacion: Optional[str] = None
+    total_sistemas: Optional[int] = None
+    agregados: Optional[AgregadosNodo] = None
     sistemas: List[SistemaRead] = []
 
+class NodoHijo(SQLModel):
+    """Hijo directo de un nodo de la jerarquía, para expandir el árbol por partes"""
+    tipo: str
+    id: int
+    nombre: str
+    codigo: Optional[str] = None
+    total_hijos: int = Field(description="Cantidad de hijos directos del nodo (0 para equipos)")
+
+# ----------------- MOVIMIENTOS MASIVOS -----------------
+
+class MovimientoNodos(SQLModel):
+    """Registros a mover a un mismo padre de la jerarquía"""
+    ids: List[int] = Field(min_length=1, max_length=5000, description="IDs de los registros a mover")
+    destino_id: int = Field(description="ID del nuevo padre")
+
+class ResultadoMovimiento(SQLModel):
+    """Resultado de un movimiento masivo"""
+    movidos: int
+    sin_cambios: int = Field(description="Registros que ya estaban en el destino")
+
 # Importaciones circulares que necesitan ser manejadas con strings
 from .equipment import Equipo
 from .business import Contrato
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Opciones compartidas de las relaciones entre modelos.
+"""
+
+# Para las colecciones de hijos (ej. Modelo.equipos): al eliminar el padre el
+# ORM no desvincula a los hijos (pondría su llave foránea en NULL); la llave
+# foránea de la base de datos rechaza la eliminación si aún tiene hijos
+HIJOS_RESTRINGIDOS = {"passive_deletes": "all"}
@@ -4,27 +4,29 @@ Modelos relacionados con usuarios, roles y aplicaciones.
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
 
+from models.relaciones import HIJOS_RESTRINGIDOS
+
 # ----------------- USUARIOS Y AUTENTICACIÓN -----------------
 
 class Rol(SQLModel, table=True):
     """Modelo para roles de usuario"""
     id: Optional[int] = Field(default=None, primary_key=True)
     descripcion: str
-    usuarios: List["Usuario"] = Relationship(back_populates="rol")
-    aplicaciones: List["AplicacionRol"] = Relationship(back_populates="rol")
+    usuarios: List["Usuario"] = Relationship(back_populates="rol", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
+    aplicaciones: List["AplicacionRol"] = Relationship(back_populates="rol", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class Aplicacion(SQLModel, table=True):
     """Modelo para aplicaciones del sistema"""
     id: Optional[int] = Field(default=None, primary_key=True)
     nombre: str
     descripcion: Optional[str] = None
-    roles: List["AplicacionRol"] = Relationship(back_populates="aplicacion")
+    roles: List["AplicacionRol"] = Relationship(back_populates="aplicacion", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 class AplicacionRol(SQLModel, table=True):
     """Modelo de tabla intermedia para relación roles-aplicaciones"""
     id: Optional[int] = Field(default=None, primary_key=True)
-    rol_id: int = Field(foreign_key="rol.id")
-    aplicacion_id: int = Field(foreign_key="aplicacion.id")
+    rol_id: int = Field(foreign_key="rol.id", index=True)
+    aplicacion_id: int = Field(foreign_key="aplicacion.id", index=True)
     rol: Rol = Relationship(back_populates="aplicaciones")
     aplicacion: Aplicacion = Relationship(back_populates="roles")
 
@@ -34,9 +36,9 @@ class Usuario(SQLModel, table=True):
     username: str = Field(index=True, unique=True)
     password: str
     email: Optional[str] = None
-    rol_id: int = Field(foreign_key="rol.id")
+    rol_id: int = Field(foreign_key="rol.id", index=True)
     rol: Rol = Relationship(back_populates="usuarios")
-    contratos: List["ContratoUsuario"] = Relationship(back_populates="usuario")
+    contratos: List["ContratoUsuario"] = Relationship(back_populates="usuario", sa_relationship_kwargs=HIJOS_RESTRINGIDOS)
 
 # Importaciones circulares
 from .business import ContratoUsuario
\ No newline at end of file
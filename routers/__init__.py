@@ -9,4 +9,9 @@ from .organization import router as organization_router
 from .operations import router as operations_router
 from .business import router as business_router
 from .users import router as users_router
-from .llamaindex import router as llamaindex_router
\ No newline at end of file
+from .llamaindex import router as llamaindex_router
+from .monitoring import router as monitoring_router
+from .profiling import router as profiling_router
+from .cargue import router as cargue_router
+from .snapshot import router as snapshot_router
+from .busqueda import router as busqueda_router
@@ -5,12 +5,17 @@ utilizando las clases CRUD específicas.
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session
 from typing import List, Optional
+from datetime import date
 
 from models.business import (
     Cliente, Contrato, ContratoUsuario
 )
 from db import get_session, crud_cliente, crud_contrato, crud_contrato_usuario
+from models.equipment import EquipoRead
+from models.operations import ActividadRead
 from db import crud_usuario  # Para verificar referencias
+from db import crud_equipo, crud_actividad
+from db.jerarquia import prefijo_ruta
 
 # Crear router
 router = APIRouter(prefix="/api", tags=["Negocio"])
@@ -83,11 +88,7 @@ def eliminar_cliente(cliente_id: int, session: Session = Depends(get_session)):
 # ----------------- ENDPOINTS CONTRATO -----------------
 @router.post("/contratos/", response_model=Contrato)
 def crear_contrato(contrato: Contrato, session: Session = Depends(get_session)):
-    """Crea un nuevo contrato"""
-    # Verificar que existe el cliente
-    if not crud_cliente.exists(session, contrato.cliente_id):
-        raise HTTPException(status_code=404, detail="Cliente no encontrado")
-    
+    """Crea un nuevo contrato (404 si el cliente no existe)"""
     return crud_contrato.create(session, obj_in=contrato)
 
 @router.get("/contratos/", response_model=List[Contrato])
@@ -129,6 +130,36 @@ def obtener_contrato_con_plantas(contrato_id: int, session: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Contrato no encontrado")
     return contrato
 
+@router.get("/contratos/{contrato_id}/equipos", response_model=List[EquipoRead])
+def obtener_equipos_contrato(
+    contrato_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session)
+):
+    """Obtiene los equipos de todas las plantas de un contrato"""
+    if not crud_contrato.exists(session, contrato_id):
+        raise HTTPException(status_code=404, detail="Contrato no encontrado")
+    
+    return crud_equipo.get_by_ruta(session, prefijo_ruta(contrato_id), skip=skip, limit=limit)
+
+@router.get("/contratos/{contrato_id}/actividades", response_model=List[ActividadRead])
+def obtener_actividades_contrato(
+    contrato_id: int,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session)
+):
+    """Obtiene las actividades de los equipos de un contrato, de la más reciente a la más antigua"""
+    if not crud_contrato.exists(session, contrato_id):
+        raise HTTPException(status_code=404, detail="Contrato no encontrado")
+    
+    return crud_actividad.get_by_ruta(
+        session, prefijo_ruta(contrato_id), desde=desde, hasta=hasta, skip=skip, limit=limit
+    )
+
 @router.put("/contratos/{contrato_id}", response_model=Contrato)
 def actualizar_contrato(contrato_id: int, contrato_data: Contrato, session: Session = Depends(get_session)):
     """Actualiza un contrato existente"""
@@ -136,10 +167,6 @@ def actualizar_contrato(contrato_id: int, contrato_data: Contrato, session: Sess
     if not contrato:
         raise HTTPException(status_code=404, detail="Contrato no encontrado")
     
-    # Verificar cliente si se va a actualizar
-    if contrato_data.cliente_id and not crud_cliente.exists(session, contrato_data.cliente_id):
-        raise HTTPException(status_code=404, detail="Cliente no encontrado")
-    
     return crud_contrato.update(session, db_obj=contrato, obj_in=contrato_data)
 
 @router.delete("/contratos/{contrato_id}")
@@ -0,0 +1,40 @@
+"""
+Router para la búsqueda global sobre todas las entidades.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from typing import List, Optional
+
+from models.busqueda import ResultadoBusqueda
+from db import get_session
+from db.busqueda import DOCUMENTOS_BUSQUEDA, buscar_global
+
+# Crear router
+router = APIRouter(prefix="/api", tags=["Búsqueda"])
+
+@router.get("/buscar", response_model=List[ResultadoBusqueda])
+def buscar(
+    q: str = Query(..., min_length=1, description="Palabras a buscar; la última puede ser un prefijo"),
+    tipos: Optional[str] = Query(None, description="Tipos separados por coma, ej. planta,equipo"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session)
+):
+    """
+    Busca clientes, contratos, plantas, sistemas, subsistemas, equipos y
+    personas en una sola consulta, ordenados por relevancia.
+    No distingue tildes ni mayúsculas; la última palabra coincide como prefijo.
+    """
+    if session.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="La búsqueda de texto requiere SQLite con FTS5")
+
+    lista_tipos = [t.strip() for t in tipos.split(",") if t.strip()] if tipos else None
+    if lista_tipos:
+        desconocidos = set(lista_tipos) - set(DOCUMENTOS_BUSQUEDA)
+        if desconocidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tipos no válidos: {sorted(desconocidos)}. Permitidos: {list(DOCUMENTOS_BUSQUEDA)}"
+            )
+
+    return buscar_global(session.connection(), q, tipos=lista_tipos, skip=skip, limit=limit)
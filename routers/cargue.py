@@ -0,0 +1,56 @@
+"""
+Router para el cargue masivo de registros desde archivos Excel.
+"""
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, File, Query, UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from db import get_session
+from services.cargue_service import (
+    TABLAS_CARGUE, TAMANO_BLOQUE, CargueMasivo, ErrorCargue, describir_tabla
+)
+
+logger = logging.getLogger(__name__)
+
+# Crear router
+router = APIRouter(prefix="/api", tags=["Cargue masivo"])
+
+@router.get("/cargue_masivo/")
+def listar_tablas_cargue():
+    """Lista las tablas habilitadas para el cargue masivo con sus columnas"""
+    return {tabla: describir_tabla(modelo) for tabla, modelo in TABLAS_CARGUE.items()}
+
+@router.post("/cargue_masivo/{tabla}")
+def cargue_masivo(
+    tabla: str,
+    file: UploadFile = File(...),
+    tamano_bloque: int = Query(TAMANO_BLOQUE, ge=100, le=20000),
+    session: Session = Depends(get_session)
+):
+    """
+    Carga los registros de la primera hoja de un archivo Excel.
+    La primera fila debe tener los nombres de las columnas de la tabla.
+    Las filas duplicadas se omiten y las filas con errores se reportan
+    con su número de fila, sin detener el cargue de las demás.
+    """
+    if tabla not in TABLAS_CARGUE:
+        raise HTTPException(status_code=400, detail=f"La tabla '{tabla}' no está soportada.")
+
+    try:
+        return CargueMasivo(session, TABLAS_CARGUE[tabla], tamano_bloque=tamano_bloque).cargar(file.file)
+    except ErrorCargue as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # El detalle del error del driver (SQL y parámetros) solo va al log
+    except IntegrityError:
+        session.rollback()
+        logger.exception("Cargue masivo en '%s' rechazado por la base de datos", tabla)
+        raise HTTPException(
+            status_code=409,
+            detail="Algunas filas violan una restricción de la base de datos; no se cargó ningún registro"
+        )
+    except Exception:
+        session.rollback()
+        logger.exception("Error en el cargue masivo de '%s'", tabla)
+        raise HTTPException(status_code=500, detail="Error procesando el archivo")
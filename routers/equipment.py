@@ -3,15 +3,17 @@ Router para equipos, tipos de activos, fabricantes y modelos,
 utilizando las clases CRUD específicas.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from models.equipment import (
-    EquipoCreate, EquipoUpdate, EquipoRead, EquipoReadDetallado,
+    Equipo, EquipoCreate, EquipoUpdate, EquipoRead, EquipoReadDetallado, EquipoBusqueda, EquiposFiltrados,
     TipoActivoCreate, TipoActivoRead, TipoActivoUpdate,
     FabricanteCreate, FabricanteRead, FabricanteUpdate,
     ModeloCreate, ModeloRead, ModeloReadDetallado, ModeloUpdate
 )
+from models.organization import SubSistema, MovimientoNodos, ResultadoMovimiento
 from db import get_session, crud_equipo, crud_tipo_activo, crud_fabricante, crud_modelo
 
 # Crear router
@@ -35,14 +37,27 @@ def listar_equipos(
         skip=skip, 
         limit=limit,
         options=[
-            lambda: crud_equipo.model.subsistema, 
-            lambda: crud_equipo.model.tipo_activo,
-            lambda: crud_equipo.model.fabricante,
-            lambda: crud_equipo.model.modelo
+            joinedload(Equipo.subsistema),
+            joinedload(Equipo.tipo_activo),
+            joinedload(Equipo.fabricante),
+            joinedload(Equipo.modelo)
         ]
     )
     return equipos
 
+@router.get("/equipos/buscar", response_model=List[EquipoBusqueda])
+def buscar_equipos(
+    q: str = Query(..., min_length=1, description="Palabras o prefijos a buscar"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session)
+):
+    """
+    Busca equipos por nombre, ubicación, fabricante, modelo o tipo de activo.
+    No distingue tildes ni mayúsculas y cada palabra coincide como prefijo.
+    """
+    return crud_equipo.buscar(session, q, skip=skip, limit=limit)
+
 @router.get("/equipos/{equipo_id}", response_model=EquipoReadDetallado)
 def obtener_equipo(equipo_id: int, session: Session = Depends(get_session)):
     """Obtiene un equipo por ID con todos sus detalles"""
@@ -51,23 +66,40 @@ def obtener_equipo(equipo_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Equipo no encontrado")
     return equipo
 
-@router.get("/equipos/filtrar/", response_model=List[EquipoRead])
+@router.get("/equipos/filtrar/", response_model=Union[EquiposFiltrados, List[EquipoRead]])
 def filtrar_equipos(
     subsistema_id: Optional[int] = None,
     fabricante_id: Optional[int] = None,
     modelo_id: Optional[int] = None,
+    tipo_activo_id: Optional[int] = None,
+    facetas: bool = Query(False, description="Incluir el total y los conteos por faceta"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Sin limit se retornan todos los equipos"),
     session: Session = Depends(get_session)
 ):
-    """Filtra equipos por subsistema, fabricante y/o modelo"""
-    filters = {}
-    if subsistema_id is not None:
-        filters["subsistema_id"] = subsistema_id
-    if fabricante_id is not None:
-        filters["fabricante_id"] = fabricante_id
-    if modelo_id is not None:
-        filters["modelo_id"] = modelo_id
-        
-    return crud_equipo.get_multi(session, filters=filters)
+    """
+    Filtra equipos por subsistema, fabricante, modelo y/o tipo de activo.
+    Sin skip ni limit retorna todos los equipos del filtro, como antes.
+    Con facetas=true retorna además el total del filtro y, para cada faceta,
+    la cantidad de equipos por valor sin aplicar el filtro de esa faceta.
+    """
+    filtros = {
+        "subsistema_id": subsistema_id,
+        "fabricante_id": fabricante_id,
+        "modelo_id": modelo_id,
+        "tipo_activo_id": tipo_activo_id,
+    }
+    equipos = crud_equipo.get_by_fabricante_modelo(session, skip=skip, limit=limit, **filtros)
+    if not facetas:
+        return equipos
+    
+    conteos = crud_equipo.contar_facetas(session, **filtros)
+    return EquiposFiltrados(total=conteos["total"], equipos=equipos, facetas=conteos["facetas"])
+
+@router.post("/equipos/mover", response_model=ResultadoMovimiento)
+def mover_equipos(movimiento: MovimientoNodos, session: Session = Depends(get_session)):
+    """Mueve varios equipos a un subsistema con una sola actualización"""
+    return crud_equipo.move_many(session, movimiento.ids, "subsistema_id", SubSistema, movimiento.destino_id)
 
 @router.put("/equipos/{equipo_id}", response_model=EquipoRead)
 def actualizar_equipo(equipo_id: int, equipo_data: EquipoUpdate, session: Session = Depends(get_session)):
@@ -76,25 +108,10 @@ def actualizar_equipo(equipo_id: int, equipo_data: EquipoUpdate, session: Sessio
     if not db_equipo:
         raise HTTPException(status_code=404, detail="Equipo no encontrado")
     
-    # Validaciones adicionales
-    if equipo_data.subsistema_id is not None and not crud_equipo.exists(session, equipo_data.subsistema_id):
-        raise HTTPException(status_code=404, detail="Subsistema no encontrado")
-        
-    if equipo_data.tipo_activo_id is not None and not crud_tipo_activo.exists(session, equipo_data.tipo_activo_id):
-        raise HTTPException(status_code=404, detail="Tipo de activo no encontrado")
-        
-    if equipo_data.fabricante_id is not None and not crud_fabricante.exists(session, equipo_data.fabricante_id):
-        raise HTTPException(status_code=404, detail="Fabricante no encontrado")
-        
-    if equipo_data.modelo_id is not None:
-        modelo = crud_modelo.get(session, equipo_data.modelo_id)
-        if not modelo:
-            raise HTTPException(status_code=404, detail="Modelo no encontrado")
-            
-        # Si se actualiza modelo y fabricante, verificar que coincidan
-        fabricante_id = equipo_data.fabricante_id if equipo_data.fabricante_id is not None else db_equipo.fabricante_id
-        if fabricante_id and modelo.fabricante_id != fabricante_id:
-            raise HTTPException(status_code=400, detail="El modelo no pertenece al fabricante especificado")
+    # Las referencias inexistentes las rechaza la base de datos (404)
+    crud_equipo.validar_modelo_fabricante(
+        session, equipo_data.dict(exclude_unset=True), fabricante_actual=db_equipo.fabricante_id
+    )
     
     return crud_equipo.update(session, db_obj=db_equipo, obj_in=equipo_data)
 
@@ -115,6 +132,11 @@ def crear_tipo_activo(tipo: TipoActivoCreate, session: Session = Depends(get_ses
     """Crea un nuevo tipo de activo"""
     return crud_tipo_activo.create(session, obj_in=tipo)
 
+@router.put("/tipos-activo/upsert")
+def sincronizar_tipos_activo(tipos: List[TipoActivoCreate], session: Session = Depends(get_session)):
+    """Inserta o actualiza tipos de activo identificados por su descripción"""
+    return crud_tipo_activo.upsert_many(session, tipos)
+
 @router.get("/tipos-activo/", response_model=List[TipoActivoRead])
 def listar_tipos_activo(
     skip: int = 0, 
@@ -157,6 +179,11 @@ def crear_fabricante(fabricante: FabricanteCreate, session: Session = Depends(ge
     """Crea un nuevo fabricante"""
     return crud_fabricante.create(session, obj_in=fabricante)
 
+@router.put("/fabricantes/upsert")
+def sincronizar_fabricantes(fabricantes: List[FabricanteCreate], session: Session = Depends(get_session)):
+    """Inserta o actualiza fabricantes identificados por su nombre"""
+    return crud_fabricante.upsert_many(session, fabricantes)
+
 @router.get("/fabricantes/", response_model=List[FabricanteRead])
 def listar_fabricantes(
     skip: int = 0, 
@@ -211,8 +238,19 @@ def eliminar_fabricante(fabricante_id: int, session: Session = Depends(get_sessi
 # ----------------- ENDPOINTS MODELO -----------------
 @router.post("/modelos/", response_model=ModeloRead)
 def crear_modelo(modelo: ModeloCreate, session: Session = Depends(get_session)):
-    """Crea un nuevo modelo"""
-    return crud_modelo.create_with_validation(session, obj_in=modelo)
+    """Crea un nuevo modelo (404 si el fabricante no existe)"""
+    return crud_modelo.create(session, obj_in=modelo)
+
+@router.put("/modelos/upsert")
+def sincronizar_modelos(modelos: List[ModeloCreate], session: Session = Depends(get_session)):
+    """Inserta o actualiza modelos identificados por fabricante y nombre"""
+    # Validar todos los fabricantes referenciados en una sola consulta
+    fabricantes = {m.fabricante_id for m in modelos}
+    faltantes = fabricantes - crud_fabricante.exists_many(session, fabricantes)
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Fabricantes no encontrados: {sorted(faltantes)}")
+    
+    return crud_modelo.upsert_many(session, modelos)
 
 @router.get("/modelos/", response_model=List[ModeloReadDetallado])
 def listar_modelos(
@@ -238,10 +276,6 @@ def actualizar_modelo(modelo_id: int, modelo_data: ModeloUpdate, session: Sessio
     if not modelo:
         raise HTTPException(status_code=404, detail="Modelo no encontrado")
     
-    # Validar fabricante si se actualiza
-    if modelo_data.fabricante_id is not None and not crud_fabricante.exists(session, modelo_data.fabricante_id):
-        raise HTTPException(status_code=404, detail="Fabricante no encontrado")
-    
     return crud_modelo.update(session, db_obj=modelo, obj_in=modelo_data)
 
 @router.delete("/modelos/{modelo_id}")
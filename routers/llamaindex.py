@@ -2,18 +2,20 @@
 Router para operaciones de búsqueda e indexación con LlamaIndex.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from typing import Iterator
 import os
-import chromadb
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, StorageContext
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core.node_parser import SimpleNodeParser
-from llama_index.core.ingestion import IngestionPipeline
 
 from db import get_session
+from services.ai_service import evento_sse, CABECERAS_SSE
+from services.ai_metrics_service import registrar_ruta_ia
+
+# chromadb y llama_index se cargan en el primer uso (services.llamaindex_service)
+# para no retrasar el arranque de la aplicación
 
 # Crear router
-router = APIRouter(prefix="/api", tags=["Búsqueda e Indexación"])
+router = APIRouter(prefix="/api", tags=["Búsqueda e Indexación"], dependencies=[Depends(registrar_ruta_ia)])
 
 @router.get("/listar_cvs")
 def listar_cvs():
@@ -39,39 +41,56 @@ def indexar_cvs():
         raise HTTPException(status_code=404, detail="No hay archivos PDF para indexar.")
 
     try:
-        db = chromadb.PersistentClient(path="chroma")
-        vector_store = ChromaVectorStore(chroma_collection=db.get_or_create_collection("curriculums"))
-        pipeline = IngestionPipeline(transformations=[SimpleNodeParser()])
-
-        documents = SimpleDirectoryReader(input_dir=carpeta, required_exts=[".pdf"]).load_data()
-
-        # Obtener nombres de archivo
-        document_names = [doc.metadata.get('file_path', 'sin_nombre') for doc in documents]
-
-        if not documents:
-            raise HTTPException(status_code=400, detail="No se pudieron cargar documentos con llamaindex.")
-
-        nodes = pipeline.run(documents=documents)
-        index = VectorStoreIndex(nodes, storage_context=StorageContext.from_defaults(vector_store=vector_store))
-
-        # Retornar detalle
-        return {
-            "message": f"Se indexaron {len(nodes)} nodos desde {len(documents)} documentos.",
-            "documentos_indexados": document_names
-        }
+        from services.llamaindex_service import indexar_documentos
 
+        total_nodos, document_names = indexar_documentos(carpeta)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if not document_names:
+        raise HTTPException(status_code=400, detail="No se pudieron cargar documentos con llamaindex.")
+
+    # Retornar detalle
+    return {
+        "message": f"Se indexaron {total_nodos} nodos desde {len(document_names)} documentos.",
+        "documentos_indexados": document_names
+    }
+
 @router.post("/consultar")
 def consultar_llamaindex(pregunta: str):
     """Consulta el índice de documentos con una pregunta"""
     try:
-        db = chromadb.PersistentClient(path="chroma")
-        vector_store = ChromaVectorStore(chroma_collection=db.get_or_create_collection("curriculums"))
-        index = VectorStoreIndex.from_vector_store(vector_store)
-        engine = index.as_query_engine()
+        from services.llamaindex_service import cargar_indice
+
+        engine = cargar_indice().as_query_engine()
         respuesta = engine.query(pregunta)
         return {"respuesta": str(respuesta)}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al consultar: {str(e)}")
+
+def _transmitir_consulta(pregunta: str) -> Iterator[str]:
+    """Genera los eventos SSE de una consulta: tokens de la respuesta y evento final"""
+    try:
+        from services.llamaindex_service import cargar_indice
+
+        engine = cargar_indice().as_query_engine(streaming=True)
+        respuesta = engine.query(pregunta)
+        for token in respuesta.response_gen:
+            yield evento_sse("token", {"texto": token})
+        yield evento_sse("fin", {
+            "fuentes": [nodo.node.metadata.get("file_name") for nodo in respuesta.source_nodes]
+        })
+    except Exception as e:
+        yield evento_sse("error", {"status_code": 500, "detail": f"Error al consultar: {str(e)}"})
+
+@router.post("/consultar/stream")
+def consultar_llamaindex_stream(pregunta: str):
+    """
+    Variante SSE de la consulta al índice de documentos.
+    Emite eventos "token" a medida que se genera la respuesta y "fin" al terminar.
+    """
+    return StreamingResponse(
+        _transmitir_consulta(pregunta),
+        media_type="text/event-stream",
+        headers=CABECERAS_SSE
+    )
@@ -0,0 +1,31 @@
+"""
+Router de monitoreo: métricas para Prometheus y disponibilidad de dependencias.
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
+
+from services.metrics_service import registro_metricas, CONTENT_TYPE_PROMETHEUS
+from services.health_service import verificador_disponibilidad
+
+# Crear router (sin prefijo /api: los recolectores esperan /metrics)
+router = APIRouter(tags=["Monitoreo"])
+
+@router.get("/metrics")
+async def obtener_metricas():
+    """
+    Expone las métricas de solicitudes, base de datos, pool de hilos y memoria
+    en formato de texto de Prometheus.
+    Es asíncrono para leer el pool de hilos desde el event loop sin ocupar un hilo.
+    """
+    return Response(content=registro_metricas.exponer(), media_type=CONTENT_TYPE_PROMETHEUS)
+
+@router.get("/api/ready")
+def verificar_disponibilidad():
+    """
+    Verifica que las dependencias (base de datos, Chroma, assets) responden,
+    con la latencia de cada una. Retorna 503 si alguna falla, para que el
+    balanceador deje de enviar tráfico a este worker.
+    El resultado se reutiliza durante READY_CACHE_SEGUNDOS.
+    """
+    resultado = verificador_disponibilidad.verificar()
+    return JSONResponse(content=resultado, status_code=200 if resultado["listo"] else 503)
@@ -8,7 +8,6 @@ from sqlmodel import Session
 from typing import List, Optional
 from datetime import date
 from io import BytesIO
-import pandas as pd
 import os
 import shutil
 
@@ -17,7 +16,6 @@ from models.operations import (
     ActividadCreate, ActividadUpdate, ActividadRead, ActividadDetallada
 )
 from db import get_session, crud_cargo, crud_persona, crud_actividad
-from db import crud_equipo  # Para verificar referencias
 
 # Crear router
 router = APIRouter(prefix="/api", tags=["Operaciones"])
@@ -77,13 +75,20 @@ def eliminar_cargo(cargo_id: int, session: Session = Depends(get_session)):
 # ----------------- ENDPOINTS PERSONA -----------------
 @router.post("/personas/", response_model=Persona)
 def crear_persona(persona: Persona, session: Session = Depends(get_session)):
-    """Crea una nueva persona"""
-    # Verificar que existe el cargo si se proporciona
-    if persona.cargo_id and not crud_cargo.exists(session, persona.cargo_id):
-        raise HTTPException(status_code=404, detail="Cargo no encontrado")
-    
+    """Crea una nueva persona (404 si el cargo no existe)"""
     return crud_persona.create(session, obj_in=persona)
 
+@router.put("/personas/upsert")
+def sincronizar_personas(personas: List[Persona], session: Session = Depends(get_session)):
+    """Inserta o actualiza personas identificadas por su identificación"""
+    # Validar todos los cargos referenciados en una sola consulta
+    cargos = {p.cargo_id for p in personas if p.cargo_id}
+    faltantes = cargos - crud_cargo.exists_many(session, cargos)
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Cargos no encontrados: {sorted(faltantes)}")
+    
+    return crud_persona.upsert_many(session, personas)
+
 @router.get("/personas/", response_model=List[Persona])
 def listar_personas(
     skip: int = 0, 
@@ -113,10 +118,6 @@ def actualizar_persona(persona_id: int, persona_data: Persona, session: Session
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
     
-    # Verificar cargo si se va a actualizar
-    if persona_data.cargo_id and not crud_cargo.exists(session, persona_data.cargo_id):
-        raise HTTPException(status_code=404, detail="Cargo no encontrado")
-    
     return crud_persona.update(session, db_obj=persona, obj_in=persona_data)
 
 @router.delete("/personas/{persona_id}")
@@ -154,14 +155,7 @@ def upload_cv(persona_id: int, file: UploadFile = File(...)):
 # ----------------- ENDPOINTS ACTIVIDAD -----------------
 @router.post("/actividades/", response_model=ActividadRead)
 def crear_actividad(actividad: ActividadCreate, session: Session = Depends(get_session)):
-    """Crea una nueva actividad"""
-    # Verificar que existen el equipo y la persona
-    if not crud_equipo.exists(session, actividad.equipo_id):
-        raise HTTPException(status_code=404, detail="Equipo no encontrado")
-    
-    if not crud_persona.exists(session, actividad.persona_id):
-        raise HTTPException(status_code=404, detail="Persona no encontrada")
-    
+    """Crea una nueva actividad (404 si el equipo o la persona no existen)"""
     return crud_actividad.create(session, obj_in=actividad)
 
 @router.get("/actividades/", response_model=List[ActividadRead])
@@ -213,13 +207,6 @@ def actualizar_actividad(actividad_id: int, actividad_data: ActividadUpdate, ses
     if not actividad:
         raise HTTPException(status_code=404, detail="Actividad no encontrada")
     
-    # Verificar equipo y persona si se van a actualizar
-    if actividad_data.equipo_id is not None and not crud_equipo.exists(session, actividad_data.equipo_id):
-        raise HTTPException(status_code=404, detail="Equipo no encontrado")
-    
-    if actividad_data.persona_id is not None and not crud_persona.exists(session, actividad_data.persona_id):
-        raise HTTPException(status_code=404, detail="Persona no encontrada")
-    
     return crud_actividad.update(session, db_obj=actividad, obj_in=actividad_data)
 
 @router.delete("/actividades/{actividad_id}")
@@ -261,7 +248,9 @@ def exportar_actividades_detalladas(
             "Equipo": act.equipo
         })
     
-    # Crear Excel en memoria
+    # Crear Excel en memoria (pandas se carga solo al exportar)
+    import pandas as pd
+    
     df = pd.DataFrame(data)
     output = BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
@@ -2,28 +2,97 @@
 Router para plantas, sistemas y subsistemas, 
 utilizando las clases CRUD específicas.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlmodel import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+from datetime import date
 
 from models.organization import (
     Planta, Sistema, SubSistema, 
-    PlantaJerarquica, SistemaRead, SubSistemaRead
+    PlantaJerarquica, SistemaRead, SubSistemaRead, NodoHijo,
+    MovimientoNodos, ResultadoMovimiento
 )
-from db import get_session, crud_planta, crud_sistema, crud_subsistema
-from db import crud_contrato  # Para verificar referencias
+from models.business import Contrato
+from models.equipment import EquipoRead
+from models.operations import ActividadRead
+from db import engine, get_session, crud_planta, crud_sistema, crud_subsistema
+from db import crud_equipo, crud_actividad
+from db.jerarquia import prefijo_ruta
+from db.crud_organization import HIJOS_JERARQUIA, PROFUNDIDAD_JERARQUIA, CASCADA_UMBRAL_TRABAJO
+from services.jobs_service import registro_trabajos, Trabajo
 
 # Crear router
 router = APIRouter(prefix="/api", tags=["Organización"])
 
+# ----------------- ELIMINACIÓN EN CASCADA -----------------
+def _eliminar_en_segundo_plano(trabajo: Trabajo, crud, nodo_id: int):
+    """Ejecuta una eliminación en cascada reportando el avance por nivel"""
+    registro_trabajos.iniciar(trabajo)
+    try:
+        with Session(engine) as session:
+            crud.remove_cascade(
+                session, nodo_id,
+                progreso=lambda tipo, eliminados: registro_trabajos.avanzar(trabajo, **{tipo: eliminados})
+            )
+        registro_trabajos.finalizar(trabajo)
+    except Exception as e:
+        registro_trabajos.finalizar(trabajo, error=str(e))
+
+def _eliminar_nodo(
+    tipo: str,
+    crud,
+    nodo_id: int,
+    no_encontrado: str,
+    *,
+    cascada: bool,
+    dry_run: bool,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    session: Session
+):
+    """
+    Elimina un nodo de la jerarquía. Sin cascada solo se elimina si no tiene
+    registros dependientes; con cascada se elimina todo su subárbol, como
+    trabajo en segundo plano si supera CASCADA_UMBRAL_TRABAJO registros.
+    Con dry_run solo se reporta lo que se eliminaría.
+    """
+    conteo = crud.contar_subarbol(session, nodo_id)
+    if conteo is None:
+        raise HTTPException(status_code=404, detail=no_encontrado)
+    if dry_run:
+        return {"ok": True, "dry_run": True, "eliminados": conteo}
+    
+    dependientes = {t: n for t, n in conteo.items() if t != tipo and n}
+    if not cascada:
+        if dependientes:
+            detalle = ", ".join(f"{n} {t}" for t, n in dependientes.items())
+            raise HTTPException(
+                status_code=409,
+                detail=f"No se puede eliminar: tiene registros dependientes ({detalle}). Use cascada=true"
+            )
+        crud.remove(session, id=nodo_id)
+        return {"ok": True}
+    
+    if sum(dependientes.values()) >= CASCADA_UMBRAL_TRABAJO:
+        trabajo = registro_trabajos.crear("eliminacion_jerarquia", total=len(conteo))
+        trabajo.resultado.update(tipo=tipo, id=nodo_id, a_eliminar=conteo)
+        background_tasks.add_task(_eliminar_en_segundo_plano, trabajo, crud, nodo_id)
+        response.status_code = 202
+        return trabajo
+    return {"ok": True, "eliminados": crud.remove_cascade(session, nodo_id)}
+
+@router.get("/eliminaciones/{trabajo_id}", response_model=Trabajo)
+def obtener_eliminacion(trabajo_id: str):
+    """Consulta el progreso de una eliminación en cascada en segundo plano"""
+    trabajo = registro_trabajos.obtener(trabajo_id)
+    if not trabajo or trabajo.tipo != "eliminacion_jerarquia":
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
+
 # ----------------- ENDPOINTS PLANTA -----------------
 @router.post("/plantas/", response_model=Planta)
 def crear_planta(planta: Planta, session: Session = Depends(get_session)):
-    """Crea una nueva planta"""
-    # Verificar que existe el contrato
-    if not crud_contrato.exists(session, planta.contrato_id):
-        raise HTTPException(status_code=404, detail="Contrato no encontrado")
-    
+    """Crea una nueva planta (404 si el contrato no existe)"""
     return crud_planta.create(session, obj_in=planta)
 
 @router.get("/plantas/", response_model=List[Planta])
@@ -57,6 +126,43 @@ def obtener_sistemas_planta(planta_id: int, session: Session = Depends(get_sessi
     
     return crud_sistema.get_by_planta(session, planta_id)
 
+@router.get("/plantas/{planta_id}/equipos", response_model=List[EquipoRead])
+def obtener_equipos_planta(
+    planta_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session)
+):
+    """Obtiene los equipos de todos los sistemas y subsistemas de una planta"""
+    planta = crud_planta.get(session, planta_id)
+    if not planta:
+        raise HTTPException(status_code=404, detail="Planta no encontrada")
+    
+    prefijo = prefijo_ruta(planta.contrato_id, planta.id)
+    return crud_equipo.get_by_ruta(session, prefijo, skip=skip, limit=limit)
+
+@router.get("/plantas/{planta_id}/actividades", response_model=List[ActividadRead])
+def obtener_actividades_planta(
+    planta_id: int,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session)
+):
+    """Obtiene las actividades de los equipos de una planta, de la más reciente a la más antigua"""
+    planta = crud_planta.get(session, planta_id)
+    if not planta:
+        raise HTTPException(status_code=404, detail="Planta no encontrada")
+    
+    prefijo = prefijo_ruta(planta.contrato_id, planta.id)
+    return crud_actividad.get_by_ruta(session, prefijo, desde=desde, hasta=hasta, skip=skip, limit=limit)
+
+@router.post("/plantas/mover", response_model=ResultadoMovimiento)
+def mover_plantas(movimiento: MovimientoNodos, session: Session = Depends(get_session)):
+    """Mueve varias plantas a un contrato con una sola actualización"""
+    return crud_planta.move_many(session, movimiento.ids, "contrato_id", Contrato, movimiento.destino_id)
+
 @router.put("/plantas/{planta_id}", response_model=Planta)
 def actualizar_planta(planta_id: int, planta_data: Planta, session: Session = Depends(get_session)):
     """Actualiza una planta existente"""
@@ -64,18 +170,23 @@ def actualizar_planta(planta_id: int, planta_data: Planta, session: Session = De
     if not planta:
         raise HTTPException(status_code=404, detail="Planta no encontrada")
     
-    # Verificar contrato si se va a actualizar
-    if planta_data.contrato_id and not crud_contrato.exists(session, planta_data.contrato_id):
-        raise HTTPException(status_code=404, detail="Contrato no encontrado")
-    
     return crud_planta.update(session, db_obj=planta, obj_in=planta_data)
 
 @router.delete("/plantas/{planta_id}")
-def eliminar_planta(planta_id: int, session: Session = Depends(get_session)):
-    """Elimina una planta"""
+def eliminar_planta(
+    planta_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    cascada: bool = Query(False, description="Eliminar también todo lo que cuelga de la planta"),
+    dry_run: bool = Query(False, description="Solo contar los registros que se eliminarían"),
+    session: Session = Depends(get_session)
+):
+    """Elimina una planta, opcionalmente con todo su subárbol"""
     try:
-        crud_planta.remove(session, id=planta_id)
-        return {"ok": True}
+        return _eliminar_nodo(
+            "planta", crud_planta, planta_id, "Planta no encontrada", cascada=cascada, dry_run=dry_run,
+            background_tasks=background_tasks, response=response, session=session
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -84,11 +195,7 @@ def eliminar_planta(planta_id: int, session: Session = Depends(get_session)):
 # ----------------- ENDPOINTS SISTEMA -----------------
 @router.post("/sistemas/", response_model=Sistema)
 def crear_sistema(sistema: Sistema, session: Session = Depends(get_session)):
-    """Crea un nuevo sistema"""
-    # Verificar que existe la planta
-    if not crud_planta.exists(session, sistema.planta_id):
-        raise HTTPException(status_code=404, detail="Planta no encontrada")
-    
+    """Crea un nuevo sistema (404 si la planta no existe)"""
     return crud_sistema.create(session, obj_in=sistema)
 
 @router.get("/sistemas/", response_model=List[Sistema])
@@ -122,6 +229,11 @@ def obtener_subsistemas_sistema(sistema_id: int, session: Session = Depends(get_
     
     return crud_subsistema.get_by_sistema(session, sistema_id)
 
+@router.post("/sistemas/mover", response_model=ResultadoMovimiento)
+def mover_sistemas(movimiento: MovimientoNodos, session: Session = Depends(get_session)):
+    """Mueve varios sistemas a una planta con una sola actualización"""
+    return crud_sistema.move_many(session, movimiento.ids, "planta_id", Planta, movimiento.destino_id)
+
 @router.put("/sistemas/{sistema_id}", response_model=Sistema)
 def actualizar_sistema(sistema_id: int, sistema_data: Sistema, session: Session = Depends(get_session)):
     """Actualiza un sistema existente"""
@@ -129,18 +241,23 @@ def actualizar_sistema(sistema_id: int, sistema_data: Sistema, session: Session
     if not sistema:
         raise HTTPException(status_code=404, detail="Sistema no encontrado")
     
-    # Verificar planta si se va a actualizar
-    if sistema_data.planta_id and not crud_planta.exists(session, sistema_data.planta_id):
-        raise HTTPException(status_code=404, detail="Planta no encontrada")
-    
     return crud_sistema.update(session, db_obj=sistema, obj_in=sistema_data)
 
 @router.delete("/sistemas/{sistema_id}")
-def eliminar_sistema(sistema_id: int, session: Session = Depends(get_session)):
-    """Elimina un sistema"""
+def eliminar_sistema(
+    sistema_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    cascada: bool = Query(False, description="Eliminar también todo lo que cuelga del sistema"),
+    dry_run: bool = Query(False, description="Solo contar los registros que se eliminarían"),
+    session: Session = Depends(get_session)
+):
+    """Elimina un sistema, opcionalmente con todo su subárbol"""
     try:
-        crud_sistema.remove(session, id=sistema_id)
-        return {"ok": True}
+        return _eliminar_nodo(
+            "sistema", crud_sistema, sistema_id, "Sistema no encontrado", cascada=cascada, dry_run=dry_run,
+            background_tasks=background_tasks, response=response, session=session
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -149,11 +266,7 @@ def eliminar_sistema(sistema_id: int, session: Session = Depends(get_session)):
 # ----------------- ENDPOINTS SUBSISTEMA -----------------
 @router.post("/subsistemas/", response_model=SubSistema)
 def crear_subsistema(subsistema: SubSistema, session: Session = Depends(get_session)):
-    """Crea un nuevo subsistema"""
-    # Verificar que existe el sistema
-    if not crud_sistema.exists(session, subsistema.sistema_id):
-        raise HTTPException(status_code=404, detail="Sistema no encontrado")
-    
+    """Crea un nuevo subsistema (404 si el sistema no existe)"""
     return crud_subsistema.create(session, obj_in=subsistema)
 
 @router.get("/subsistemas/", response_model=List[SubSistema])
@@ -188,6 +301,11 @@ def obtener_equipos_subsistema(subsistema_id: int, session: Session = Depends(ge
     
     return subsistema.equipos
 
+@router.post("/subsistemas/mover", response_model=ResultadoMovimiento)
+def mover_subsistemas(movimiento: MovimientoNodos, session: Session = Depends(get_session)):
+    """Mueve varios subsistemas a un sistema con una sola actualización"""
+    return crud_subsistema.move_many(session, movimiento.ids, "sistema_id", Sistema, movimiento.destino_id)
+
 @router.put("/subsistemas/{subsistema_id}", response_model=SubSistema)
 def actualizar_subsistema(subsistema_id: int, subsistema_data: SubSistema, session: Session = Depends(get_session)):
     """Actualiza un subsistema existente"""
@@ -195,33 +313,96 @@ def actualizar_subsistema(subsistema_id: int, subsistema_data: SubSistema, sessi
     if not subsistema:
         raise HTTPException(status_code=404, detail="Subsistema no encontrado")
     
-    # Verificar sistema si se va a actualizar
-    if subsistema_data.sistema_id and not crud_sistema.exists(session, subsistema_data.sistema_id):
-        raise HTTPException(status_code=404, detail="Sistema no encontrado")
-    
     return crud_subsistema.update(session, db_obj=subsistema, obj_in=subsistema_data)
 
 @router.delete("/subsistemas/{subsistema_id}")
-def eliminar_subsistema(subsistema_id: int, session: Session = Depends(get_session)):
-    """Elimina un subsistema"""
+def eliminar_subsistema(
+    subsistema_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    cascada: bool = Query(False, description="Eliminar también todo lo que cuelga del subsistema"),
+    dry_run: bool = Query(False, description="Solo contar los registros que se eliminarían"),
+    session: Session = Depends(get_session)
+):
+    """Elimina un subsistema, opcionalmente con todo su subárbol"""
     try:
-        crud_subsistema.remove(session, id=subsistema_id)
-        return {"ok": True}
+        return _eliminar_nodo(
+            "subsistema", crud_subsistema, subsistema_id, "Subsistema no encontrado", cascada=cascada, dry_run=dry_run,
+            background_tasks=background_tasks, response=response, session=session
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al eliminar subsistema: {str(e)}")
 
 # ----------------- ENDPOINTS JERARQUÍA -----------------
+def _parsear_expand(expand: Optional[str]) -> Dict[str, Set[int]]:
+    """Convierte "sistema:3,subsistema:12" en {"sistema": {3}, "subsistema": {12}}"""
+    nodos: Dict[str, Set[int]] = {}
+    for token in (expand or "").split(","):
+        if not token.strip():
+            continue
+        tipo, _, nodo_id = token.strip().partition(":")
+        if tipo not in ("sistema", "subsistema") or not nodo_id.isdigit():
+            raise HTTPException(
+                status_code=400,
+                detail=f"Nodo a expandir no válido: '{token.strip()}'. Use sistema:<id> o subsistema:<id>"
+            )
+        nodos.setdefault(tipo, set()).add(int(nodo_id))
+    return nodos
+
 @router.get("/plantas_jerarquia/", response_model=List[PlantaJerarquica])
-def obtener_jerarquia_completa(session: Session = Depends(get_session)):
-    """Obtiene la estructura jerárquica completa de todas las plantas"""
-    return crud_planta.get_all_jerarquias(session)
+def obtener_jerarquia_completa(
+    depth: int = Query(PROFUNDIDAD_JERARQUIA, ge=0, le=PROFUNDIDAD_JERARQUIA,
+                       description="Niveles a incluir: 1 sistemas, 2 subsistemas, 3 equipos"),
+    session: Session = Depends(get_session)
+):
+    """Obtiene la estructura jerárquica de todas las plantas"""
+    return crud_planta.get_all_jerarquias(session, depth=depth)
 
 @router.get("/plantas/{planta_id}/jerarquia", response_model=PlantaJerarquica)
-def obtener_jerarquia_planta(planta_id: int, session: Session = Depends(get_session)):
-    """Obtiene la estructura jerárquica completa de una planta"""
-    jerarquia = crud_planta.get_jerarquia_completa(session, planta_id)
+def obtener_jerarquia_planta(
+    planta_id: int,
+    depth: int = Query(PROFUNDIDAD_JERARQUIA, ge=0, le=PROFUNDIDAD_JERARQUIA,
+                       description="Niveles a incluir: 1 sistemas, 2 subsistemas, 3 equipos"),
+    expand: Optional[str] = Query(None, description="Nodos a expandir más allá de depth, ej. sistema:3,subsistema:12"),
+    agregados: bool = Query(False, description="Incluir equipos y actividades del mes por nodo"),
+    mes: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$",
+                               description="Mes de las actividades (YYYY-MM), por defecto el actual"),
+    session: Session = Depends(get_session)
+):
+    """
+    Obtiene la estructura jerárquica de una planta hasta la profundidad indicada.
+    Cada nodo incluye la cantidad de hijos directos, aunque no se hayan cargado,
+    y opcionalmente sus contadores de equipos y actividades del mes.
+    """
+    jerarquia = crud_planta.get_jerarquia_completa(
+        session, planta_id, depth=depth, expand=_parsear_expand(expand),
+        agregados=agregados, mes=mes
+    )
     if not jerarquia:
         raise HTTPException(status_code=404, detail="Planta no encontrada")
-    return jerarquia
\ No newline at end of file
+    return jerarquia
+
+@router.get("/jerarquia/{tipo}/{nodo_id}/hijos", response_model=List[NodoHijo])
+def obtener_hijos_nodo(
+    tipo: str,
+    nodo_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session)
+):
+    """
+    Lista los hijos directos de un contrato, planta, sistema o subsistema,
+    cada uno con la cantidad de hijos que tiene, para expandir el árbol por partes
+    """
+    if tipo not in HIJOS_JERARQUIA:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo no válido: '{tipo}'. Permitidos: {list(HIJOS_JERARQUIA)}"
+        )
+    
+    hijos = crud_planta.get_hijos(session, tipo, nodo_id, skip=skip, limit=limit)
+    if hijos is None:
+        raise HTTPException(status_code=404, detail=f"No se encontró {tipo} con ID {nodo_id}")
+    return hijos
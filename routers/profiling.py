@@ -0,0 +1,32 @@
+"""
+Router para consultar y descargar los reportes de perfilado de solicitudes.
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from typing import Optional
+
+from services.profiling_service import perfilador, token_valido
+
+def verificar_token_perfil(x_profile_token: Optional[str] = Header(None)):
+    """Exige la cabecera X-Profile-Token; sin PERFIL_TOKEN configurado los reportes no se exponen"""
+    if not token_valido(x_profile_token):
+        raise HTTPException(status_code=403, detail="Token de perfilado inválido")
+
+# Crear router
+router = APIRouter(prefix="/api", tags=["Perfilado"], dependencies=[Depends(verificar_token_perfil)])
+
+@router.get("/perfiles")
+def listar_perfiles():
+    """Lista los reportes de perfilado guardados, del más reciente al más antiguo"""
+    return perfilador.listar()
+
+@router.get("/perfiles/{nombre}")
+def descargar_perfil(nombre: str):
+    """
+    Descarga un reporte de perfilado (.folded para speedscope/flamegraph,
+    .prof para pstats/snakeviz) o sus metadatos (.json)
+    """
+    ruta = perfilador.ruta_reporte(nombre)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Reporte de perfilado no encontrado")
+    return FileResponse(ruta, filename=nombre)
@@ -0,0 +1,29 @@
+"""
+Router para exportar una instantánea completa de la base de datos (Parquet en zip).
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from db import engine
+from services.snapshot_service import SnapshotNoDisponible, generar_snapshot, nombre_snapshot
+
+# Crear router
+router = APIRouter(prefix="/api", tags=["Snapshot"])
+
+@router.get("/snapshot")
+def exportar_snapshot():
+    """
+    Descarga un zip con un archivo Parquet por tabla y un manifiesto.
+    Se genera a medida que se envía, con una lectura consistente de todas
+    las tablas, sin copiar ni bloquear el archivo de la base de datos.
+    """
+    try:
+        partes = generar_snapshot(engine)
+    except SnapshotNoDisponible as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    return StreamingResponse(
+        partes,
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={nombre_snapshot()}"}
+    )
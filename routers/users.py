@@ -17,11 +17,7 @@ router = APIRouter(prefix="/api", tags=["Usuarios"])
 # ----------------- ENDPOINTS USUARIO -----------------
 @router.post("/usuarios/", response_model=Usuario)
 def crear_usuario(usuario: Usuario, session: Session = Depends(get_session)):
-    """Crea un nuevo usuario"""
-    # Verificar que existe el rol
-    if not crud_rol.exists(session, usuario.rol_id):
-        raise HTTPException(status_code=404, detail="Rol no encontrado")
-        
+    """Crea un nuevo usuario (404 si el rol no existe)"""
     # Verificar que no exista otro usuario con el mismo username
     if crud_usuario.get_by_username(session, usuario.username):
         raise HTTPException(status_code=400, detail="Ya existe un usuario con ese nombre de usuario")
@@ -65,10 +61,6 @@ def actualizar_usuario(usuario_id: int, usuario_data: Usuario, session: Session
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    # Verificar que existe el rol si se va a actualizar
-    if usuario_data.rol_id and not crud_rol.exists(session, usuario_data.rol_id):
-        raise HTTPException(status_code=404, detail="Rol no encontrado")
-    
     # Verificar que no exista otro usuario con el mismo username
     if usuario_data.username != usuario.username and crud_usuario.get_by_username(session, usuario_data.username):
         raise HTTPException(status_code=400, detail="Ya existe un usuario con ese nombre de usuario")
@@ -0,0 +1,71 @@
+"""
+Callbacks de LangChain para la instrumentación de llamadas a modelos de lenguaje.
+Se importa solo al crear el cliente LLM, junto con el resto de LangChain.
+"""
+import time
+from typing import Any, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from services.ai_metrics_service import metricas_ia, estimar_tokens, extraer_uso
+
+
+class CallbackMetricasIA(BaseCallbackHandler):
+    """
+    Callback de LangChain que registra en las métricas de IA la duración,
+    los tokens y el costo estimado de cada llamada al modelo de chat.
+    En transmisiones sin uso reportado, los tokens de salida se cuentan
+    por fragmento recibido y los de entrada se estiman por longitud.
+    """
+
+    # Ejecutar en el mismo contexto de la solicitud para conservar la ruta
+    run_inline = True
+
+    def __init__(self):
+        self._llamadas: Dict[UUID, Dict[str, Any]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        parametros = kwargs.get("invocation_params") or {}
+        texto = " ".join(str(mensaje.content) for lista in messages for mensaje in lista)
+        self._llamadas[run_id] = {
+            "inicio": time.perf_counter(),
+            "modelo": parametros.get("model") or parametros.get("model_name") or "",
+            "entrada": estimar_tokens(texto),
+            "salida": 0
+        }
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        llamada = self._llamadas.get(run_id)
+        if llamada:
+            llamada["salida"] += 1
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        llamada = self._llamadas.pop(run_id, None)
+        if not llamada:
+            return
+        llm_output = response.llm_output or {}
+        entrada, salida = extraer_uso(llm_output.get("token_usage"))
+        if not salida:
+            texto = "".join(generacion.text for lista in response.generations for generacion in lista)
+            salida = llamada["salida"] or estimar_tokens(texto)
+        metricas_ia.registrar_llamada(
+            tipo="llm",
+            modelo=llm_output.get("model_name") or llamada["modelo"],
+            duracion=time.perf_counter() - llamada["inicio"],
+            tokens_entrada=entrada or llamada["entrada"],
+            tokens_salida=salida
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        llamada = self._llamadas.pop(run_id, None)
+        if not llamada:
+            return
+        metricas_ia.registrar_llamada(
+            tipo="llm",
+            modelo=llamada["modelo"],
+            duracion=time.perf_counter() - llamada["inicio"],
+            tokens_entrada=llamada["entrada"],
+            tokens_salida=llamada["salida"],
+            error=True
+        )
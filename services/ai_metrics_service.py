@@ -0,0 +1,191 @@
+"""
+Instrumentación de las llamadas a servicios de IA (LLM y embeddings).
+Registra por cada llamada el tiempo, los tokens, el modelo y el costo estimado,
+y agrega los resultados por ruta de la API junto con los aciertos de caché.
+"""
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+# Llamadas más lentas que este umbral (segundos) se registran en el log
+IA_UMBRAL_LLAMADA_LENTA = float(os.getenv("IA_UMBRAL_LLAMADA_LENTA", "10"))
+
+# Precios en USD por cada 1.000 tokens (entrada, salida), según el prefijo del modelo
+PRECIOS_MODELOS: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "text-embedding-3-small": (0.00002, 0.0),
+    "text-embedding-3-large": (0.00013, 0.0),
+    "text-embedding-ada-002": (0.0001, 0.0),
+}
+
+# Ruta de la API (plantilla) que originó las llamadas de la tarea actual
+ruta_ia: ContextVar[str] = ContextVar("ruta_ia", default="sin_ruta")
+
+
+async def registrar_ruta_ia(request: Request) -> None:
+    """
+    Dependencia que asocia las llamadas de IA de la solicitud con su ruta.
+    Se usa la plantilla de la ruta (ej. /api/plantas/{planta_id}/...) para
+    que las métricas no se fragmenten por cada ID.
+    """
+    ruta = request.scope.get("route")
+    ruta_ia.set(getattr(ruta, "path", request.url.path))
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación aproximada de tokens cuando el proveedor no reporta el uso"""
+    return max(1, len(texto) // 4) if texto else 0
+
+
+def extraer_uso(uso: Any) -> Tuple[int, int]:
+    """
+    Obtiene los tokens de entrada y salida de un objeto de uso del proveedor
+
+    Args:
+        uso: Diccionario u objeto con el uso reportado por la API
+
+    Returns:
+        Tupla (tokens de entrada, tokens de salida); ceros si no hay datos
+    """
+    if not uso:
+        return 0, 0
+    if not isinstance(uso, dict):
+        uso = uso.model_dump() if hasattr(uso, "model_dump") else dict(uso)
+    entrada = uso.get("prompt_tokens", uso.get("input_tokens", 0)) or 0
+    salida = uso.get("completion_tokens", uso.get("output_tokens", 0)) or 0
+    return int(entrada), int(salida)
+
+
+def estimar_costo(modelo: str, tokens_entrada: int, tokens_salida: int) -> float:
+    """
+    Estima el costo en USD de una llamada según la tabla de precios
+
+    Args:
+        modelo: Nombre del modelo (puede incluir sufijo de versión)
+        tokens_entrada: Tokens del prompt
+        tokens_salida: Tokens generados
+
+    Returns:
+        Costo estimado en USD (0 si el modelo no tiene precio conocido)
+    """
+    # Se prueban primero los prefijos más largos (gpt-4o-mini antes que gpt-4o)
+    for prefijo in sorted(PRECIOS_MODELOS, key=len, reverse=True):
+        if (modelo or "").startswith(prefijo):
+            precio_entrada, precio_salida = PRECIOS_MODELOS[prefijo]
+            return (tokens_entrada * precio_entrada + tokens_salida * precio_salida) / 1000
+    return 0.0
+
+
+class MetricasIA:
+    """
+    Acumulador de métricas de IA en memoria, seguro entre hilos.
+    Las llamadas se agregan por ruta, tipo (llm/embedding) y modelo.
+    """
+
+    def __init__(self, umbral_lento: float = IA_UMBRAL_LLAMADA_LENTA):
+        self.umbral_lento = umbral_lento
+        self._candado = threading.Lock()
+        self._llamadas: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        self._cache: Dict[str, Dict[str, int]] = {}
+
+    def registrar_llamada(
+        self,
+        *,
+        tipo: str,
+        modelo: str,
+        duracion: float,
+        tokens_entrada: int = 0,
+        tokens_salida: int = 0,
+        error: bool = False,
+        ruta: Optional[str] = None
+    ) -> None:
+        """
+        Registra una llamada a un LLM o a un modelo de embeddings
+
+        Args:
+            tipo: "llm" o "embedding"
+            modelo: Nombre del modelo
+            duracion: Tiempo de la llamada en segundos
+            tokens_entrada: Tokens del prompt o del texto embebido
+            tokens_salida: Tokens generados
+            error: True si la llamada falló
+            ruta: Ruta de la API; por defecto la de la solicitud actual
+        """
+        ruta = ruta or ruta_ia.get()
+        costo = estimar_costo(modelo, tokens_entrada, tokens_salida)
+
+        with self._candado:
+            stats = self._llamadas.setdefault((ruta, tipo, modelo or "desconocido"), {
+                "llamadas": 0, "errores": 0, "segundos_total": 0.0, "segundos_max": 0.0,
+                "tokens_entrada": 0, "tokens_salida": 0, "costo_usd": 0.0
+            })
+            stats["llamadas"] += 1
+            stats["errores"] += int(error)
+            stats["segundos_total"] += duracion
+            stats["segundos_max"] = max(stats["segundos_max"], duracion)
+            stats["tokens_entrada"] += tokens_entrada
+            stats["tokens_salida"] += tokens_salida
+            stats["costo_usd"] += costo
+
+        if duracion >= self.umbral_lento:
+            logger.warning(
+                "Llamada de IA lenta: %s %s en %s tardó %.2fs (%d+%d tokens, USD %.4f)",
+                tipo, modelo, ruta, duracion, tokens_entrada, tokens_salida, costo
+            )
+
+    def registrar_cache(self, acierto: bool, ruta: Optional[str] = None) -> None:
+        """
+        Registra un acierto o fallo de la caché de resultados de IA
+
+        Args:
+            acierto: True si el resultado se sirvió desde la caché
+            ruta: Ruta de la API; por defecto la de la solicitud actual
+        """
+        ruta = ruta or ruta_ia.get()
+        with self._candado:
+            stats = self._cache.setdefault(ruta, {"aciertos": 0, "fallos": 0})
+            stats["aciertos" if acierto else "fallos"] += 1
+
+    def resumen(self) -> Dict[str, Any]:
+        """
+        Retorna las métricas agregadas por ruta
+
+        Returns:
+            Diccionario {ruta: {"llamadas": [...], "cache": {...}, totales}}
+        """
+        with self._candado:
+            llamadas = {clave: dict(stats) for clave, stats in self._llamadas.items()}
+            cache = {ruta: dict(stats) for ruta, stats in self._cache.items()}
+
+        rutas: Dict[str, Dict[str, Any]] = {}
+        for (ruta, tipo, modelo), stats in llamadas.items():
+            entrada = rutas.setdefault(ruta, {"llamadas": [], "costo_usd": 0.0, "segundos_total": 0.0})
+            stats["segundos_promedio"] = stats["segundos_total"] / stats["llamadas"]
+            entrada["llamadas"].append({"tipo": tipo, "modelo": modelo, **stats})
+            entrada["costo_usd"] += stats["costo_usd"]
+            entrada["segundos_total"] += stats["segundos_total"]
+
+        for ruta, stats in cache.items():
+            entrada = rutas.setdefault(ruta, {"llamadas": [], "costo_usd": 0.0, "segundos_total": 0.0})
+            entrada["cache"] = stats
+
+        return rutas
+
+    def reiniciar(self) -> None:
+        """Descarta todas las métricas acumuladas"""
+        with self._candado:
+            self._llamadas.clear()
+            self._cache.clear()
+
+
+# Instancia compartida por la aplicación
+metricas_ia = MetricasIA()
@@ -0,0 +1,320 @@
+"""
+Servicio de acceso a modelos de lenguaje (LLM) para la aplicación GAME.
+Mantiene un cliente asíncrono compartido durante la vida de la aplicación,
+con reutilización de conexiones, límite de concurrencia, tiempo máximo
+de espera y reintentos con backoff exponencial.
+
+Las dependencias pesadas (openai, httpx, LangChain) se importan en el primer
+uso del cliente para no penalizar el arranque de la aplicación.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_community.chat_models import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Configuración del cliente (sobrescribible por variables de ambiente)
+LLM_MODELO = os.getenv("LLM_MODELO", "gpt-4o")
+LLM_TEMPERATURA = float(os.getenv("LLM_TEMPERATURA", "0.2"))
+LLM_MAX_CONCURRENCIA = int(os.getenv("LLM_MAX_CONCURRENCIA", "4"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "90"))
+LLM_MAX_REINTENTOS = int(os.getenv("LLM_MAX_REINTENTOS", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_MAX_CONEXIONES = int(os.getenv("LLM_MAX_CONEXIONES", "20"))
+
+
+def errores_reintentables() -> Tuple[type, ...]:
+    """Errores transitorios que justifican un nuevo intento"""
+    import openai
+
+    return (
+        asyncio.TimeoutError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+class ClienteLLM:
+    """
+    Cliente LLM compartido por todas las solicitudes.
+
+    El cliente HTTP subyacente se crea una sola vez y mantiene un pool de
+    conexiones abiertas hacia la API. Un semáforo limita cuántas llamadas
+    pueden estar en curso al mismo tiempo; las solicitudes adicionales
+    esperan su turno sin bloquear el event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        modelo: str = LLM_MODELO,
+        temperatura: float = LLM_TEMPERATURA,
+        max_concurrencia: int = LLM_MAX_CONCURRENCIA,
+        timeout: float = LLM_TIMEOUT,
+        max_reintentos: int = LLM_MAX_REINTENTOS,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        max_conexiones: int = LLM_MAX_CONEXIONES
+    ):
+        """
+        Inicializa la configuración del cliente sin abrir conexiones
+
+        Args:
+            modelo: Nombre del modelo de OpenAI
+            temperatura: Temperatura de muestreo
+            max_concurrencia: Máximo de llamadas simultáneas al LLM
+            timeout: Tiempo máximo en segundos por intento
+            max_reintentos: Reintentos ante errores transitorios
+            backoff_base: Espera base en segundos para el backoff exponencial
+            max_conexiones: Tamaño máximo del pool de conexiones HTTP
+        """
+        self.modelo = modelo
+        self.temperatura = temperatura
+        self.max_concurrencia = max_concurrencia
+        self.timeout = timeout
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.max_conexiones = max_conexiones
+        self._semaforo = asyncio.Semaphore(max_concurrencia)
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._llm: Optional["ChatOpenAI"] = None
+
+    def iniciar(self) -> None:
+        """
+        Crea el cliente HTTP y el modelo de lenguaje compartidos
+
+        Raises:
+            HTTPException: Si la API key de OpenAI no está configurada
+        """
+        if self._llm is not None:
+            return
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="API key no configurada")
+
+        import httpx
+        import openai
+        from langchain_community.chat_models import ChatOpenAI
+        from services.ai_callbacks import CallbackMetricasIA
+
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_conexiones,
+                max_keepalive_connections=self.max_conexiones
+            ),
+            timeout=self.timeout
+        )
+        # Los reintentos los gestiona este cliente, no el SDK de OpenAI
+        async_client = openai.AsyncOpenAI(
+            api_key=api_key,
+            timeout=self.timeout,
+            max_retries=0,
+            http_client=self._http
+        ).chat.completions
+        self._llm = ChatOpenAI(
+            model=self.modelo,
+            temperature=self.temperatura,
+            api_key=api_key,
+            request_timeout=self.timeout,
+            max_retries=0,
+            async_client=async_client,
+            callbacks=[CallbackMetricasIA()]
+        )
+
+    async def cerrar(self) -> None:
+        """Cierra las conexiones abiertas del cliente HTTP"""
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._llm = None
+
+    def _obtener_llm(self) -> "ChatOpenAI":
+        """Retorna el modelo compartido, creándolo si aún no existe"""
+        if self._llm is None:
+            self.iniciar()
+        return self._llm
+
+    def _espera_backoff(self, intento: int) -> float:
+        """Calcula la espera antes del reintento con backoff exponencial y jitter"""
+        return self.backoff_base * (2 ** (intento - 1)) + random.uniform(0, self.backoff_base)
+
+    async def invocar(self, prompt: str) -> str:
+        """
+        Envía un prompt al LLM y retorna el texto generado
+
+        Args:
+            prompt: Texto completo del prompt
+
+        Returns:
+            Contenido de la respuesta del modelo
+
+        Raises:
+            HTTPException: 504 si se agotan los reintentos por tiempo de espera,
+                503 si el servicio sigue fallando tras los reintentos
+        """
+        llm = self._obtener_llm()
+        intento = 0
+
+        while True:
+            try:
+                async with self._semaforo:
+                    respuesta = await asyncio.wait_for(llm.ainvoke(prompt), timeout=self.timeout)
+                return respuesta.content
+            except errores_reintentables() as e:
+                intento += 1
+                if intento > self.max_reintentos:
+                    raise self._error_final(e)
+                await self._esperar_reintento(e, intento)
+
+    async def transmitir(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Envía un prompt al LLM y entrega el texto a medida que se genera
+
+        Solo se reintenta si el fallo ocurre antes del primer fragmento;
+        una vez iniciada la transmisión el error se propaga al consumidor.
+
+        Args:
+            prompt: Texto completo del prompt
+
+        Yields:
+            Fragmentos de texto de la respuesta
+
+        Raises:
+            HTTPException: 504 por tiempo de espera agotado, 503 si el servicio falla
+        """
+        llm = self._obtener_llm()
+        intento = 0
+
+        while True:
+            emitido = False
+            try:
+                async with self._semaforo:
+                    flujo = llm.astream(prompt).__aiter__()
+                    while True:
+                        try:
+                            # El tiempo máximo aplica a la espera de cada fragmento
+                            fragmento = await asyncio.wait_for(flujo.__anext__(), timeout=self.timeout)
+                        except StopAsyncIteration:
+                            return
+                        emitido = True
+                        yield fragmento.content
+            except errores_reintentables() as e:
+                intento += 1
+                if emitido or intento > self.max_reintentos:
+                    raise self._error_final(e)
+                await self._esperar_reintento(e, intento)
+
+    def _error_final(self, error: Exception) -> HTTPException:
+        """Traduce un error transitorio persistente a una respuesta HTTP"""
+        import openai
+
+        if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+            return HTTPException(status_code=504, detail="El servicio de IA no respondió a tiempo")
+        return HTTPException(status_code=503, detail=f"Servicio de IA no disponible: {str(error)}")
+
+    async def _esperar_reintento(self, error: Exception, intento: int) -> None:
+        """Registra el fallo y espera el backoff correspondiente al intento"""
+        espera = self._espera_backoff(intento)
+        logger.warning(
+            "Llamada al LLM fallida (%s), reintento %d/%d en %.1fs",
+            type(error).__name__, intento, self.max_reintentos, espera
+        )
+        await asyncio.sleep(espera)
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución.
+
+    La primera solicitud lanza la tarea; las siguientes con la misma clave
+    esperan ese mismo resultado mientras siga en curso. La tarea se protege
+    de cancelaciones para que la desconexión de un cliente no afecte al resto.
+    """
+
+    def __init__(self):
+        self._en_curso: Dict[str, asyncio.Future] = {}
+
+    def _liberar(self, clave: str, futuro: asyncio.Future) -> None:
+        """Elimina la clave al terminar y marca la excepción como consumida"""
+        self._en_curso.pop(clave, None)
+        if not futuro.cancelled():
+            futuro.exception()
+
+    async def ejecutar(self, clave: str, funcion: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta la función o se une a la ejecución en curso con la misma clave
+
+        Args:
+            clave: Identificador de la operación
+            funcion: Función asíncrona sin argumentos que produce el resultado
+
+        Returns:
+            Resultado compartido de la operación
+        """
+        futuro = self._en_curso.get(clave)
+        if futuro is None:
+            futuro = asyncio.ensure_future(funcion())
+            self._en_curso[clave] = futuro
+            futuro.add_done_callback(lambda f: self._liberar(clave, f))
+        return await asyncio.shield(futuro)
+
+
+class LimitadorTasa:
+    """
+    Espacia llamadas asíncronas para no superar una tasa máxima por minuto.
+    Cada llamada reserva el siguiente turno disponible y espera hasta él.
+    """
+
+    def __init__(self, por_minuto: int):
+        """
+        Args:
+            por_minuto: Máximo de llamadas por minuto (0 o menos desactiva el límite)
+        """
+        self._intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self._siguiente = 0.0
+        self._candado = asyncio.Lock()
+
+    async def esperar(self) -> None:
+        """Espera hasta que la siguiente llamada esté permitida"""
+        if not self._intervalo:
+            return
+        async with self._candado:
+            ahora = time.monotonic()
+            espera = self._siguiente - ahora
+            self._siguiente = max(ahora, self._siguiente) + self._intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+def evento_sse(evento: str, datos: Any) -> str:
+    """
+    Formatea un evento Server-Sent Events con datos JSON
+
+    Args:
+        evento: Nombre del evento
+        datos: Datos serializables a JSON
+
+    Returns:
+        Texto del evento listo para enviarse al cliente
+    """
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False, default=str)}\n\n"
+
+
+# Cabeceras para respuestas SSE (evitan buffers intermedios en proxies)
+CABECERAS_SSE = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+# Instancia compartida, creada en el primer uso y cerrada al detener la aplicación
+cliente_llm = ClienteLLM()
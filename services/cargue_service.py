@@ -0,0 +1,370 @@
+"""
+Cargue masivo de registros desde archivos Excel.
+
+El archivo se lee por bloques de filas (openpyxl en modo solo lectura), de
+modo que la memoria no crece con el tamaño del archivo. Por cada bloque:
+- la conversión de tipos y el manejo de nulos se hacen por columna con pandas;
+- los duplicados (clave primaria, columnas únicas y restricciones o índices
+  únicos de varias columnas) se verifican con una consulta IN por clave, y
+  las claves foráneas con una sola consulta;
+- las filas válidas se insertan con un único executemany.
+
+Las filas con errores se omiten y se reportan con su número de fila en Excel.
+Todo el cargue ocurre en una sola transacción.
+"""
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Type, Union
+
+from sqlalchemy import (
+    Column, Date, DateTime, Float, Integer, Numeric, String, UniqueConstraint, insert, select, tuple_
+)
+from sqlmodel import Session, SQLModel
+
+from db.crud import resolver_foraneas
+from db.crud_equipment import cache_facetas
+from models import (
+    Cargo, Persona, TipoActivo, Fabricante, Modelo, Equipo,
+    Planta, Sistema, SubSistema, Actividad, Cliente, Contrato
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tablas habilitadas para el cargue: nombre en la URL -> modelo
+TABLAS_CARGUE: Dict[str, Type[SQLModel]] = {
+    "cargos": Cargo,
+    "personas": Persona,
+    "tipos_activo": TipoActivo,
+    "fabricantes": Fabricante,
+    "modelos": Modelo,
+    "clientes": Cliente,
+    "contratos": Contrato,
+    "plantas": Planta,
+    "sistemas": Sistema,
+    "subsistemas": SubSistema,
+    "equipos": Equipo,
+    "actividades": Actividad,
+}
+
+# Filas por bloque de lectura, validación e inserción
+TAMANO_BLOQUE = 5000
+
+# Errores detallados incluidos en la respuesta (el total siempre se reporta)
+MAX_ERRORES_REPORTE = 1000
+
+
+class ErrorCargue(ValueError):
+    """Error que impide procesar el archivo completo (encabezados, formato)"""
+
+
+def _es_requerida(columna: Column) -> bool:
+    """Una columna es obligatoria si no admite nulos ni la genera la base de datos"""
+    if columna.nullable or columna.default is not None or columna.server_default is not None:
+        return False
+    return not (columna.primary_key and columna.autoincrement in (True, "auto") and isinstance(columna.type, Integer))
+
+
+def describir_tabla(modelo: Type[SQLModel]) -> Dict[str, Any]:
+    """
+    Describe las columnas que acepta el cargue de una tabla
+
+    Args:
+        modelo: Modelo SQLModel de la tabla
+
+    Returns:
+        Diccionario con las columnas, las obligatorias y las claves foráneas
+    """
+    tabla = modelo.__table__
+    return {
+        "columnas": [c.name for c in tabla.columns],
+        "obligatorias": [c.name for c in tabla.columns if _es_requerida(c)],
+        "claves_foraneas": {
+            c.name: next(iter(c.foreign_keys)).target_fullname for c in tabla.columns if c.foreign_keys
+        },
+    }
+
+
+def _leer_bloques(archivo: BinaryIO, tamano_bloque: int) -> Tuple[List[str], Iterator[Tuple[int, List[tuple]]]]:
+    """
+    Abre la primera hoja y retorna sus encabezados y un iterador de bloques
+    (número de la primera fila en Excel, filas)
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    filas = libro.worksheets[0].iter_rows(values_only=True)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        libro.close()
+        raise ErrorCargue("El archivo está vacío")
+    encabezados = [str(c).strip() if c is not None else "" for c in encabezado]
+
+    def bloques() -> Iterator[Tuple[int, List[tuple]]]:
+        try:
+            bloque: List[tuple] = []
+            # La fila 1 es el encabezado
+            inicio = 2
+            for fila in filas:
+                bloque.append(fila)
+                if len(bloque) == tamano_bloque:
+                    yield inicio, bloque
+                    inicio += len(bloque)
+                    bloque = []
+            if bloque:
+                yield inicio, bloque
+        finally:
+            libro.close()
+
+    return encabezados, bloques()
+
+
+class _Bloque:
+    """Bloque de filas en un DataFrame con sus errores acumulados por fila"""
+
+    def __init__(self, df: "pd.DataFrame"):
+        self.df = df
+        self.errores: List[Dict[str, Any]] = []
+        self.invalidas = df.index[:0]
+
+    def marcar(self, mascara: "pd.Series", columna: Union[None, str, Sequence[str]], mensaje: str) -> None:
+        """
+        Registra un error para las filas de la máscara y las excluye del cargue.
+        Con varias columnas (una clave compuesta) se reportan separadas por coma.
+        """
+        filas = self.df.index[mascara.to_numpy()]
+        if len(filas) == 0:
+            return
+        nombres = [columna] if isinstance(columna, str) else list(columna or [])
+        valores = self.df.loc[filas, nombres] if nombres else None
+        for fila in filas:
+            error = {"fila": int(fila), "columna": ", ".join(nombres) or None, "error": mensaje}
+            if valores is not None:
+                partes = [None if v is None or v != v else str(v) for v in valores.loc[fila]]
+                error["valor"] = None if all(p is None for p in partes) else ", ".join(p or "" for p in partes)
+            self.errores.append(error)
+        self.invalidas = self.invalidas.union(filas)
+
+    def validas(self) -> "pd.Series":
+        return ~self.df.index.isin(self.invalidas)
+
+
+def _convertir_columna(bloque: _Bloque, columna: Column) -> None:
+    """Convierte una columna al tipo de la base de datos, marcando las filas que no se pueden convertir"""
+    import pandas as pd
+
+    nombre = columna.name
+    serie = bloque.df[nombre]
+    # Texto vacío o solo espacios equivale a nulo
+    serie = serie.mask(serie.map(lambda v: isinstance(v, str) and not v.strip()))
+    presentes = serie.notna()
+
+    if isinstance(columna.type, Integer):
+        numeros = pd.to_numeric(serie, errors="coerce")
+        bloque.marcar(presentes & numeros.isna(), nombre, "Se esperaba un número entero")
+        bloque.marcar(numeros.notna() & (numeros % 1 != 0), nombre, "Se esperaba un número entero")
+        convertida = numeros.where(numeros % 1 == 0).astype("Int64")
+    elif isinstance(columna.type, (Float, Numeric)):
+        convertida = pd.to_numeric(serie, errors="coerce")
+        bloque.marcar(presentes & convertida.isna(), nombre, "Se esperaba un número")
+    elif isinstance(columna.type, (Date, DateTime)):
+        fechas = pd.to_datetime(serie, errors="coerce", format="mixed")
+        bloque.marcar(presentes & fechas.isna(), nombre, "Fecha no válida")
+        convertida = fechas.dt.date if isinstance(columna.type, Date) else fechas.dt.to_pydatetime()
+        convertida = pd.Series(convertida, index=serie.index).where(fechas.notna())
+    elif isinstance(columna.type, String):
+        # Los números leídos de Excel (ej. 12.0) se guardan sin decimales
+        convertida = serie.map(
+            lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v).strip(),
+            na_action="ignore"
+        )
+        if columna.type.length:
+            bloque.marcar(convertida.str.len() > columna.type.length, nombre,
+                          f"Supera el máximo de {columna.type.length} caracteres")
+    else:
+        convertida = serie
+
+    # Los valores que no se pudieron convertir ya quedaron reportados
+    if _es_requerida(columna):
+        bloque.marcar(~presentes, nombre, "Valor obligatorio")
+    bloque.df[nombre] = convertida
+
+
+def _existentes(session: Session, clave: Tuple[Column, ...], valores: List[tuple]) -> Set[tuple]:
+    """Valores de la lista (tuplas) que ya existen en las columnas de la clave (una consulta IN)"""
+    if not valores:
+        return set()
+    if len(clave) == 1:
+        filtro = clave[0].in_([v[0] for v in valores])
+    else:
+        filtro = tuple_(*clave).in_(valores)
+    return {tuple(fila) for fila in session.execute(select(*clave).where(filtro))}
+
+
+class CargueMasivo:
+    """
+    Cargue de un archivo Excel en una tabla
+
+    Los valores de claves foráneas ya verificados y las claves únicas vistas
+    se recuerdan entre bloques, así cada valor se consulta una sola vez.
+    """
+
+    def __init__(self, session: Session, modelo: Type[SQLModel], tamano_bloque: int = TAMANO_BLOQUE,
+                 max_errores: int = MAX_ERRORES_REPORTE):
+        self.session = session
+        self.modelo = modelo
+        self.tabla = modelo.__table__
+        self.tamano_bloque = tamano_bloque
+        self.max_errores = max_errores
+        self._foraneas_validas: Dict[str, Set[Any]] = {}
+        self._unicas_vistas: Dict[Tuple[str, ...], Set[tuple]] = {}
+
+    def _claves_unicas(self, columnas: List[str]) -> List[Tuple[Column, ...]]:
+        """
+        Claves únicas con todas sus columnas en el archivo: clave primaria,
+        columnas unique y restricciones o índices únicos de varias columnas
+        (ej. fabricante_id + nombre en modelo)
+        """
+        candidatas = [tuple(self.tabla.primary_key.columns)]
+        candidatas += [(c,) for c in self.tabla.columns if c.unique]
+        candidatas += [tuple(r.columns) for r in self.tabla.constraints if isinstance(r, UniqueConstraint)]
+        candidatas += [tuple(i.columns) for i in self.tabla.indexes if i.unique]
+        claves: List[Tuple[Column, ...]] = []
+        for clave in candidatas:
+            if clave and all(c.name in columnas for c in clave) and set(clave) not in [set(k) for k in claves]:
+                claves.append(clave)
+        return claves
+
+    def _validar_unicas(self, bloque: _Bloque, claves: List[Tuple[Column, ...]]) -> int:
+        """
+        Omite las filas cuya clave ya existe en la base y marca con error las
+        que la repiten dentro del archivo; retorna cuántas se omitieron
+        """
+        import pandas as pd
+
+        omitidas = 0
+        for clave in claves:
+            nombres = tuple(c.name for c in clave)
+            vistas = self._unicas_vistas.setdefault(nombres, set())
+            # Las claves con algún nulo no se comparan (la base admite nulos repetidos)
+            completas = bloque.df[list(nombres)].notna().all(axis=1)
+            tuplas = pd.Series(
+                list(zip(*(bloque.df[n].astype(object) for n in nombres))), index=bloque.df.index, dtype=object
+            )
+            # Primero las repetidas dentro del archivo: las de bloques anteriores
+            # ya están insertadas y no deben confundirse con registros existentes
+            repetidas = (
+                (tuplas.duplicated() | tuplas.map(vistas.__contains__).astype(bool)) & completas & bloque.validas()
+            )
+            bloque.marcar(repetidas, list(nombres), "Valor repetido en el archivo")
+            vistas.update(tuplas[bloque.validas() & completas])
+
+            candidatas = list(dict.fromkeys(tuplas[bloque.validas() & completas]))
+            existentes = _existentes(self.session, clave, candidatas)
+            mascara = tuplas.map(existentes.__contains__).astype(bool) & completas & bloque.validas()
+            omitidas += int(mascara.sum())
+            bloque.invalidas = bloque.invalidas.union(bloque.df.index[mascara.to_numpy()])
+        return omitidas
+
+    def _validar_foraneas(self, bloque: _Bloque, columnas: List[Column]) -> None:
+        """Marca las filas que referencian registros inexistentes (una consulta por bloque)"""
+        pendientes = {}
+        for columna in columnas:
+            conocidos = self._foraneas_validas.setdefault(columna.name, set())
+            serie = bloque.df[columna.name]
+            valores = serie[serie.notna() & bloque.validas()].unique().tolist()
+            pendientes[columna.name] = [v for v in valores if v not in conocidos]
+        for nombre, encontrados in resolver_foraneas(self.session, self.modelo, pendientes).items():
+            self._foraneas_validas[nombre].update(encontrados)
+        
+        for columna in columnas:
+            destino = next(iter(columna.foreign_keys)).column
+            serie = bloque.df[columna.name]
+            presentes = serie.notna() & bloque.validas()
+            bloque.marcar(presentes & ~serie.isin(self._foraneas_validas[columna.name]), columna.name,
+                          f"No existe el registro referenciado en {destino.table.name}")
+
+    def cargar(self, archivo: BinaryIO) -> Dict[str, Any]:
+        """
+        Procesa el archivo completo e inserta las filas válidas
+
+        Args:
+            archivo: Archivo Excel (.xlsx) abierto en modo binario
+
+        Returns:
+            Resumen con filas leídas, insertadas, omitidas por duplicado y
+            errores por fila (limitados a max_errores)
+
+        Raises:
+            ErrorCargue: Si el archivo no se puede leer o le faltan columnas obligatorias
+        """
+        import pandas as pd
+
+        try:
+            encabezados, bloques = _leer_bloques(archivo, self.tamano_bloque)
+        except ErrorCargue:
+            raise
+        except Exception as e:
+            raise ErrorCargue(f"No se pudo leer el archivo Excel: {e}")
+
+        descripcion = describir_tabla(self.modelo)
+        usadas = [c for c in encabezados if c in descripcion["columnas"]]
+        faltantes = [c for c in descripcion["obligatorias"] if c not in usadas]
+        if not usadas or faltantes:
+            bloques.close()
+            raise ErrorCargue(
+                f"Faltan columnas obligatorias para la tabla '{self.tabla.name}': {faltantes or descripcion['obligatorias']}. "
+                f"Columnas aceptadas: {descripcion['columnas']}"
+            )
+        posiciones = [encabezados.index(c) for c in usadas]
+        columnas = [self.tabla.columns[c] for c in usadas]
+        unicas = self._claves_unicas(usadas)
+        foraneas = [c for c in columnas if c.foreign_keys]
+
+        leidas = insertadas = omitidas = 0
+        errores: List[Dict[str, Any]] = []
+        total_errores = 0
+
+        for inicio, filas in bloques:
+            df = pd.DataFrame(
+                [[fila[i] if i < len(fila) else None for i in posiciones] for fila in filas],
+                columns=usadas, dtype=object,
+                index=pd.RangeIndex(inicio, inicio + len(filas))
+            )
+            # Las filas completamente vacías no cuentan
+            df = df[df.notna().any(axis=1)]
+            if df.empty:
+                continue
+            leidas += len(df)
+
+            bloque = _Bloque(df)
+            for columna in columnas:
+                _convertir_columna(bloque, columna)
+            omitidas += self._validar_unicas(bloque, unicas)
+            self._validar_foraneas(bloque, foraneas)
+
+            registros = (
+                bloque.df[bloque.validas()].astype(object)
+                .where(bloque.df.notna(), None)
+                .to_dict("records")
+            )
+            if registros:
+                self.session.execute(insert(self.tabla), registros)
+                insertadas += len(registros)
+
+            total_errores += len(bloque.errores)
+            errores.extend(bloque.errores[:max(0, self.max_errores - len(errores))])
+
+        self.session.commit()
+        if self.modelo is Equipo and insertadas:
+            # Los conteos por faceta de los equipos cambiaron
+            cache_facetas.limpiar()
+        return {
+            "message": f"Cargue exitoso en '{self.tabla.name}'",
+            "filas_leidas": leidas,
+            "registros_insertados": insertadas,
+            "registros_omitidos": omitidas,
+            "registros_con_error": leidas - insertadas - omitidas,
+            "columnas_usadas": usadas,
+            "columnas_ignoradas": [c for c in encabezados if c and c not in usadas],
+            "total_errores": total_errores,
+            "errores": sorted(errores, key=lambda e: e["fila"]),
+        }
@@ -0,0 +1,28 @@
+"""
+Cliente persistente de Chroma compartido por la aplicación.
+chromadb se importa en el primer uso para no retrasar el arranque.
+"""
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import chromadb
+
+# Ubicación de la base vectorial persistente y colección de CVs
+CHROMA_RUTA = os.getenv("CHROMA_RUTA", "chroma")
+COLECCION_CVS = "curriculums"
+
+_candado = threading.Lock()
+_cliente: Optional["chromadb.ClientAPI"] = None
+
+
+def obtener_cliente_chroma() -> "chromadb.ClientAPI":
+    """Retorna el cliente persistente de Chroma, creándolo en el primer uso"""
+    global _cliente
+    with _candado:
+        if _cliente is None:
+            import chromadb
+
+            _cliente = chromadb.PersistentClient(path=CHROMA_RUTA)
+        return _cliente
@@ -0,0 +1,114 @@
+"""
+Verificación de disponibilidad (readiness) de las dependencias de la aplicación.
+
+Cada verificación mide la latencia de una operación mínima sobre una
+dependencia (base de datos, Chroma, carpeta de assets). El resultado se
+guarda unos segundos para que los sondeos del balanceador no agreguen carga.
+"""
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from db import engine
+
+# Segundos durante los que se reutiliza el último resultado
+READY_CACHE_SEGUNDOS = float(os.getenv("READY_CACHE_SEGUNDOS", "5"))
+
+Verificacion = Callable[[], Optional[str]]
+
+
+def verificar_base_datos() -> Optional[str]:
+    """
+    Ejecuta una consulta trivial sobre el engine.
+    En SQLite se lee sqlite_master para detectar un archivo bloqueado o dañado,
+    cosa que un SELECT 1 no haría porque no toca el archivo.
+    """
+    consulta = "SELECT count(*) FROM sqlite_master" if engine.dialect.name == "sqlite" else "SELECT 1"
+    with engine.connect() as conn:
+        conn.execute(text(consulta)).scalar()
+    return None
+
+
+def verificar_chroma() -> Optional[str]:
+    """Comprueba que el cliente persistente de Chroma responde"""
+    from services.chroma_service import obtener_cliente_chroma
+
+    obtener_cliente_chroma().heartbeat()
+    return None
+
+
+def verificar_assets(carpeta: str = "assets") -> Optional[str]:
+    """Comprueba que la carpeta de assets existe y admite escritura"""
+    with tempfile.NamedTemporaryFile(dir=carpeta, prefix=".ready-"):
+        pass
+    return None
+
+
+class VerificadorDisponibilidad:
+    """
+    Ejecuta las verificaciones registradas y guarda el resultado durante un TTL.
+    Solo una verificación corre a la vez; las solicitudes concurrentes
+    esperan y reciben ese mismo resultado.
+    """
+
+    def __init__(self, ttl: float = READY_CACHE_SEGUNDOS):
+        self.ttl = ttl
+        self._verificaciones: Dict[str, Verificacion] = {}
+        self._candado = threading.Lock()
+        self._resultado: Optional[Dict[str, Any]] = None
+        self._momento = 0.0
+
+    def registrar(self, nombre: str, verificacion: Verificacion) -> None:
+        """
+        Agrega una dependencia a verificar
+
+        Args:
+            nombre: Nombre de la dependencia en el reporte
+            verificacion: Función que lanza una excepción (o retorna un mensaje)
+                si la dependencia no está disponible
+        """
+        self._verificaciones[nombre] = verificacion
+        self._resultado = None
+
+    def _ejecutar(self) -> Dict[str, Any]:
+        dependencias = {}
+        for nombre, verificacion in self._verificaciones.items():
+            inicio = time.perf_counter()
+            try:
+                error = verificacion()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            dependencias[nombre] = {
+                "estado": "error" if error else "ok",
+                "latencia_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                **({"detalle": error} if error else {})
+            }
+        return {
+            "listo": all(d["estado"] == "ok" for d in dependencias.values()),
+            "dependencias": dependencias
+        }
+
+    def verificar(self) -> Dict[str, Any]:
+        """
+        Retorna el estado de las dependencias, reutilizando el último si sigue vigente
+
+        Returns:
+            Diccionario con "listo", "dependencias" (estado y latencia de cada una)
+            y la antigüedad del resultado en segundos
+        """
+        with self._candado:
+            ahora = time.monotonic()
+            if self._resultado is None or ahora - self._momento >= self.ttl:
+                self._resultado = self._ejecutar()
+                self._momento = time.monotonic()
+            return {**self._resultado, "antiguedad_segundos": round(time.monotonic() - self._momento, 2)}
+
+
+# Instancia compartida; las dependencias opcionales se registran en main.py
+verificador_disponibilidad = VerificadorDisponibilidad()
+verificador_disponibilidad.registrar("base_datos", verificar_base_datos)
+verificador_disponibilidad.registrar("assets", verificar_assets)
@@ -0,0 +1,126 @@
+"""
+Registro en memoria de trabajos en segundo plano para la aplicación GAME.
+Permite lanzar procesos largos desde un endpoint y consultar su progreso
+posteriormente mediante el identificador del trabajo.
+"""
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+# Cantidad máxima de trabajos terminados que se conservan en memoria
+MAX_TRABAJOS_TERMINADOS = 100
+
+
+class Trabajo(BaseModel):
+    """Estado y progreso de un trabajo en segundo plano"""
+    id: str
+    tipo: str
+    estado: str = "pendiente"  # pendiente | en_curso | completado | fallido
+    total: int = 0
+    procesados: int = 0
+    fallidos: int = 0
+    errores: List[str] = []
+    resultado: Dict[str, Any] = {}
+    fecha_creacion: datetime
+    fecha_fin: Optional[datetime] = None
+
+
+class RegistroTrabajos:
+    """
+    Registro de trabajos compartido por la aplicación.
+
+    Las actualizaciones se protegen con un candado porque los trabajos pueden
+    ejecutarse tanto en el event loop como en el pool de hilos.
+    """
+
+    def __init__(self, max_terminados: int = MAX_TRABAJOS_TERMINADOS):
+        self._trabajos: Dict[str, Trabajo] = {}
+        self._candado = threading.Lock()
+        self._max_terminados = max_terminados
+
+    def crear(self, tipo: str, total: int = 0) -> Trabajo:
+        """
+        Registra un nuevo trabajo pendiente
+
+        Args:
+            tipo: Tipo de trabajo (ej. "procedimientos_planta")
+            total: Cantidad de elementos a procesar
+
+        Returns:
+            Trabajo creado
+        """
+        trabajo = Trabajo(
+            id=uuid.uuid4().hex,
+            tipo=tipo,
+            total=total,
+            fecha_creacion=datetime.now(timezone.utc)
+        )
+        with self._candado:
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+        return trabajo
+
+    def obtener(self, trabajo_id: str) -> Optional[Trabajo]:
+        """Obtiene un trabajo por su identificador"""
+        return self._trabajos.get(trabajo_id)
+
+    def listar(self, tipo: Optional[str] = None) -> List[Trabajo]:
+        """Lista los trabajos registrados, opcionalmente filtrados por tipo"""
+        with self._candado:
+            trabajos = list(self._trabajos.values())
+        return [t for t in trabajos if tipo is None or t.tipo == tipo]
+
+    def iniciar(self, trabajo: Trabajo) -> None:
+        """Marca un trabajo como en curso"""
+        with self._candado:
+            trabajo.estado = "en_curso"
+
+    def avanzar(self, trabajo: Trabajo, *, error: Optional[str] = None, **contadores: int) -> None:
+        """
+        Registra un elemento procesado
+
+        Args:
+            trabajo: Trabajo a actualizar
+            error: Mensaje de error si el elemento falló
+            contadores: Contadores adicionales a incrementar en el resultado
+        """
+        with self._candado:
+            trabajo.procesados += 1
+            if error:
+                trabajo.fallidos += 1
+                trabajo.errores.append(error)
+            for nombre, cantidad in contadores.items():
+                trabajo.resultado[nombre] = trabajo.resultado.get(nombre, 0) + cantidad
+
+    def finalizar(self, trabajo: Trabajo, *, error: Optional[str] = None, resultado: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Marca un trabajo como terminado
+
+        Args:
+            trabajo: Trabajo a finalizar
+            error: Mensaje de error si el trabajo falló por completo
+            resultado: Datos adicionales a incluir en el resultado
+        """
+        with self._candado:
+            trabajo.estado = "fallido" if error else "completado"
+            if error:
+                trabajo.errores.append(error)
+            if resultado:
+                trabajo.resultado.update(resultado)
+            trabajo.fecha_fin = datetime.now(timezone.utc)
+
+    def _purgar(self) -> None:
+        """Descarta los trabajos terminados más antiguos por encima del límite"""
+        terminados = [t for t in self._trabajos.values() if t.fecha_fin is not None]
+        exceso = len(terminados) - self._max_terminados
+        if exceso > 0:
+            terminados.sort(key=lambda t: t.fecha_fin)
+            for trabajo in terminados[:exceso]:
+                del self._trabajos[trabajo.id]
+
+
+# Instancia compartida por la aplicación
+registro_trabajos = RegistroTrabajos()
@@ -0,0 +1,119 @@
+"""
+Servicio de búsqueda e indexación de documentos con LlamaIndex y Chroma.
+
+Este módulo importa llama_index al cargarse, por lo que los
+routers deben importarlo dentro de los endpoints (primer uso) y no al
+arrancar la aplicación.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, StorageContext, Settings
+from llama_index.core.callbacks import CallbackManager, CBEventType, EventPayload
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from llama_index.core.node_parser import SimpleNodeParser
+from llama_index.core.ingestion import IngestionPipeline
+
+from services.ai_metrics_service import metricas_ia, estimar_tokens, extraer_uso
+from services.chroma_service import obtener_cliente_chroma, COLECCION_CVS
+
+
+class CallbackMetricasLlamaIndex(BaseCallbackHandler):
+    """
+    Callback de LlamaIndex que registra en las métricas de IA cada llamada
+    al LLM y al modelo de embeddings (duración, tokens y costo estimado)
+    """
+
+    def __init__(self):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self._inicios: Dict[str, Any] = {}
+
+    def on_event_start(self, event_type: CBEventType, payload: Optional[Dict[str, Any]] = None,
+                       event_id: str = "", parent_id: str = "", **kwargs: Any) -> str:
+        if event_type in (CBEventType.LLM, CBEventType.EMBEDDING):
+            self._inicios[event_id] = (time.perf_counter(), payload or {})
+        return event_id
+
+    def on_event_end(self, event_type: CBEventType, payload: Optional[Dict[str, Any]] = None,
+                     event_id: str = "", **kwargs: Any) -> None:
+        inicio = self._inicios.pop(event_id, None)
+        if inicio is None:
+            return
+
+        momento_inicio, payload_inicio = inicio
+        payload = payload or {}
+        serializado = payload_inicio.get(EventPayload.SERIALIZED) or {}
+        modelo = serializado.get("model") or serializado.get("model_name") or ""
+        duracion = time.perf_counter() - momento_inicio
+
+        if event_type == CBEventType.EMBEDDING:
+            textos = payload.get(EventPayload.CHUNKS) or []
+            metricas_ia.registrar_llamada(
+                tipo="embedding",
+                modelo=modelo,
+                duracion=duracion,
+                tokens_entrada=sum(estimar_tokens(texto) for texto in textos)
+            )
+            return
+
+        # Usar el uso reportado por la API; si no existe, estimarlo por longitud
+        respuesta = payload.get(EventPayload.RESPONSE) or payload.get(EventPayload.COMPLETION)
+        crudo = getattr(respuesta, "raw", None) or {}
+        uso = crudo.get("usage") if isinstance(crudo, dict) else getattr(crudo, "usage", None)
+        entrada, salida = extraer_uso(uso)
+        if not entrada:
+            prompt = payload_inicio.get(EventPayload.PROMPT) or payload_inicio.get(EventPayload.MESSAGES) or ""
+            entrada = estimar_tokens(str(prompt))
+        if not salida:
+            salida = estimar_tokens(str(respuesta or ""))
+
+        metricas_ia.registrar_llamada(
+            tipo="llm",
+            modelo=modelo,
+            duracion=duracion,
+            tokens_entrada=entrada,
+            tokens_salida=salida
+        )
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        pass
+
+    def end_trace(self, trace_id: Optional[str] = None, trace_map: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+
+# Instrumentar todas las llamadas de LlamaIndex (consultas e indexación)
+Settings.callback_manager = CallbackManager([CallbackMetricasLlamaIndex()])
+
+
+def _vector_store() -> ChromaVectorStore:
+    """Retorna el vector store de CVs sobre el cliente de Chroma compartido"""
+    coleccion = obtener_cliente_chroma().get_or_create_collection(COLECCION_CVS)
+    return ChromaVectorStore(chroma_collection=coleccion)
+
+
+def cargar_indice() -> VectorStoreIndex:
+    """Carga el índice vectorial de CVs desde la colección persistente de Chroma"""
+    return VectorStoreIndex.from_vector_store(_vector_store())
+
+
+def indexar_documentos(carpeta: str) -> Tuple[int, List[str]]:
+    """
+    Indexa los PDF de una carpeta en la colección de CVs
+
+    Args:
+        carpeta: Ruta de la carpeta con los documentos
+
+    Returns:
+        Tupla (cantidad de nodos indexados, rutas de los documentos cargados)
+    """
+    documents = SimpleDirectoryReader(input_dir=carpeta, required_exts=[".pdf"]).load_data()
+    document_names = [doc.metadata.get('file_path', 'sin_nombre') for doc in documents]
+    if not documents:
+        return 0, []
+
+    pipeline = IngestionPipeline(transformations=[SimpleNodeParser()])
+    nodes = pipeline.run(documents=documents)
+    VectorStoreIndex(nodes, storage_context=StorageContext.from_defaults(vector_store=_vector_store()))
+    return len(nodes), document_names
@@ -0,0 +1,401 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Implementación local (sin cliente ni colector externo) de contadores,
+medidores e histogramas con etiquetas, más la instrumentación de:
+- Solicitudes HTTP por plantilla de ruta (latencia, en curso, códigos de estado)
+- Consultas SQL y pool de conexiones de un engine de SQLAlchemy
+- Uso del pool de hilos de anyio y memoria residente del proceso
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Límites de los buckets de latencia en segundos (los mismos que usa Prometheus por defecto)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    """Escapa el valor de una etiqueta según el formato de texto de Prometheus"""
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence[str]) -> str:
+    """Construye el bloque {a="x",b="y"} de una serie"""
+    if not nombres:
+        return ""
+    pares = ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores))
+    return "{" + pares + "}"
+
+
+def _formatear_numero(valor: float) -> str:
+    """Representa un valor numérico sin decimales innecesarios"""
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+class _Metrica:
+    """Base de las métricas: nombre, ayuda, etiquetas y candado compartido"""
+
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._candado = threading.Lock()
+
+    def _clave(self, valores: Sequence[str]) -> Etiquetas:
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return tuple(str(v) for v in valores)
+
+    def _lineas(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def exponer(self) -> List[str]:
+        """Retorna las líneas de texto de la métrica, con HELP y TYPE"""
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}", *self._lineas()]
+
+
+class Contador(_Metrica):
+    """Valor acumulado que solo aumenta"""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Etiquetas, float] = {}
+
+    def incrementar(self, *valores: str, cantidad: float = 1.0) -> None:
+        clave = self._clave(valores)
+        with self._candado:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def _lineas(self) -> Iterable[str]:
+        with self._candado:
+            series = list(self._valores.items())
+        for clave, valor in series:
+            yield f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}"
+
+
+class Medidor(_Metrica):
+    """Valor instantáneo que puede subir o bajar"""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Etiquetas, float] = {}
+
+    def establecer(self, valor: float, *valores: str) -> None:
+        clave = self._clave(valores)
+        with self._candado:
+            self._valores[clave] = float(valor)
+
+    def incrementar(self, *valores: str, cantidad: float = 1.0) -> None:
+        clave = self._clave(valores)
+        with self._candado:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def decrementar(self, *valores: str, cantidad: float = 1.0) -> None:
+        self.incrementar(*valores, cantidad=-cantidad)
+
+    def _lineas(self) -> Iterable[str]:
+        with self._candado:
+            series = list(self._valores.items())
+        for clave, valor in series:
+            yield f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}"
+
+
+class Histograma(_Metrica):
+    """Distribución de observaciones en buckets acumulativos, con suma y conteo"""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: [conteos por bucket (no acumulados) + desborde, suma]
+        self._series: Dict[Etiquetas, Tuple[List[int], List[float]]] = {}
+
+    def observar(self, valor: float, *valores: str) -> None:
+        clave = self._clave(valores)
+        indice = len(self.buckets)
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                indice = i
+                break
+        with self._candado:
+            conteos, suma = self._series.setdefault(clave, ([0] * (len(self.buckets) + 1), [0.0]))
+            conteos[indice] += 1
+            suma[0] += valor
+
+    def _lineas(self) -> Iterable[str]:
+        with self._candado:
+            series = [(clave, list(conteos), suma[0]) for clave, (conteos, suma) in self._series.items()]
+        nombres = self.etiquetas + ("le",)
+        for clave, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(nombres, clave + (_formatear_numero(limite),))
+                yield f"{self.nombre}_bucket{etiquetas} {acumulado}"
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            yield f"{self.nombre}_sum{etiquetas} {_formatear_numero(suma)}"
+            yield f"{self.nombre}_count{etiquetas} {acumulado}"
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas expuestas por la aplicación.
+    Los recolectores se ejecutan justo antes de exponer, para actualizar
+    medidores cuyo valor se lee en el momento (pool, memoria, hilos).
+    """
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._recolectores: List[Callable[[], None]] = []
+        self._candado = threading.Lock()
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._candado:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Medidor:
+        return self._registrar(Medidor(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def agregar_recolector(self, recolector: Callable[[], None]) -> None:
+        """Registra una función que actualiza medidores antes de cada exposición"""
+        self._recolectores.append(recolector)
+
+    def exponer(self) -> str:
+        """
+        Genera el texto de todas las métricas en formato de Prometheus
+
+        Returns:
+            Texto listo para servirse con CONTENT_TYPE_PROMETHEUS
+        """
+        for recolector in list(self._recolectores):
+            recolector()
+        with self._candado:
+            metricas = list(self._metricas.values())
+        lineas: List[str] = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+# Registro compartido por la aplicación
+registro_metricas = RegistroMetricas()
+
+# ----------------- SOLICITUDES HTTP -----------------
+
+http_duracion = registro_metricas.histograma(
+    "game_http_request_duration_seconds",
+    "Duración de las solicitudes HTTP por plantilla de ruta",
+    ("method", "route")
+)
+http_solicitudes = registro_metricas.contador(
+    "game_http_requests_total",
+    "Solicitudes HTTP atendidas por plantilla de ruta y código de estado",
+    ("method", "route", "status")
+)
+http_en_curso = registro_metricas.medidor(
+    "game_http_requests_in_progress",
+    "Solicitudes HTTP en curso por método",
+    ("method",)
+)
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide cada solicitud HTTP.
+
+    La ruta se etiqueta con su plantilla (ej. /api/equipos/{equipo_id}) para
+    no crear una serie por cada ID; las rutas inexistentes se agrupan en
+    "sin_ruta". Se implementa como ASGI puro para no bufferizar respuestas
+    en streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        estado = {"codigo": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        http_en_curso.incrementar(metodo)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            http_en_curso.decrementar(metodo)
+            # El router de Starlette deja la ruta resuelta en el scope
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            http_duracion.observar(duracion, metodo, ruta)
+            http_solicitudes.incrementar(metodo, ruta, str(estado["codigo"]))
+
+
+# ----------------- BASE DE DATOS -----------------
+
+db_consultas = registro_metricas.contador(
+    "game_db_queries_total",
+    "Consultas SQL ejecutadas por tipo de sentencia",
+    ("operation",)
+)
+db_errores = registro_metricas.contador(
+    "game_db_query_errors_total",
+    "Consultas SQL fallidas por tipo de sentencia",
+    ("operation",)
+)
+db_duracion = registro_metricas.histograma(
+    "game_db_query_duration_seconds",
+    "Duración de las consultas SQL por tipo de sentencia",
+    ("operation",)
+)
+# Mide la retención (checkout → checkin), no la espera por una conexión libre
+db_conexion_retenida = registro_metricas.histograma(
+    "game_db_connection_hold_duration_seconds",
+    "Tiempo que cada conexión permanece tomada del pool, desde el checkout hasta el checkin"
+)
+db_pool = registro_metricas.medidor(
+    "game_db_pool_connections",
+    "Conexiones del pool por estado",
+    ("state",)
+)
+
+
+def _operacion(sentencia: str) -> str:
+    """Tipo de sentencia SQL (SELECT, INSERT, ...) a partir de su texto"""
+    partes = sentencia.lstrip().split(None, 1)
+    return partes[0].upper() if partes else "DESCONOCIDA"
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """
+    Registra los eventos de SQLAlchemy que alimentan las métricas de la base de datos
+
+    Args:
+        engine: Engine a instrumentar
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["metricas_inicio"].pop()
+        operacion = _operacion(statement)
+        db_consultas.incrementar(operacion)
+        db_duracion.observar(time.perf_counter() - inicio, operacion)
+
+    @event.listens_for(engine, "handle_error")
+    def _error_consulta(contexto):
+        inicios = contexto.connection.info.get("metricas_inicio") if contexto.connection else None
+        if inicios:
+            inicios.pop()
+        operacion = _operacion(contexto.statement or "")
+        db_consultas.incrementar(operacion)
+        db_errores.incrementar(operacion)
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["metricas_checkout"] = time.perf_counter()
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        inicio = connection_record.info.pop("metricas_checkout", None)
+        if inicio is not None:
+            db_conexion_retenida.observar(time.perf_counter() - inicio)
+
+    def _recolectar_pool():
+        pool = engine.pool
+        for estado, metodo in (("size", "size"), ("checked_out", "checkedout"),
+                               ("checked_in", "checkedin"), ("overflow", "overflow")):
+            funcion = getattr(pool, metodo, None)
+            if funcion is not None:
+                db_pool.establecer(funcion(), estado)
+
+    registro_metricas.agregar_recolector(_recolectar_pool)
+
+
+# ----------------- PROCESO E HILOS -----------------
+
+hilos_ocupados = registro_metricas.medidor(
+    "game_threadpool_busy_threads",
+    "Hilos del pool de anyio ocupados (endpoints síncronos y run_in_threadpool)"
+)
+hilos_limite = registro_metricas.medidor(
+    "game_threadpool_max_threads",
+    "Límite de hilos del pool de anyio"
+)
+memoria_residente = registro_metricas.medidor(
+    "game_process_resident_memory_bytes",
+    "Memoria residente (RSS) del proceso"
+)
+
+
+def _memoria_residente() -> Optional[int]:
+    """RSS actual desde /proc; en otros sistemas, el máximo reportado por getrusage"""
+    try:
+        with open("/proc/self/statm") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reporta bytes; Linux, kilobytes
+        return maximo if os.uname().sysname == "Darwin" else maximo * 1024
+
+
+def recolectar_proceso() -> None:
+    """Actualiza la memoria del proceso y, dentro del event loop, el uso del pool de hilos"""
+    memoria = _memoria_residente()
+    if memoria is not None:
+        memoria_residente.establecer(memoria)
+
+    try:
+        from anyio import to_thread
+
+        limitador = to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        # Fuera de un event loop no hay limitador al que consultar
+        return
+    hilos_ocupados.establecer(limitador.borrowed_tokens)
+    hilos_limite.establecer(limitador.total_tokens)
+
+
+registro_metricas.agregar_recolector(recolectar_proceso)
@@ -0,0 +1,256 @@
+"""
+Perfilado de solicitudes bajo demanda.
+
+Una solicitud se perfila cuando la elige el muestreo aleatorio
+PERFIL_MUESTREO o cuando trae las cabeceras `X-Profile: 1` y
+`X-Profile-Token` con el valor de PERFIL_TOKEN. Sin PERFIL_TOKEN
+configurado la cabecera se ignora y los endpoints de reportes responden
+403: solo funciona el muestreo. El reporte se guarda en PERFIL_DIRECTORIO
+junto con un archivo JSON de metadatos.
+
+Modos (PERFIL_MODO):
+- "muestreo" (por defecto): muestreador de pilas de todos los hilos cada
+  PERFIL_INTERVALO_MS. Cubre los endpoints síncronos, que corren en el pool
+  de hilos, y genera pilas plegadas (.folded) que abren speedscope o
+  flamegraph.pl. Con solicitudes concurrentes el reporte incluye también
+  el trabajo de los demás hilos activos.
+- "cprofile": cProfile sobre el hilo del event loop (.prof, para pstats o
+  snakeviz). Solo ve el código asíncrono, no el de los endpoints síncronos.
+
+Solo se perfila una solicitud a la vez; si hay otra en curso, la nueva
+se atiende sin perfilar.
+"""
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Configuración (sobrescribible por variables de ambiente)
+PERFIL_DIRECTORIO = os.getenv("PERFIL_DIRECTORIO", "perfiles")
+PERFIL_TOKEN = os.getenv("PERFIL_TOKEN", "")
+PERFIL_MUESTREO = float(os.getenv("PERFIL_MUESTREO", "0"))
+PERFIL_MODO = os.getenv("PERFIL_MODO", "muestreo")
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "5"))
+PERFIL_MAX_REPORTES = int(os.getenv("PERFIL_MAX_REPORTES", "50"))
+
+EXTENSIONES = {"muestreo": ".folded", "cprofile": ".prof"}
+
+# Archivos cuya función en la cima de la pila indica un hilo en espera
+_ARCHIVOS_ESPERA = ("threading.py", "selectors.py", "queue.py")
+
+
+def token_valido(token: Optional[str]) -> bool:
+    """Indica si el token recibido coincide con PERFIL_TOKEN (siempre False si no está configurado)"""
+    if not PERFIL_TOKEN:
+        return False
+    return token is not None and hmac.compare_digest(token, PERFIL_TOKEN)
+
+
+def _describir_marco(marco) -> str:
+    codigo = marco.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class MuestreadorPilas(threading.Thread):
+    """
+    Hilo que toma periódicamente la pila de todos los demás hilos y cuenta
+    cuántas veces aparece cada pila (formato de pilas plegadas).
+    Los hilos en espera (locks, colas, select del event loop) se descartan.
+    """
+
+    def __init__(self, intervalo: float):
+        super().__init__(name="muestreador-perfil", daemon=True)
+        self.intervalo = intervalo
+        self.pilas: Counter = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+
+    def run(self) -> None:
+        nombres = {}
+        while not self._detener.wait(self.intervalo):
+            self.muestras += 1
+            for ident, marco in sys._current_frames().items():
+                if ident == self.ident or os.path.basename(marco.f_code.co_filename) in _ARCHIVOS_ESPERA:
+                    continue
+                if ident not in nombres:
+                    hilo = next((h for h in threading.enumerate() if h.ident == ident), None)
+                    nombres[ident] = hilo.name if hilo else str(ident)
+                pila = []
+                while marco is not None:
+                    pila.append(_describir_marco(marco))
+                    marco = marco.f_back
+                pila.append(nombres[ident])
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def detener(self) -> str:
+        """Detiene el muestreo y retorna el reporte en formato de pilas plegadas"""
+        self._detener.set()
+        self.join()
+        return "".join(f"{pila} {cantidad}\n" for pila, cantidad in self.pilas.most_common())
+
+
+class Perfilador:
+    """Gestiona el perfilado de una solicitud y el almacenamiento de sus reportes"""
+
+    def __init__(self, directorio: str = PERFIL_DIRECTORIO, modo: str = PERFIL_MODO,
+                 intervalo_ms: float = PERFIL_INTERVALO_MS, max_reportes: int = PERFIL_MAX_REPORTES):
+        if modo not in EXTENSIONES:
+            raise ValueError(f"PERFIL_MODO debe ser uno de {sorted(EXTENSIONES)}")
+        self.directorio = directorio
+        self.modo = modo
+        self.intervalo = intervalo_ms / 1000
+        self.max_reportes = max_reportes
+        self._en_curso = threading.Lock()
+
+    def debe_perfilar(self, cabeceras: Dict[str, str]) -> bool:
+        """Decide si perfilar una solicitud a partir de sus cabeceras y del muestreo"""
+        if cabeceras.get("x-profile") == "1":
+            return token_valido(cabeceras.get("x-profile-token"))
+        return PERFIL_MUESTREO > 0 and random.random() < PERFIL_MUESTREO
+
+    def iniciar(self) -> Optional[Any]:
+        """
+        Comienza a perfilar si no hay otro perfilado en curso
+
+        Returns:
+            Objeto de perfilado para pasar a finalizar, o None si se omitió
+        """
+        if not self._en_curso.acquire(blocking=False):
+            return None
+        if self.modo == "cprofile":
+            perfil = cProfile.Profile()
+            perfil.enable()
+        else:
+            perfil = MuestreadorPilas(self.intervalo)
+            perfil.start()
+        return perfil
+
+    def finalizar(self, perfil: Any, reporte_id: str, metadatos: Dict[str, Any]) -> None:
+        """
+        Detiene el perfilado, guarda el reporte y sus metadatos y aplica la retención
+
+        Args:
+            perfil: Objeto retornado por iniciar
+            reporte_id: Nombre base del reporte
+            metadatos: Datos de la solicitud (método, ruta, estado, duración)
+        """
+        archivo = os.path.join(self.directorio, reporte_id + EXTENSIONES[self.modo])
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            if self.modo == "cprofile":
+                perfil.disable()
+                perfil.dump_stats(archivo)
+            else:
+                contenido = perfil.detener()
+                metadatos["muestras"] = perfil.muestras
+                with open(archivo, "w", encoding="utf-8") as f:
+                    f.write(contenido)
+        finally:
+            self._en_curso.release()
+
+        metadatos.update({"id": reporte_id, "modo": self.modo, "archivo": os.path.basename(archivo)})
+        with open(os.path.join(self.directorio, reporte_id + ".json"), "w", encoding="utf-8") as f:
+            json.dump(metadatos, f, ensure_ascii=False, indent=2)
+        self._purgar()
+
+    def nuevo_id(self, metodo: str, ruta: str) -> str:
+        """Genera un nombre de reporte ordenable por fecha y legible"""
+        marca = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        ruta = re.sub(r"[^A-Za-z0-9]+", "_", ruta).strip("_") or "raiz"
+        return f"{marca}_{metodo}_{ruta[:60]}_{uuid.uuid4().hex[:8]}"
+
+    def listar(self) -> List[Dict[str, Any]]:
+        """Retorna los metadatos de los reportes guardados, del más reciente al más antiguo"""
+        if not os.path.isdir(self.directorio):
+            return []
+        reportes = []
+        for nombre in sorted(os.listdir(self.directorio), reverse=True):
+            if nombre.endswith(".json"):
+                with open(os.path.join(self.directorio, nombre), encoding="utf-8") as f:
+                    reportes.append(json.load(f))
+        return reportes
+
+    def ruta_reporte(self, nombre: str) -> Optional[str]:
+        """
+        Ruta del archivo de un reporte, validando que esté dentro del directorio
+
+        Args:
+            nombre: Nombre del archivo (reporte o metadatos)
+
+        Returns:
+            Ruta absoluta, o None si el nombre no es válido o no existe
+        """
+        if os.path.basename(nombre) != nombre or nombre.startswith("."):
+            return None
+        ruta = os.path.join(self.directorio, nombre)
+        return ruta if os.path.isfile(ruta) else None
+
+    def _purgar(self) -> None:
+        """Elimina los reportes más antiguos por encima de max_reportes"""
+        metadatos = sorted(n for n in os.listdir(self.directorio) if n.endswith(".json"))
+        for nombre in metadatos[:max(0, len(metadatos) - self.max_reportes)]:
+            base = nombre[:-len(".json")]
+            for extension in (".json", *EXTENSIONES.values()):
+                try:
+                    os.remove(os.path.join(self.directorio, base + extension))
+                except FileNotFoundError:
+                    pass
+
+
+# Instancia compartida por la aplicación
+perfilador = Perfilador()
+
+
+class MiddlewarePerfilado:
+    """
+    Middleware ASGI que perfila las solicitudes elegidas por `perfilador`.
+    La respuesta incluye la cabecera X-Profile-Report con el nombre del reporte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cabeceras = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        perfil = perfilador.iniciar() if perfilador.debe_perfilar(cabeceras) else None
+        if perfil is None:
+            await self.app(scope, receive, send)
+            return
+
+        reporte_id = perfilador.nuevo_id(scope["method"], scope["path"])
+        estado = {"codigo": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-profile-report", reporte_id.encode())
+                ]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfilador.finalizar(perfil, reporte_id, {
+                "metodo": scope["method"],
+                "ruta": getattr(scope.get("route"), "path", None) or scope["path"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "estado": estado["codigo"],
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "fecha": datetime.now(timezone.utc).isoformat()
+            })
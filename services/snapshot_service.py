@@ -0,0 +1,185 @@
+"""
+Exportación de una instantánea completa de la base de datos a Parquet.
+
+Genera un zip con un archivo Parquet por tabla de SQLModel y un
+manifiesto.json con la cantidad de filas y el esquema de cada una. Las
+tablas se leen por lotes que se convierten en record batches de pyarrow, y
+el zip se produce de forma incremental, así la memoria no depende del tamaño
+de la base. Todas las tablas se leen dentro de una misma transacción de
+lectura, de modo que la instantánea es consistente entre tablas; con SQLite
+en modo WAL (ver db/database.py) esa lectura no bloquea a los escritores.
+
+pyarrow es opcional: solo se importa al generar una instantánea.
+
+Uso por línea de comandos (desde la raíz del proyecto):
+    python -m services.snapshot_service --salida snapshot.zip
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, Table
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+# Filas leídas y escritas por record batch (sobrescribible por ambiente)
+SNAPSHOT_FILAS_LOTE = int(os.getenv("SNAPSHOT_FILAS_LOTE", "50000"))
+
+
+class SnapshotNoDisponible(RuntimeError):
+    """pyarrow no está instalado"""
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SnapshotNoDisponible("La exportación a Parquet requiere el paquete pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _esquema_arrow(pa, tabla: Table):
+    """Esquema de Arrow equivalente a las columnas de la tabla"""
+    campos = []
+    for columna in tabla.columns:
+        tipo = columna.type
+        if isinstance(tipo, Boolean):
+            tipo_arrow = pa.bool_()
+        elif isinstance(tipo, Integer):
+            tipo_arrow = pa.int64()
+        elif isinstance(tipo, (Float, Numeric)):
+            tipo_arrow = pa.float64()
+        elif isinstance(tipo, DateTime):
+            tipo_arrow = pa.timestamp("us", tz="UTC" if tipo.timezone else None)
+        elif isinstance(tipo, Date):
+            tipo_arrow = pa.date32()
+        else:
+            tipo_arrow = pa.string()
+        campos.append(pa.field(columna.name, tipo_arrow, nullable=bool(columna.nullable)))
+    return pa.schema(campos)
+
+
+class _SalidaIncremental(io.RawIOBase):
+    """
+    Flujo de solo escritura que acumula lo escrito hasta que se vacía.
+    No admite seek, así zipfile escribe el zip de forma secuencial.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._partes: List[bytes] = []
+        self._posicion = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def generar_snapshot(engine: Engine, filas_lote: int = SNAPSHOT_FILAS_LOTE,
+                     tablas: Optional[List[Table]] = None) -> Iterator[bytes]:
+    """
+    Genera el zip de la instantánea por partes
+
+    Args:
+        engine: Engine de la base de datos a exportar
+        filas_lote: Filas por record batch
+        tablas: Tablas a exportar (por defecto todas las de SQLModel)
+
+    Returns:
+        Iterador de bytes del zip, listo para escribir en un archivo o enviar en una respuesta
+
+    Raises:
+        SnapshotNoDisponible: Si pyarrow no está instalado (antes de leer la base)
+    """
+    pa, pq = _importar_pyarrow()
+    tablas = tablas if tablas is not None else list(SQLModel.metadata.sorted_tables)
+
+    def partes() -> Iterator[bytes]:
+        salida = _SalidaIncremental()
+        manifiesto: Dict[str, Any] = {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "dialecto": engine.dialect.name,
+            "tablas": {},
+        }
+        with engine.connect() as conn, zipfile.ZipFile(salida, "w", zipfile.ZIP_STORED) as archivo_zip:
+            # Una sola transacción de lectura para todas las tablas
+            if engine.dialect.name == "sqlite":
+                # pysqlite no abre transacción antes de un SELECT; se abre de forma explícita
+                conn.exec_driver_sql("BEGIN")
+            elif engine.dialect.name == "postgresql":
+                conn = conn.execution_options(isolation_level="REPEATABLE READ")
+
+            for tabla in tablas:
+                esquema = _esquema_arrow(pa, tabla)
+                filas = 0
+                with archivo_zip.open(f"{tabla.name}.parquet", "w", force_zip64=True) as entrada:
+                    escritor = pq.ParquetWriter(entrada, esquema)
+                    resultado = conn.execution_options(stream_results=True).execute(tabla.select())
+                    for lote in resultado.partitions(filas_lote):
+                        columnas = list(zip(*lote))
+                        escritor.write_batch(pa.RecordBatch.from_arrays(
+                            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+                            schema=esquema
+                        ))
+                        filas += len(lote)
+                        yield salida.vaciar()
+                    escritor.close()
+                manifiesto["tablas"][tabla.name] = {
+                    "filas": filas,
+                    "columnas": {campo.name: str(campo.type) for campo in esquema},
+                }
+                yield salida.vaciar()
+
+            archivo_zip.writestr("manifiesto.json", json.dumps(manifiesto, ensure_ascii=False, indent=2))
+            conn.rollback()
+        yield salida.vaciar()
+
+    return partes()
+
+
+def nombre_snapshot() -> str:
+    """Nombre de archivo de la instantánea con la fecha actual"""
+    return f"game_snapshot_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.zip"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Exporta todas las tablas a un zip de archivos Parquet")
+    parser.add_argument("--salida", default=None, help="Ruta del zip (por defecto game_snapshot_<fecha>.zip)")
+    parser.add_argument("--filas-lote", type=int, default=SNAPSHOT_FILAS_LOTE, help="Filas por record batch")
+    args = parser.parse_args()
+
+    from db import engine
+
+    salida = args.salida or nombre_snapshot()
+    try:
+        partes = generar_snapshot(engine, filas_lote=args.filas_lote)
+    except SnapshotNoDisponible as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    with open(salida, "wb") as f:
+        for parte in partes:
+            f.write(parte)
+    print(f"Instantánea guardada en {salida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Configuración de las pruebas: base SQLite temporal y sin eco de SQL.
+Las variables se fijan antes de importar la aplicación, que las lee al cargarse.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="game-pruebas-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DIRECTORIO, 'pruebas.db')}")
+os.environ.setdefault("DB_ECHO", "false")
+os.environ.setdefault("GAME_HABILITAR_IA", "true")
+
+
+@pytest.fixture
+def base():
+    """
+    Base recién sembrada con la escala "pequeno" de benchmarks/datos.py
+
+    Returns:
+        Cantidad de filas por tabla principal
+    """
+    from benchmarks.datos import ESCALAS, poblar
+    from db import create_db, engine
+    from db.crud_equipment import cache_facetas
+    from sqlmodel import SQLModel
+
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        for tabla in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).scalars().all():
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{tabla}"')
+    engine.dispose()
+    create_db()
+    cache_facetas.limpiar()
+    return poblar(engine, ESCALAS["pequeno"], semilla=1)
+
+
+@pytest.fixture
+def cliente(base):
+    """Cliente HTTP de la aplicación sobre la base sembrada"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def sql():
+    """Ejecuta SQL directo sobre la base de la aplicación y retorna el resultado"""
+    from db import engine
+    from sqlalchemy import text
+
+    def ejecutar(consulta: str, **parametros):
+        with engine.begin() as conn:
+            return conn.execute(text(consulta), parametros).all()
+
+    return ejecutar
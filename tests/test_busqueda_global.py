@@ -0,0 +1,47 @@
+"""
+Búsqueda global: el orden por relevancia y la paginación abarcan todas las
+coincidencias, no solo las primeras leídas del índice.
+"""
+from sqlalchemy import text
+
+COINCIDENCIAS = 1200
+
+
+def _sembrar_equipos(sql):
+    from db import engine
+
+    subsistema_id, tipo_activo_id = sql("SELECT subsistema_id, tipo_activo_id FROM equipo LIMIT 1")[0]
+    filas = [{"nombre": f"Bomba zeta auxiliar {i}", "subsistema_id": subsistema_id, "tipo_activo_id": tipo_activo_id}
+             for i in range(COINCIDENCIAS - 1)]
+    # La mejor coincidencia (título más corto) se inserta de última
+    filas.append({"nombre": "Zeta", "subsistema_id": subsistema_id, "tipo_activo_id": tipo_activo_id})
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO equipo (nombre, subsistema_id, tipo_activo_id) VALUES (:nombre, :subsistema_id, :tipo_activo_id)"
+        ), filas)
+
+
+def _buscar(cliente, **parametros):
+    respuesta = cliente.get("/api/buscar", params={"q": "zeta", "tipos": "equipo", **parametros})
+    assert respuesta.status_code == 200, respuesta.json()
+    return respuesta.json()
+
+
+def test_la_mejor_coincidencia_va_primero_aunque_se_indexe_de_ultima(cliente, sql):
+    _sembrar_equipos(sql)
+
+    assert _buscar(cliente, limit=1)[0]["titulo"] == "Zeta"
+
+
+def test_paginas_mas_alla_de_mil_resultados(cliente, sql):
+    _sembrar_equipos(sql)
+
+    resultados = []
+    for skip in range(0, COINCIDENCIAS + 100, 100):
+        resultados.extend(_buscar(cliente, skip=skip, limit=100))
+
+    assert len(resultados) == COINCIDENCIAS
+    assert len({r["id"] for r in resultados}) == COINCIDENCIAS
+    relevancias = [r["relevancia"] for r in resultados]
+    assert relevancias == sorted(relevancias)
+    assert len(_buscar(cliente, skip=1150, limit=20)) == 20
@@ -0,0 +1,64 @@
+"""
+Cargue masivo: duplicados por claves únicas de una y de varias columnas,
+dentro del archivo y contra la base de datos.
+"""
+import io
+
+import pandas as pd
+
+
+def _excel(filas):
+    buffer = io.BytesIO()
+    pd.DataFrame(filas).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _cargar(cliente, tabla, filas, **parametros):
+    return cliente.post(f"/api/cargue_masivo/{tabla}", params=parametros,
+                        files={"file": (f"{tabla}.xlsx", _excel(filas))})
+
+
+def test_clave_compuesta_repetida_en_el_archivo_es_error_de_fila(cliente, sql):
+    fabricante_id, nombre_existente = sql("SELECT fabricante_id, nombre FROM modelo LIMIT 1")[0]
+    filas = [
+        {"fabricante_id": 1, "nombre": "M"},
+        {"fabricante_id": 1, "nombre": "M"},
+        {"fabricante_id": 2, "nombre": "M"},
+        {"fabricante_id": fabricante_id, "nombre": nombre_existente},
+    ]
+
+    respuesta = _cargar(cliente, "modelos", filas)
+
+    assert respuesta.status_code == 200, respuesta.json()
+    resumen = respuesta.json()
+    assert resumen["registros_insertados"] == 2
+    assert resumen["registros_omitidos"] == 1
+    assert resumen["errores"] == [{
+        "fila": 3, "columna": "fabricante_id, nombre", "error": "Valor repetido en el archivo", "valor": "1, M"
+    }]
+    assert sql("SELECT count(*) FROM modelo WHERE nombre = 'M'")[0][0] == 2
+
+
+def test_clave_compuesta_repetida_entre_bloques(cliente, sql):
+    filas = [{"fabricante_id": 1, "nombre": f"B{i % 150}"} for i in range(300)]
+
+    resumen = _cargar(cliente, "modelos", filas, tamano_bloque=100).json()
+
+    assert resumen["registros_insertados"] == 150
+    assert resumen["total_errores"] == 150
+    assert {e["error"] for e in resumen["errores"]} == {"Valor repetido en el archivo"}
+
+
+def test_clave_primaria_existente_se_omite_y_repetida_es_error(cliente, sql):
+    identificacion, = sql("SELECT identificacion FROM persona LIMIT 1")[0]
+    filas = [
+        {"identificacion": identificacion, "nombres": "Ya existe"},
+        {"identificacion": 770001, "nombres": "Nueva"},
+        {"identificacion": 770001, "nombres": "Repetida"},
+    ]
+
+    resumen = _cargar(cliente, "personas", filas).json()
+
+    assert (resumen["registros_insertados"], resumen["registros_omitidos"], resumen["total_errores"]) == (1, 1, 1)
+    assert resumen["errores"][0]["columna"] == "identificacion"
+    assert sql("SELECT nombres FROM persona WHERE identificacion = 770001") == [("Nueva",)]
@@ -0,0 +1,64 @@
+"""
+Eliminación de nodos de la jerarquía: dry_run solo cuenta, sin cascada un
+nodo con dependientes responde 409 y con cascada se elimina el subárbol.
+"""
+
+
+def _subarbol_sistema(sql, sistema_id):
+    return {
+        "sistema": 1,
+        "subsistema": sql("SELECT count(*) FROM subsistema WHERE sistema_id = :id", id=sistema_id)[0][0],
+        "equipo": sql("""SELECT count(*) FROM equipo e JOIN subsistema ss ON ss.id = e.subsistema_id
+                         WHERE ss.sistema_id = :id""", id=sistema_id)[0][0],
+        "actividad": sql("""SELECT count(*) FROM actividad a JOIN equipo e ON e.id = a.equipo_id
+                            JOIN subsistema ss ON ss.id = e.subsistema_id WHERE ss.sistema_id = :id""",
+                         id=sistema_id)[0][0],
+    }
+
+
+def test_dry_run_cuenta_sin_eliminar(cliente, sql):
+    sistema_id = sql("SELECT id FROM sistema LIMIT 1")[0][0]
+    esperado = _subarbol_sistema(sql, sistema_id)
+
+    respuesta = cliente.delete(f"/api/sistemas/{sistema_id}", params={"cascada": True, "dry_run": True})
+
+    assert respuesta.status_code == 200, respuesta.json()
+    assert respuesta.json()["dry_run"] is True
+    assert {t: n for t, n in respuesta.json()["eliminados"].items() if t in esperado} == esperado
+    assert _subarbol_sistema(sql, sistema_id) == esperado
+
+
+def test_sin_cascada_con_dependientes_responde_409(cliente, sql):
+    planta_id = sql("SELECT id FROM planta LIMIT 1")[0][0]
+    sistemas = sql("SELECT count(*) FROM sistema WHERE planta_id = :id", id=planta_id)[0][0]
+
+    respuesta = cliente.delete(f"/api/plantas/{planta_id}")
+
+    assert respuesta.status_code == 409
+    assert "cascada=true" in respuesta.json()["detail"]
+    assert sql("SELECT count(*) FROM planta WHERE id = :id", id=planta_id)[0][0] == 1
+    assert sql("SELECT count(*) FROM sistema WHERE planta_id = :id", id=planta_id)[0][0] == sistemas
+
+
+def test_sin_dependientes_se_elimina_sin_cascada(cliente, sql):
+    planta_id = sql("SELECT id FROM planta LIMIT 1")[0][0]
+    creado = cliente.post("/api/sistemas/", json={"codigo": "S-VACIO", "nombre": "Vacío", "planta_id": planta_id})
+    assert creado.status_code == 200, creado.json()
+    sistema_id = creado.json()["id"]
+
+    assert cliente.delete(f"/api/sistemas/{sistema_id}").json() == {"ok": True}
+    assert sql("SELECT count(*) FROM sistema WHERE id = :id", id=sistema_id)[0][0] == 0
+
+
+def test_cascada_elimina_el_subarbol(cliente, sql):
+    sistema_id = sql("SELECT id FROM sistema LIMIT 1")[0][0]
+    esperado = _subarbol_sistema(sql, sistema_id)
+    actividades = sql("SELECT count(*) FROM actividad")[0][0]
+
+    respuesta = cliente.delete(f"/api/sistemas/{sistema_id}", params={"cascada": True})
+
+    assert respuesta.status_code == 200, respuesta.json()
+    assert {t: n for t, n in respuesta.json()["eliminados"].items() if t in esperado} == esperado
+    assert _subarbol_sistema(sql, sistema_id) == {"sistema": 1, "subsistema": 0, "equipo": 0, "actividad": 0}
+    assert sql("SELECT count(*) FROM sistema WHERE id = :id", id=sistema_id)[0][0] == 0
+    assert sql("SELECT count(*) FROM actividad")[0][0] == actividades - esperado["actividad"]
@@ -0,0 +1,40 @@
+"""
+Filtro de equipos: sin paginación retorna todos, y las facetas en caché
+se invalidan con cada escritura de equipos.
+"""
+
+
+def _facetas(cliente, **filtros):
+    respuesta = cliente.get("/api/equipos/filtrar/", params={"facetas": "true", **filtros})
+    assert respuesta.status_code == 200, respuesta.json()
+    return respuesta.json()
+
+
+def test_sin_skip_ni_limit_retorna_todos(cliente, sql):
+    total = sql("SELECT count(*) FROM equipo")[0][0]
+    assert total > 100
+
+    assert len(cliente.get("/api/equipos/filtrar/").json()) == total
+    assert len(cliente.get("/api/equipos/filtrar/", params={"skip": 10, "limit": 5}).json()) == 5
+
+
+def test_facetas_se_actualizan_al_crear_editar_y_eliminar(cliente, sql):
+    subsistema_id, tipo_activo_id = sql("SELECT subsistema_id, tipo_activo_id FROM equipo LIMIT 1")[0]
+    otro_subsistema_id = sql("SELECT id FROM subsistema WHERE id != :id LIMIT 1", id=subsistema_id)[0][0]
+    total = _facetas(cliente)["total"]
+    en_subsistema = _facetas(cliente, subsistema_id=subsistema_id)["total"]
+
+    creado = cliente.post("/api/equipos/", json={
+        "nombre": "Equipo nuevo", "subsistema_id": subsistema_id, "tipo_activo_id": tipo_activo_id
+    })
+    assert creado.status_code == 200, creado.json()
+    equipo_id = creado.json()["id"]
+    assert _facetas(cliente)["total"] == total + 1
+    assert _facetas(cliente, subsistema_id=subsistema_id)["total"] == en_subsistema + 1
+
+    editado = cliente.put(f"/api/equipos/{equipo_id}", json={"subsistema_id": otro_subsistema_id})
+    assert editado.status_code == 200, editado.json()
+    assert _facetas(cliente, subsistema_id=subsistema_id)["total"] == en_subsistema
+
+    assert cliente.delete(f"/api/equipos/{equipo_id}").status_code == 200
+    assert _facetas(cliente)["total"] == total
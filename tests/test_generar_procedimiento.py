@@ -0,0 +1,71 @@
+"""
+La generación de procedimientos espera al LLM sin bloquear el event loop:
+mientras una generación está en curso, los demás endpoints responden.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from db import create_db
+from main import app
+from services.ai_service import cliente_llm
+
+# Duración simulada de la llamada al LLM
+DEMORA_LLM = 1.0
+
+PROCEDIMIENTO = {
+    "pasos": [{"titulo": "Inspección", "descripcion": "Revisar el equipo"}],
+    "precauciones": "Desenergizar el equipo",
+    "herramientas": "Multímetro",
+}
+
+
+class _RespuestaLLM:
+    content = json.dumps(PROCEDIMIENTO)
+
+
+class _LLMLento:
+    """Reemplaza a ChatOpenAI: responde después de DEMORA_LLM sin bloquear el event loop"""
+
+    async def ainvoke(self, prompt: str) -> _RespuestaLLM:
+        await asyncio.sleep(DEMORA_LLM)
+        return _RespuestaLLM()
+
+
+@pytest.fixture
+def llm_lento(monkeypatch):
+    create_db()
+    monkeypatch.setattr(cliente_llm, "_obtener_llm", lambda: _LLMLento())
+
+
+def test_otros_endpoints_responden_durante_la_generacion(llm_lento):
+    async def escenario():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as cliente:
+            inicio = time.perf_counter()
+            generacion = asyncio.create_task(cliente.post(
+                "/api/generar-procedimiento/?regenerar=true",
+                json={"tipo_equipo": "Bomba centrífuga", "marca": "Prueba", "modelo": "P-1"},
+            ))
+            # Dar tiempo a que la generación quede esperando al LLM
+            await asyncio.sleep(DEMORA_LLM / 10)
+
+            salud = await cliente.get("/api/health")
+            fin_salud = time.perf_counter() - inicio
+            assert salud.status_code == 200
+            assert not generacion.done()
+
+            respuesta = await generacion
+            fin_generacion = time.perf_counter() - inicio
+        return respuesta, fin_salud, fin_generacion
+
+    respuesta, fin_salud, fin_generacion = asyncio.run(escenario())
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["pasos"][0]["titulo"] == "Inspección"
+    # Si la llamada al LLM bloqueara el event loop, la consulta de salud
+    # esperaría a que terminara (fin_salud >= DEMORA_LLM)
+    assert fin_generacion >= DEMORA_LLM
+    assert fin_salud < DEMORA_LLM / 2, f"/api/health tardó {fin_salud:.2f}s durante la generación"
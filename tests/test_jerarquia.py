@@ -0,0 +1,77 @@
+"""
+Rutas (db/jerarquia.py) y contadores (db/agregados.py) mantenidos por
+triggers: deben coincidir con los calculados desde las tablas después de
+mover y eliminar nodos.
+"""
+import pytest
+
+
+@pytest.fixture
+def consistencia():
+    """Diferencias entre las rutas y contadores guardados y los recalculados"""
+    from db import engine
+    from db.agregados import verificar_agregados
+    from db.jerarquia import TABLA_RUTA_JERARQUIA, reconstruir_ruta_jerarquia
+
+    def diferencias():
+        consulta = f"SELECT tipo, entidad_id, ruta FROM {TABLA_RUTA_JERARQUIA}"
+        with engine.connect() as conn:
+            guardadas = set(conn.exec_driver_sql(consulta).all())
+            reconstruir_ruta_jerarquia(conn)
+            recalculadas = set(conn.exec_driver_sql(consulta).all())
+            conn.rollback()
+            return {"rutas": len(guardadas ^ recalculadas), **verificar_agregados(conn)}
+
+    return diferencias
+
+
+def _sin_diferencias(consistencia):
+    assert all(n == 0 for n in consistencia().values()), consistencia()
+
+
+def _ruta(sql, tipo, entidad_id):
+    return sql("SELECT ruta FROM ruta_jerarquia WHERE tipo = :tipo AND entidad_id = :id",
+               tipo=tipo, id=entidad_id)[0][0]
+
+
+def test_mover_nodos_actualiza_rutas_y_contadores(cliente, sql, consistencia):
+    _sin_diferencias(consistencia)
+    contrato_destino = sql("SELECT max(id) FROM contrato")[0][0]
+    plantas = [p for (p,) in sql("SELECT id FROM planta WHERE contrato_id != :id", id=contrato_destino)][:2]
+    sistema_destino = sql("SELECT max(id) FROM sistema")[0][0]
+    subsistemas = [s for (s,) in sql("SELECT id FROM subsistema WHERE sistema_id != :id LIMIT 2", id=sistema_destino)]
+    subsistema_destino = sql("SELECT max(id) FROM subsistema")[0][0]
+    equipos = [e for (e,) in sql("SELECT id FROM equipo WHERE subsistema_id != :id LIMIT 5", id=subsistema_destino)]
+
+    for ruta, ids, destino in [
+        ("/api/plantas/mover", plantas, contrato_destino),
+        ("/api/subsistemas/mover", subsistemas, sistema_destino),
+        ("/api/equipos/mover", equipos, subsistema_destino),
+    ]:
+        respuesta = cliente.post(ruta, json={"ids": ids, "destino_id": destino})
+        assert respuesta.status_code == 200, respuesta.json()
+        assert respuesta.json()["movidos"] == len(ids)
+
+    _sin_diferencias(consistencia)
+    assert _ruta(sql, "planta", plantas[0]).startswith(f"/{contrato_destino}/")
+    for equipo_id in equipos:
+        assert _ruta(sql, "equipo", equipo_id).startswith(_ruta(sql, "subsistema", subsistema_destino))
+    equipo_bajo_planta = sql("""SELECT e.id FROM equipo e JOIN subsistema ss ON ss.id = e.subsistema_id
+                                JOIN sistema s ON s.id = ss.sistema_id WHERE s.planta_id = :id LIMIT 1""",
+                             id=plantas[0])[0][0]
+    assert _ruta(sql, "equipo", equipo_bajo_planta).startswith(f"/{contrato_destino}/{plantas[0]}/")
+
+
+def test_eliminar_nodos_actualiza_rutas_y_contadores(cliente, sql, consistencia):
+    actividad_id = sql("SELECT id FROM actividad LIMIT 1")[0][0]
+    assert cliente.delete(f"/api/actividades/{actividad_id}").status_code == 200
+    subsistema_id = sql("SELECT id FROM subsistema LIMIT 1")[0][0]
+    assert cliente.delete(f"/api/subsistemas/{subsistema_id}", params={"cascada": True}).status_code == 200
+    sistema_id = sql("SELECT id FROM sistema ORDER BY id DESC LIMIT 1")[0][0]
+    assert cliente.delete(f"/api/sistemas/{sistema_id}", params={"cascada": True}).status_code == 200
+
+    _sin_diferencias(consistencia)
+    assert sql("SELECT count(*) FROM ruta_jerarquia WHERE tipo = 'subsistema' AND entidad_id = :id",
+               id=subsistema_id)[0][0] == 0
+    assert sql("SELECT count(*) FROM agregado_equipos WHERE subsistema_id = :id AND equipos != 0",
+               id=subsistema_id)[0][0] == 0
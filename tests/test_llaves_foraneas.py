@@ -0,0 +1,56 @@
+"""
+Llaves foráneas verificadas por la base de datos: las escrituras con
+referencias inexistentes responden 404 y las eliminaciones de registros
+referenciados responden 409 sin tocar a sus hijos.
+"""
+
+
+def test_eliminar_modelo_con_equipos_responde_409(cliente, sql):
+    modelo_id, equipos = sql(
+        "SELECT modelo_id, count(*) FROM equipo WHERE modelo_id IS NOT NULL GROUP BY 1 LIMIT 1"
+    )[0]
+    antes = sql("SELECT id, modelo_id FROM equipo WHERE modelo_id = :m ORDER BY id", m=modelo_id)
+
+    respuesta = cliente.delete(f"/api/modelos/{modelo_id}")
+
+    assert respuesta.status_code == 409, respuesta.json()
+    assert sql("SELECT id, modelo_id FROM equipo WHERE modelo_id = :m ORDER BY id", m=modelo_id) == antes
+    assert len(antes) == equipos
+    assert cliente.get(f"/api/modelos/{modelo_id}").status_code == 200
+
+
+def test_eliminar_cargo_con_personas_responde_409(cliente, sql):
+    cargo_id, = sql("SELECT cargo_id FROM persona WHERE cargo_id IS NOT NULL LIMIT 1")[0]
+    antes = sql("SELECT identificacion FROM persona WHERE cargo_id = :c ORDER BY 1", c=cargo_id)
+
+    respuesta = cliente.delete(f"/api/cargos/{cargo_id}")
+
+    assert respuesta.status_code == 409, respuesta.json()
+    assert sql("SELECT identificacion FROM persona WHERE cargo_id = :c ORDER BY 1", c=cargo_id) == antes
+
+
+def test_eliminar_equipo_con_actividades_responde_409(cliente, sql):
+    equipo_id, actividades = sql("SELECT equipo_id, count(*) FROM actividad GROUP BY 1 LIMIT 1")[0]
+
+    assert cliente.delete(f"/api/equipos/{equipo_id}").status_code == 409
+    assert sql("SELECT count(*) FROM actividad WHERE equipo_id = :e", e=equipo_id)[0][0] == actividades
+
+
+def test_eliminar_sin_dependientes(cliente, sql):
+    fabricante_id = cliente.post("/api/fabricantes/", json={"nombre": "Sin modelos"}).json()["id"]
+
+    assert cliente.delete(f"/api/fabricantes/{fabricante_id}").status_code == 200
+    assert sql("SELECT count(*) FROM fabricante WHERE id = :f", f=fabricante_id)[0][0] == 0
+
+
+def test_referencia_inexistente_responde_404_con_el_mensaje_de_la_columna(cliente):
+    equipo = {"nombre": "E", "subsistema_id": 1, "tipo_activo_id": 1}
+
+    assert cliente.post("/api/equipos/", json={**equipo, "subsistema_id": 99999}).json() == {
+        "detail": "Subsistema no encontrado"
+    }
+    assert cliente.post("/api/equipos/", json={**equipo, "modelo_id": 99999}).json() == {
+        "detail": "Modelo no encontrado"
+    }
+    respuesta = cliente.put("/api/sistemas/1", json={"codigo": "S", "nombre": "S", "planta_id": 99999})
+    assert (respuesta.status_code, respuesta.json()) == (404, {"detail": "Planta no encontrada"})
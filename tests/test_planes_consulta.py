@@ -0,0 +1,15 @@
+"""
+Planes de consulta de los métodos CRUD (benchmarks/planes_consulta.py): una
+consulta que deja de usar su índice y recorre una tabla grande hace fallar
+las pruebas.
+"""
+from benchmarks.planes_consulta import UMBRAL_FILAS, verificar
+
+
+def test_ningun_caso_recorre_completa_una_tabla_grande():
+    reporte = verificar("mediano", semilla=42, umbral=UMBRAL_FILAS)
+
+    assert any(n >= UMBRAL_FILAS for n in reporte["filas"].values())
+    regresiones = [f"{r['caso']}: SCAN de {r['tabla']} ({r['filas']} filas)\n  {r['sql']}"
+                   for r in reporte["regresiones"]]
+    assert not regresiones, "\n".join(regresiones)
@@ -0,0 +1,82 @@
+"""
+Sincronización por claves naturales (CRUDBase.upsert_many): inserta lo
+nuevo, actualiza solo lo que cambia y responde los conflictos sin escribir.
+"""
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+
+def test_inserta_actualiza_y_omite_sin_cambios(cliente, sql):
+    (id_1, nombre_1, cargo_1), (id_2, nombre_2, cargo_2) = sql(
+        "SELECT identificacion, nombres, cargo_id FROM persona ORDER BY identificacion LIMIT 2"
+    )
+    personas = [
+        {"identificacion": id_1, "nombres": "Nombre cambiado", "cargo_id": cargo_1},
+        {"identificacion": id_2, "nombres": nombre_2, "cargo_id": cargo_2},
+        {"identificacion": 999999, "nombres": "Persona nueva", "cargo_id": cargo_1},
+    ]
+
+    respuesta = cliente.put("/api/personas/upsert", json=personas)
+
+    assert respuesta.status_code == 200, respuesta.json()
+    assert respuesta.json() == {"insertados": 1, "actualizados": 1, "sin_cambios": 1}
+    assert sql("SELECT nombres FROM persona WHERE identificacion = :id", id=id_1)[0][0] == "Nombre cambiado"
+    assert sql("SELECT nombres FROM persona WHERE identificacion = 999999")[0][0] == "Persona nueva"
+
+    repetida = cliente.put("/api/personas/upsert", json=personas)
+    assert repetida.json() == {"insertados": 0, "actualizados": 0, "sin_cambios": 3}
+
+
+def test_clave_compuesta_y_claves_repetidas_en_el_envio(cliente, sql):
+    fabricante_id, nombre = sql("SELECT fabricante_id, nombre FROM modelo LIMIT 1")[0]
+    modelos = sql("SELECT count(*) FROM modelo")[0][0]
+
+    respuesta = cliente.put("/api/modelos/upsert", json=[
+        {"fabricante_id": fabricante_id, "nombre": nombre},
+        {"fabricante_id": fabricante_id, "nombre": "Modelo nuevo"},
+        {"fabricante_id": fabricante_id, "nombre": "Modelo nuevo"},
+    ])
+
+    assert respuesta.status_code == 200, respuesta.json()
+    assert respuesta.json() == {"insertados": 1, "actualizados": 0, "sin_cambios": 1}
+    assert sql("SELECT count(*) FROM modelo")[0][0] == modelos + 1
+
+
+def test_referencia_inexistente_no_escribe_nada(cliente, sql):
+    cargo_id = sql("SELECT id FROM cargo LIMIT 1")[0][0]
+    personas = sql("SELECT count(*) FROM persona")[0][0]
+
+    respuesta = cliente.put("/api/personas/upsert", json=[
+        {"identificacion": 999998, "nombres": "Con cargo", "cargo_id": cargo_id},
+        {"identificacion": 999999, "nombres": "Sin cargo", "cargo_id": 99999},
+    ])
+
+    assert respuesta.status_code == 404
+    assert "99999" in respuesta.json()["detail"]
+    assert sql("SELECT count(*) FROM persona")[0][0] == personas
+
+
+def test_conflicto_con_otra_restriccion_unica_responde_409(base, sql):
+    from db import crud_tipo_activo, engine
+
+    otro_id = sql("SELECT id FROM tipoactivo LIMIT 1")[0][0]
+
+    with Session(engine) as session:
+        # La clave natural es la descripción; el id choca con el de otro tipo
+        with pytest.raises(HTTPException) as error:
+            crud_tipo_activo.upsert_many(session, [
+                {"descripcion": "Tipo nuevo", "imagen": "a.png"},
+                {"descripcion": "Otro tipo nuevo", "id": otro_id},
+            ])
+    assert error.value.status_code == 409
+    assert sql("SELECT count(*) FROM tipoactivo WHERE descripcion = 'Tipo nuevo'")[0][0] == 0
+
+
+def test_registro_sin_clave_natural_responde_400(base):
+    from db import crud_tipo_activo, engine
+
+    with Session(engine) as session:
+        with pytest.raises(HTTPException) as error:
+            crud_tipo_activo.upsert_many(session, [{"imagen": "a.png"}])
+    assert error.value.status_code == 400